@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""虚拟时钟加速模拟：用VirtualClock运行设备更新循环和任务间隔等待
+
+用法：python server/bench/bench_clock.py [模拟秒数] [任务间隔秒数]
+一个线程按Ticker节拍循环（同设备更新循环），另一个线程按任务间隔sleep（同CTask_._next），
+两个线程都登记到虚拟时钟，统计模拟时长、节拍数、任务执行次数和实际耗时。
+"""
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+import _G
+from CDevice import Ticker
+
+
+def main():
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 3600
+    interval = float(sys.argv[2]) if len(sys.argv) > 2 else 30
+    g = _G._G_
+    clock = g.setClock(_G.VirtualClock())
+    begin = clock.time()
+    end = begin + duration
+    counts = {'ticks': 0, 'steps': 0}
+
+    def deviceLoop():
+        ticker = Ticker()
+        try:
+            while clock.time() < end:
+                ticker.wait(lambda: clock.time() < end)
+                ticker.update(None)
+                counts['ticks'] += 1
+        finally:
+            clock.detach()
+
+    def taskLoop():
+        try:
+            while clock.time() + interval <= end:
+                clock.sleep(interval)
+                counts['steps'] += 1
+        finally:
+            clock.detach()
+
+    threads = [threading.Thread(target=deviceLoop), threading.Thread(target=taskLoop)]
+    for t in threads:
+        clock.attach(t)
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    cost = time.perf_counter() - start
+    g.setClock()
+    simulated = clock.time() - begin
+    print(f'模拟时长: {simulated:.1f}秒, 实际耗时: {cost:.3f}秒, 加速: {simulated / cost:.0f}x')
+    print(f'节拍数: {counts["ticks"]}, 任务执行次数: {counts["steps"]} (期望 {int(duration // interval)})')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""命令分派耗时对比：逐个命令fullmatch+每次分析函数签名 vs 命令名索引+预先生成的绑定计划
+
+用法：python server/bench/bench_cmddispatch.py [每条命令执行次数]
+注册若干条合成命令（命令名、别名和参数格式与CCmds中的命令类似），
+分别统计命令数为100、300、800时的单次分派耗时（匹配+参数绑定）。
+"""
+import inspect
+import json
+import os
+import string
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+import _G
+from _CmdMgr import _CmdMgr_
+
+
+def genName(i):
+    """生成函数名，保证函数名缩写互不相同"""
+    letters = string.ascii_uppercase
+    return 'bench' + letters[i // 676 % 26] + letters[i // 26 % 26] + letters[i % 26]
+
+
+def register(start, count):
+    for i in range(start, start + count):
+        name = genName(i)
+        if i % 3 == 0:
+            pattern = f"#合成命令{i}|hc{i}"
+            src = f"def {name}():\n    return {i}\n"
+        elif i % 3 == 1:
+            pattern = f"#合成查找{i}|hz{i} (?P<text>\\S+)(?P<dir>[LlRrUuDd]+)?"
+            src = f"def {name}(text, dir=None):\n    return [text, dir]\n"
+        else:
+            pattern = f"#合成跳转{i}|ht{i}(?P<target>.+)"
+            src = f"def {name}(target, cmd=None):\n    return {{'target': target}}\n"
+        scope = {}
+        exec(src, scope)
+        func = scope[name]
+        func.__module__ = 'BenchCmds'
+        _CmdMgr_.reg(pattern)(func)
+    _CmdMgr_._sort()
+
+
+def oldDispatch(cmdStr, params):
+    """原实现：遍历所有命令fullmatch取命令名最长的匹配，每次分析函数签名"""
+    bestMatch = None
+    m = None
+    bestMatchLength = -1
+    for _, cmds in _CmdMgr_.cmdModules:
+        for cmdObj in cmds.values():
+            match = cmdObj.matchRegex.fullmatch(cmdStr)
+            if match:
+                cmdMatch = match.groupdict().get(_CmdMgr_.CmdKey)
+                matchLength = len(cmdMatch) if cmdMatch else 0
+                if matchLength > bestMatchLength:
+                    bestMatch = cmdObj
+                    m = match
+                    bestMatchLength = matchLength
+    kwargs = {}
+    for key, value in m.groupdict().items():
+        if key != _CmdMgr_.CmdKey:
+            kwargs[key] = _CmdMgr_._cleanParam(value)
+    sig = inspect.signature(bestMatch.func)
+    for key, value in params.items():
+        if key in sig.parameters:
+            kwargs[key] = value
+    for name, param in sig.parameters.items():
+        if param.default == inspect.Parameter.empty and kwargs.get(name) is None:
+            return None
+    result = bestMatch.func(**kwargs)
+    json.dumps(result)
+    return result
+
+
+def newDispatch(cmdStr, params):
+    """新实现：与_CmdMgr_.do相同的匹配和绑定（不含日志输出）"""
+    find, m = _CmdMgr_._match(cmdStr)
+    kwargs = {}
+    for key in find.groups:
+        kwargs[key] = _CmdMgr_._cleanParam(m.group(key))
+    for key, value in params.items():
+        if key in find.paramNames:
+            kwargs[key] = value
+    for name in find.required:
+        if kwargs.get(name) is None:
+            return None
+    result = find.func(**kwargs)
+    if not isinstance(result, _CmdMgr_._JsonTypes):
+        json.dumps(result)
+    return result
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    _CmdMgr_.clear()
+    print(f'{"命令数":>6} | {"原(us)":>9} {"新(us)":>9} | {"加速":>6}')
+    registered = 0
+    for total in (100, 300, 800):
+        register(registered, total - registered)
+        registered = total
+        cmds = []
+        for i in range(0, total, max(1, total // 30)):
+            cmds.append([f'hc{i}', f'hz{i} 金币L', f'ht{i} 首页'][i % 3])
+        for cmdStr in cmds:
+            assert oldDispatch(cmdStr, {}) == newDispatch(cmdStr, {}), cmdStr
+        costs = []
+        for func in (oldDispatch, newDispatch):
+            start = time.perf_counter()
+            for _ in range(rounds):
+                for cmdStr in cmds:
+                    func(cmdStr, {'cmd': None})
+            costs.append((time.perf_counter() - start) / (rounds * len(cmds)) * 1e6)
+        print(f'{total:>6} | {costs[0]:>9.1f} {costs[1]:>9.1f} | {costs[0] / costs[1]:>5.1f}x')
+
+
+if __name__ == '__main__':
+    main()
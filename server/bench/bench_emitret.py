@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""emitRet 往返延迟对比：原轮询等待(sleep 0.1) vs 等待表+事件
+
+用法：python server/bench/bench_emitret.py [次数]
+用模拟的Socket.IO对象代替真实连接，应答在另一个线程中延迟若干毫秒后回调，
+统计从发送到emitRet返回的耗时。
+"""
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+import _G
+
+
+class FakeSio:
+    """模拟Socket.IO：在后台线程中延迟回调应答"""
+
+    def __init__(self, delay):
+        self.delay = delay
+
+    def emit(self, event, data=None, room=None, callback=None):
+        def ack():
+            time.sleep(self.delay)
+            if callback:
+                callback({'result': data})
+        threading.Thread(target=ack, daemon=True).start()
+
+
+class FakeLog:
+    def w_(self, msg):
+        print(msg)
+
+    def ex_(self, e, msg):
+        print(msg, e)
+
+
+def pollEmitRet(g, event, data=None, sid=None, timeout=10):
+    """原实现：回调置位后由sleep(0.1)轮询发现"""
+    result = None
+    wait = True
+    start = time.time()
+
+    def onResult(*args):
+        nonlocal result, wait
+        result = args[0] if args else None
+        wait = False
+    g.emit(event, data, sid, timeout, onResult)
+    while wait:
+        if time.time() - start > timeout:
+            return None
+        time.sleep(0.1)
+    return result
+
+
+def run(name, func, rounds):
+    costs = []
+    for i in range(rounds):
+        start = time.perf_counter()
+        ret = func(i)
+        costs.append(time.perf_counter() - start)
+        assert ret == {'result': {'i': i}}, ret
+    print(f'{name:<8} 平均 {statistics.mean(costs) * 1000:7.2f}ms  '
+          f'中位数 {statistics.median(costs) * 1000:7.2f}ms  '
+          f'最大 {max(costs) * 1000:7.2f}ms')
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    g = _G._G_
+    g._isServer = True
+    g.log = FakeLog()
+    for delay in (0.001, 0.02, 0.15):
+        g._sio = FakeSio(delay)
+        print(f'\n应答延迟 {delay * 1000:.0f}ms, 次数 {rounds}')
+        run('轮询', lambda i: pollEmitRet(g, 'Bench', {'i': i}, 'sid'), rounds)
+        run('事件', lambda i: g.emitRet('Bench', {'i': i}, 'sid'), rounds)
+
+
+if __name__ == '__main__':
+    main()
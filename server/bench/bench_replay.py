@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""回放录制的设备会话，输出每个节拍各阶段的耗时和页面检测结果
+
+用法：python server/bench/bench_replay.py [--virtual] <录制名称或文件> [速度倍数] [报告输出文件]
+录制文件由设备上的"开始录制/停止录制"指令生成（data/sessions/*.jsonl），
+也可以用 CReplay_.fromSnapshots 从 data/screenshots 下的屏幕信息快照生成。
+速度倍数默认0（不等待，尽快回放）。指定报告输出文件时把报告保存为JSON，
+修改规则引擎前后各回放一次，对比两个报告中的页面切换和耗时。
+--virtual 使用虚拟时钟，按录制的时间推进页面超时和任务时长，不真实等待。
+"""
+import json
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+import _G
+from CReplay import CReplay_
+
+
+def main():
+    args = [a for a in sys.argv[1:] if a != '--virtual']
+    if not args:
+        print(__doc__)
+        return
+    name = args[0]
+    speed = float(args[1]) if len(args) > 1 else 0
+    g = _G._G_
+    g.load(False)
+    if '--virtual' in sys.argv:
+        g.setClock(_G.VirtualClock())
+    report = CReplay_.replay(name, speed)
+    print(CReplay_.format(report))
+    if len(args) > 2:
+        with open(args[2], 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""RPC分派耗时对比：每次getattr+分析函数签名 vs 注册时生成的分派表
+
+用法：python server/bench/bench_rpcdispatch.py [调用次数]
+注册一个带类方法、实例方法和datetime参数的合成RPC类，
+分别统计原实现和分派表实现每秒能处理的调用数（不含网络传输）。
+"""
+import inspect
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+import _G
+import RPC
+from RPC import RPC as rpc, rpcManager
+
+
+class Bench_:
+    items = {}
+
+    def __init__(self, id):
+        self.id = id
+        self.score = 0
+
+    @classmethod
+    @rpc()
+    def ping(cls) -> dict:
+        return 'pong'
+
+    @classmethod
+    @rpc()
+    def getScores(cls, date: datetime = None, name: str = None) -> dict:
+        return {'result': [name, date.day if date else None]}
+
+    @rpc()
+    def addScore(self, score: int, date: datetime = None):
+        self.score = score
+        return [self.id, score, date.hour if date else None]
+
+
+def oldGetInst(cls, id=None):
+    """原getInst：按类名逐个判断"""
+    if id is None:
+        return None
+    className = cls.__name__
+    if className in ['_App_', 'SApp_']:
+        return None
+    elif className in ['CDevice_', 'SDevice_', '_Device_']:
+        return None
+    elif className in ['CTask_', 'STask_', 'Task_']:
+        return None
+    return Bench_.items.get(id)
+
+
+def oldConvert(method, kwargs):
+    """原_convertRpcTypes + _convertSingleType"""
+    params = inspect.signature(method).parameters
+    converted = {}
+    for key, value in kwargs.items():
+        if key in params and key not in ['self', 'cls']:
+            annotation = params[key].annotation
+            if annotation != inspect.Parameter.empty and value is not None \
+                    and not isinstance(value, annotation):
+                if annotation == datetime and isinstance(value, str):
+                    value = _G.DateHelper.toDate(value)
+        converted[key] = value
+    return converted
+
+
+def oldCall(className, methodName, params):
+    """原callRpcMethod"""
+    className = _G._G_.toClassName(className)
+    method = rpcManager._rpcMethods.get(className, {}).get(methodName)
+    if not method:
+        return {'error': f'RPC方法不存在: {className}.{methodName}'}
+    cls = rpcManager._rpcClasses.get(className)
+    instance = None
+    if not params:
+        params = {}
+    instanceID = params.get('id')
+    if instanceID is not None:
+        del params['id']
+        instance = oldGetInst(cls, instanceID)
+        if instance is None:
+            return {'error': f'RPC实例不存在: {className}, id={instanceID}'}
+    params = oldConvert(getattr(cls, methodName, None), params)
+    method = getattr(cls, methodName, None)
+    result = method(instance, **params) if instance else method(**params)
+    if isinstance(result, dict) and ('error' in result or 'result' in result):
+        return result
+    return {'result': result}
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    Bench_.items = {1: Bench_(1), 2: Bench_(2)}
+    RPC._Resolvers['Bench_'] = Bench_.items.get
+    rpcManager.registerRpcClass(Bench_)
+    calls = [
+        ('Bench', 'ping', {}),
+        ('Bench_', 'getScores', {'date': '2025-06-01', 'name': '金币'}),
+        ('Bench', 'addScore', {'id': 1, 'score': 2, 'date': '2025-06-01 10:00:00'}),
+        ('Bench', 'addScore', {'id': 2, 'score': 3}),
+        ('Bench', 'missing', {}),
+    ]
+    for className, methodName, params in calls:
+        old = oldCall(className, methodName, dict(params))
+        new = rpcManager.callRpcMethod(className, methodName, dict(params))
+        assert old == new, (methodName, old, new)
+
+    print(f'{"方法":<10} | {"原(次/秒)":>12} {"新(次/秒)":>12} | {"加速":>6}')
+    total = [0.0, 0.0]
+    for className, methodName, params in calls:
+        rates = []
+        for i, func in enumerate((oldCall, rpcManager.callRpcMethod)):
+            start = time.perf_counter()
+            for _ in range(count):
+                func(className, methodName, dict(params))
+            cost = time.perf_counter() - start
+            total[i] += cost
+            rates.append(count / cost)
+        print(f'{methodName:<10} | {rates[0]:>12.0f} {rates[1]:>12.0f} | {rates[1] / rates[0]:>5.1f}x')
+    n = count * len(calls)
+    print(f'{"合计":<10} | {n / total[0]:>12.0f} {n / total[1]:>12.0f} | {total[0] / total[1]:>5.1f}x')
+
+
+if __name__ == '__main__':
+    main()
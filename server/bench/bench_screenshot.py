@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""截图上传对比：base64字符串+同步写文件 vs 二进制附件+后台写入
+
+用法：python server/bench/bench_screenshot.py [每种大小的次数]
+按Socket.IO协议计算每张截图的传输字节数（base64文本包 vs 二进制附件包），
+并统计C2S_Screenshot事件处理函数中的阻塞耗时。截图写到临时目录。
+"""
+import base64
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+import _G
+from SDevice import ScreenshotWriter
+
+
+class FakeDevice:
+    def __init__(self, id):
+        self.id = id
+
+    def onScreenshotSaved(self, name, thumb, t):
+        pass
+
+
+def genJpeg(size):
+    """生成指定大小的数据，随机内容近似JPEG的不可压缩性"""
+    return b'\xff\xd8\xff\xe0' + os.urandom(size - 6) + b'\xff\xd9'
+
+
+def wireBytes(image: bytes):
+    """按Socket.IO协议计算两种方式的包大小"""
+    text = 'data:image/jpeg;base64,' + base64.b64encode(image).decode('ascii')
+    old = len('42' + json.dumps(['C2S_Screenshot', {'device_id': 'dev1', 'image': text}]))
+    placeholder = {'device_id': 'dev1', 'image': {'_placeholder': True, 'num': 0}}
+    new = len('451-' + json.dumps(['C2S_Screenshot', placeholder])) + len(image)
+    return old, new, text
+
+
+def oldHandler(text, dir):
+    """原saveScreenshot：在事件处理中解码并写文件"""
+    data = base64.b64decode(text.split(',', 1)[1])
+    path = os.path.join(dir, time.strftime('%Y-%m-%d_%H-%M-%S') + f'_{time.perf_counter_ns()}.jpg')
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    root = tempfile.mkdtemp()
+    _G._G_._dir = root
+    oldDir = os.path.join(root, 'old')
+    os.makedirs(oldDir)
+    writer = ScreenshotWriter()
+    device = FakeDevice(1)
+    try:
+        print(f'{"大小":>8} | {"传输 原":>10} {"传输 新":>10} | {"阻塞 原(ms)":>11} {"阻塞 新(ms)":>11}')
+        for size in (100 * 1024, 300 * 1024, 800 * 1024):
+            image = genJpeg(size)
+            old, new, text = wireBytes(image)
+            oldCosts, newCosts = [], []
+            for _ in range(rounds):
+                start = time.perf_counter()
+                oldHandler(text, oldDir)
+                oldCosts.append(time.perf_counter() - start)
+                start = time.perf_counter()
+                writer.put(device, image)
+                newCosts.append(time.perf_counter() - start)
+            writer.flush()
+            print(f'{size // 1024:>6}KB | {old:>10} {new:>10} | '
+                  f'{statistics.mean(oldCosts) * 1000:>11.3f} {statistics.mean(newCosts) * 1000:>11.3f}')
+        writer.stop()
+        stats = writer.stats()
+        print(f'\n后台写入: {stats["written"]}张, 平均 {stats["avgWrite"]}ms, '
+              f'丢弃 {stats["dropped"]}, 清理 {stats["removed"]}')
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
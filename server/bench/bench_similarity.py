@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""相似度计算性能对比：原动态规划LCS vs 位并行LCS
+
+用法：python server/bench/bench_similarity.py [轮数]
+使用 server/data/*.json 中的屏幕快照，每个文字块依次作为查询文本，
+对整帧文字打分（similarMatch 的典型用法）。
+"""
+import glob
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from _Tools import Similarity
+
+
+def dpSimilarity(tarText, text) -> float:
+    """原实现：完整的O(n*m)动态规划表"""
+    if not tarText or not text:
+        return 0.0
+    if tarText == text:
+        return 1.0
+    len1, len2 = len(tarText), len(text)
+    dp = [[0] * (len2 + 1) for _ in range(len1 + 1)]
+    for i in range(1, len1 + 1):
+        for j in range(1, len2 + 1):
+            if tarText[i-1] == text[j-1]:
+                dp[i][j] = dp[i-1][j-1] + 1
+            else:
+                dp[i][j] = max(dp[i-1][j], dp[i][j-1])
+    return dp[len1][len2] / max(len1, len2)
+
+
+def dpBest(tarText, items, threshold):
+    """原similarMatch逻辑"""
+    retItem = None
+    maxSim = 0
+    for item in items:
+        sim = dpSimilarity(tarText, item['t'])
+        if sim < threshold:
+            continue
+        if retItem is None or sim > maxSim:
+            retItem = item
+            maxSim = sim
+    return retItem, maxSim
+
+
+def loadFrames():
+    dataDir = os.path.join(os.path.dirname(__file__), '..', 'data')
+    frames = []
+    for path in sorted(glob.glob(os.path.join(dataDir, '*.json'))):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                items = json.load(f)
+        except Exception:
+            continue
+        if not isinstance(items, list):
+            continue
+        items = [i for i in items if isinstance(i, dict) and i.get('t')]
+        if items:
+            frames.append((os.path.basename(path), items))
+    return frames
+
+
+def run(name, frames, func, rounds):
+    start = time.perf_counter()
+    calls = 0
+    results = []
+    for _ in range(rounds):
+        for _, items in frames:
+            for query in items:
+                results.append(func(query['t'], items))
+                calls += 1
+    cost = time.perf_counter() - start
+    print(f'{name:<12} {calls:>6} 次查询  总耗时 {cost * 1000:9.1f}ms  '
+          f'单次 {cost / calls * 1e6:8.1f}us')
+    return cost, results
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    frames = loadFrames()
+    total = sum(len(items) for _, items in frames)
+    print(f'快照 {len(frames)} 个, 文字块 {total} 个, 轮数 {rounds}')
+    for threshold in (0, 0.6, 0.8):
+        print(f'\n阈值 {threshold}')
+        dpCost, dpRet = run('DP', frames,
+                            lambda q, items: dpBest(q, items, threshold), rounds)
+        bpCost, bpRet = run('BitParallel', frames,
+                            lambda q, items: Similarity(q).best(items, threshold), rounds)
+        same = all(a[0] is b[0] and a[1] == b[1] for a, b in zip(dpRet, bpRet))
+        print(f'结果一致: {same}  加速: {dpCost / bpCost:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
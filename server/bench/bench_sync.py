@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""脚本同步对比：逐文件下载(每个文件一个线程一个连接) vs 单个增量zip包
+
+用法：python server/bench/bench_sync.py [每个连接的模拟延迟ms]
+在本机启动一个HTTP服务，提供 /file/<路径> 和 /sync 两种接口，
+每个新连接先等待模拟延迟（近似设备网络下的TCP/TLS握手），
+分别统计全量更新和部分更新时的总耗时、请求数和传输字节数。
+"""
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+import _G
+from SManifest import SManifest_
+
+Latency = 0.05
+
+
+class Stats:
+    lock = threading.Lock()
+    requests = 0
+    bytes = 0
+
+    @classmethod
+    def reset(cls):
+        cls.requests = 0
+        cls.bytes = 0
+
+    @classmethod
+    def add(cls, size):
+        with cls.lock:
+            cls.requests += 1
+            cls.bytes += size
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.0'
+
+    def setup(self):
+        # 每个新连接模拟一次握手延迟
+        time.sleep(Latency)
+        super().setup()
+
+    def reply(self, code, body=b'', mimetype='application/octet-stream'):
+        self.send_response(code)
+        self.send_header('Content-Type', mimetype)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        Stats.add(len(body))
+
+    def do_GET(self):
+        rel = urllib.parse.unquote(self.path[len('/file/'):])
+        with open(os.path.join(_G._G_.rootDir(), rel), 'rb') as f:
+            self.reply(200, f.read())
+
+    def do_POST(self):
+        data = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        body, _ = SManifest_.archive(data['versions'])
+        if body is None:
+            self.reply(204)
+        else:
+            self.reply(200, body, 'application/zip')
+
+    def log_message(self, *args):
+        pass
+
+
+def perFile(base, outDir, versions):
+    """原downAll：每个变化的文件一个线程，各自建立连接"""
+    remote = SManifest_.entries()
+    names = [rel for rel, info in remote.items() if info['mtime'] > int(versions.get(rel, 0))]
+
+    def down(rel):
+        with urllib.request.urlopen(f'{base}/file/{urllib.parse.quote(rel)}', timeout=30) as resp:
+            data = resp.read()
+        path = os.path.join(outDir, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+    # 原流程先请求一次/timestamps
+    Stats.add(len(json.dumps({rel: str(i['mtime']) for rel, i in remote.items()})))
+    time.sleep(Latency)
+    threads = [threading.Thread(target=down, args=(rel,)) for rel in names]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return len(names)
+
+
+def archive(base, outDir, versions):
+    """增量同步：一个请求取回zip包后解压"""
+    req = urllib.request.Request(f'{base}/sync', json.dumps({'versions': versions}).encode('utf-8'),
+                                 {'Content-Type': 'application/json'})
+    with urllib.request.urlopen(req, timeout=30) as resp:
+        if resp.status == 204:
+            return 0
+        data = resp.read()
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        names = [n for n in zf.namelist() if n != SManifest_.VersionsName]
+        for name in names:
+            path = os.path.join(outDir, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(zf.read(name))
+    return len(names)
+
+
+def run(name, func, base, versions):
+    outDir = tempfile.mkdtemp()
+    try:
+        Stats.reset()
+        start = time.perf_counter()
+        count = func(base, outDir, versions)
+        cost = time.perf_counter() - start
+        print(f'  {name:<6} 文件 {count:>4}  请求 {Stats.requests:>4}  '
+              f'传输 {Stats.bytes / 1024:8.1f}KB  耗时 {cost * 1000:8.1f}ms')
+    finally:
+        shutil.rmtree(outDir, ignore_errors=True)
+
+
+def main():
+    global Latency
+    if len(sys.argv) > 1:
+        Latency = float(sys.argv[1]) / 1000
+    _G._G_._isServer = True
+    entries = SManifest_.entries()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{server.server_address[1]}'
+    full = {}
+    newest = sorted(entries.items(), key=lambda kv: kv[1]['mtime'])
+    partial = {rel: str(info['mtime']) for rel, info in newest[:len(newest) * 9 // 10]}
+    print(f'清单文件 {len(entries)} 个, 每个连接模拟延迟 {Latency * 1000:.0f}ms')
+    for title, versions in (('全量更新', full), ('部分更新(10%)', partial)):
+        print(title)
+        run('逐文件', perFile, base, versions)
+        run('增量包', archive, base, versions)
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
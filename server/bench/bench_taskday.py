@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""按天查询任务的耗时对比：date(time)=:date 全表扫描 vs day列+联合索引
+
+用法：python server/bench/bench_taskday.py [最大行数]
+使用内存SQLite模拟tasks表，行数逐级增加到最大行数，
+分别统计 TaskModel_.get（设备+任务名+日期）和 SModel_.load（设备+日期）两种查询的耗时。
+"""
+import random
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+
+Devices = 200
+Names = ['签到', '看视频', '阅读', '走路', '抽奖', '答题', '分享', '直播']
+
+
+def genRows(start, count, base):
+    rows = []
+    for i in range(start, start + count):
+        t = base + timedelta(minutes=i * 7 % (365 * 24 * 60))
+        rows.append((i + 1, str(random.randrange(Devices)), random.choice(Names),
+                     t.strftime('%Y-%m-%d %H:%M:%S'), t.strftime('%Y-%m-%d'),
+                     random.randrange(100), 'idle', random.randrange(1000), 0))
+    return rows
+
+
+def createTable(db):
+    db.execute('CREATE TABLE tasks (id INTEGER PRIMARY KEY, deviceId VARCHAR(255), '
+               'name VARCHAR(255), time DATETIME, day DATE, progress INTEGER, '
+               'state VARCHAR(255), score INTEGER, life INTEGER)')
+
+
+def timeit(db, sql, paramsList):
+    start = time.perf_counter()
+    for params in paramsList:
+        db.execute(sql, params).fetchall()
+    return (time.perf_counter() - start) / len(paramsList) * 1000
+
+
+def main():
+    maxRows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    random.seed(1)
+    base = datetime(2025, 1, 1)
+    old = sqlite3.connect(':memory:')
+    new = sqlite3.connect(':memory:')
+    createTable(old)
+    createTable(new)
+    new.execute('CREATE INDEX idx_tasks_device_name_day ON tasks (deviceId, name, day)')
+    new.execute('CREATE INDEX idx_tasks_device_day ON tasks (deviceId, day)')
+
+    queries = []
+    for _ in range(50):
+        day = (base + timedelta(days=random.randrange(365))).strftime('%Y-%m-%d')
+        queries.append({'deviceId': str(random.randrange(Devices)),
+                        'name': random.choice(Names), 'date': day})
+    getOld = 'SELECT * FROM tasks WHERE deviceId = :deviceId AND name = :name AND DATE(time) = :date'
+    getNew = 'SELECT * FROM tasks WHERE deviceId = :deviceId AND name = :name AND day = :date'
+    loadOld = 'SELECT * FROM tasks WHERE deviceId = :deviceId AND date(time) = :date'
+    loadNew = 'SELECT * FROM tasks WHERE deviceId = :deviceId AND day = :date'
+
+    print(f'{"行数":>9} | {"get 原(ms)":>10} {"get 新(ms)":>10} | {"load 原(ms)":>11} {"load 新(ms)":>11}')
+    rows = 0
+    target = 10000
+    while rows < maxRows:
+        target = min(target, maxRows)
+        batch = genRows(rows, target - rows, base)
+        for db in (old, new):
+            db.executemany('INSERT INTO tasks VALUES (?,?,?,?,?,?,?,?,?)', batch)
+            db.commit()
+        rows = target
+        print(f'{rows:>9} | {timeit(old, getOld, queries):>10.3f} {timeit(new, getNew, queries):>10.3f} | '
+              f'{timeit(old, loadOld, queries):>11.3f} {timeit(new, loadNew, queries):>11.3f}')
+        target *= 10
+
+
+if __name__ == '__main__':
+    main()
@@ -10,6 +10,7 @@ from typing import TYPE_CHECKING, Tuple, Optional, List, Dict
 if TYPE_CHECKING:
     from _Page import _Page_
     from _Log import _Log_
+    from _Tools import Rulebook
 
 
 class CApp_(_App_):
@@ -25,6 +26,9 @@ class CApp_(_App_):
         # self.userEvents: List[str] = []  # 用户事件列表
         self._toasts = {}  # toasts配置字典，用于存储toast匹配规则和操作
         self._pages: Dict[str, "_Page_"] = {}  # 应用级的页面列表
+        self._rulebooks: Dict[str, "Rulebook"] = {}  # 页面/toast匹配规则集
+        # 导航表 {起始页面名: {可达页面名: 上一跳页面名}}，由页面exit构建
+        self._nav: Optional[Dict[str, Dict[str, str]]] = None
 
     @property
     def strPath(self)->str:
@@ -77,6 +81,9 @@ class CApp_(_App_):
         g = _G._G_
         log = g.Log()
         try:
+            # 配置变化后，之前编译的规则可能已失效
+            g.Tools().clearRules()
+            self._rulebooks = {}
             # 根据APP名字构造配置文件路径
             configPath = os.path.join(self._configDir(), f'{self.name}.json')
             if not os.path.exists(configPath):
@@ -117,6 +124,7 @@ class CApp_(_App_):
                 # 添加到页面列表
                 self._pages[pageName] = page
                 
+            self._buildNav()
             log.i(f"应用 {self.name} 配置加载完成，共 {len(self._pages)} 个页面")
             return self._pages
         except Exception as e:
@@ -153,6 +161,7 @@ class CApp_(_App_):
             path = os.path.join(path, f'{self.name}.json')
             with open(path, 'w', encoding='utf-8') as f:
                     json.dump(output, f, ensure_ascii=False, indent=2)
+            self.clearNav()
             return path
         except Exception as e:
             log.ex(e, f"保存配置文件失败")
@@ -162,12 +171,35 @@ class CApp_(_App_):
     # 先检查toast的key是否匹配，如果匹配，则执行action
     # 如果action以@开头，则认为是一个表达式，需要执行表达式,将执行结果赋值给action，在执行后续action逻辑
     # action中包含逗号，则认为是一个按钮和操作的组合，如果没有，则认为是一个按钮
+    def _getRulebook(self, kind: str, exprs: List[str]) -> "Rulebook":
+        """获取规则集，规则表达式有变化时重新构建
+        Args:
+            kind: 规则集类型，如page、toast
+            exprs: 规则表达式列表
+        """
+        books = self._rulebooks
+        if books is None:
+            books = {}
+            self._rulebooks = books
+        book = books.get(kind)
+        if book is None or book.exprs != tuple(exprs):
+            from _Tools import Rulebook
+            book = Rulebook(exprs)
+            books[kind] = book
+        return book
+
     def detectToast(self):
         """检测toast"""
         g = _G._G_
         tools = g.Tools()
         log = g.Log()
-        for key, action in self._toasts.items():
+        toasts = list(self._toasts.items())
+        if not toasts:
+            return
+        book = self._getRulebook('toast', [key for key, _ in toasts])
+        # 只检查当前帧可能满足的toast
+        for i in book.candidates():
+            key, action = toasts[i]
             if tools.check(key, self):
                 if action.startswith('@'):
                     # 如果action以@开头，则认为是一个表达式，需要执行表达式
@@ -198,9 +230,14 @@ class CApp_(_App_):
                     self._toPage = None
             if not page:
                 # 检测当前应用中的alert类型页面
-                pages = self.getPages()
-                for p in pages:
-                    if p.isAlert and p.match():
+                pages = [p for p in self.getPages() if p.isAlert]
+                book = self._getRulebook('page', [p._match for p in pages])
+                # 只检查当前帧可能满足的页面，目标页面始终检查（PC上_Page_.match对目标页面直接返回True）
+                toPage = self.toPage
+                include = [i for i, p in enumerate(pages) if p is toPage]
+                for i in book.candidates(include):
+                    p = pages[i]
+                    if p.match():
                         page = p
                         break
             # if not page:
@@ -260,6 +297,7 @@ class CApp_(_App_):
                 page = _Page_(self, name)
             if page:
                 self._pages[name] = page
+                self.clearNav()
             return page
         except Exception as e:
             log.ex(e, f"获取页面 {name} 失败")
@@ -287,6 +325,7 @@ class CApp_(_App_):
         if page_name in self._pages:
             # 找到匹配的页面，删除它
             page = self._pages.pop(page_name)
+            self.clearNav()
             
             # 如果不是临时页面，保存配置
             if not page.hasAttr(_G.TEMP):
@@ -329,47 +368,56 @@ class CApp_(_App_):
     
    
 
-    def findPath(self, fromPage: "_Page_", toPage: "_Page_", visited=None, path: List["_Page_"]=None) -> List["_Page_"]:
-        """在整个页面树中查找从fromPage到toPage的路径
+    def clearNav(self):
+        """页面或exit配置变化后清空导航表，下次查找路径时重建"""
+        self._nav = None
+
+    def _buildNav(self) -> Dict[str, Dict[str, str]]:
+        """由所有页面的exit构建导航表
+        对每个页面做一次广度优先搜索，记录到各可达页面最短路径上的上一跳，
+        同样跳数时优先exit中靠前的页面
+        """
+        exits = {}
+        for name, page in self._pages.items():
+            exits[name] = [n for n in page.exit.keys() if n in self._pages]
+        nav = {}
+        for start in exits:
+            prev = {start: None}
+            queue = [start]
+            for name in queue:
+                for nextName in exits.get(name, ()):
+                    if nextName not in prev:
+                        prev[nextName] = name
+                        queue.append(nextName)
+            nav[start] = prev
+        self._nav = nav
+        return nav
+
+    def findPath(self, fromPage: "_Page_", toPage: "_Page_") -> List["_Page_"]:
+        """查找从fromPage到toPage的最短路径
         Args:
             fromPage: 起始页面
             toPage: 目标页面
-            visited: 已访问页面集合(内部使用)
-            path: 当前路径(内部使用)
         Returns:
             list: 从fromPage到toPage的路径，如果没找到则返回[]
         """
-        # 初始化visited和path
-        if visited is None:
-            visited = set()
-        if path is None:
-            path = [fromPage]  # 第一次调用时，path只包含起始页面
-            
-        # 如果已经访问过当前页面，返回空路径避免循环
-        if fromPage in visited:
+        if not fromPage or not toPage:
             return []
-            
-        # 标记当前页面为已访问
-        visited.add(fromPage)
-        
-        # 如果找到目标页面，直接返回当前路径，不管目标页面是否有exit配置
         if fromPage.name == toPage.name:
-            return path
-            
-        # 如果当前页面没有exit配置，返回空路径
-        if not fromPage.exit:
+            return [fromPage]
+        nav = self._nav
+        if nav is None:
+            nav = self._buildNav()
+        prev = nav.get(fromPage.name)
+        if not prev or toPage.name not in prev:
             return []
-            
-        # 遍历所有exit页面
-        for pageName in fromPage.exit.keys():
-            page = self.getPage(pageName)
-            if page and page not in visited:
-                # 递归搜索下一个页面
-                resultPath = self.findPath(page, toPage, visited, path + [page])
-                if resultPath:
-                    return resultPath
-                    
-        return []
+        names = []
+        name = toPage.name
+        while name != fromPage.name:
+            names.append(name)
+            name = prev[name]
+        names.reverse()
+        return [fromPage] + [self._pages[n] for n in names]
 
     def _findPath(self, pageNames, name, visited=None) -> Optional["_Page_"]:
         """在指定页面列表中查找指定名称的页面"""
@@ -461,7 +509,8 @@ class CApp_(_App_):
             g = _G._G_
             log = g.Log()
             tools = g.Tools()
-            tools.refreshScreenInfos()
+            start = time.time()
+            items = tools.beginTick()
             # 检测toast
             self.detectToast()
             # 检测当前页面
@@ -476,9 +525,14 @@ class CApp_(_App_):
             curTask = g.CDevice().curTask()
             if curTask:
                 curTask.update(g)
-            
+            # 录制中时记录这一帧
+            replay = g.CReplay()
+            if replay.isRecording():
+                replay.record(self, items, time.time() - start)
         except Exception as e:
             log.ex(e, f"客户端应用更新失败：{self.name}")
+        finally:
+            _G._G_.Tools().endTick()
     
     @RPC()
     def getScores(self, date: datetime = None) -> dict:
@@ -50,6 +50,7 @@ class CCmds_:
             tools = g.Tools()
             pos = tools.findTextPos(text)
             if pos:
+                tools._onAction()
                 g.android.move(pos[0], pos[1])
                 return f"{pos}"
             return "e~无效位置"
@@ -206,6 +207,76 @@ class CCmds_:
                     pageInfo = currentApp.curPage.name
             return f"应用: {appInfo}, 页面: {pageInfo}"
 
+        @regCmd(r"#节拍统计|jptj")
+        def tickRate():
+            """
+            功能：查看设备更新循环的节拍统计
+            指令名: tickRate
+            中文名: 节拍统计-jptj
+            参数: 无
+            示例: 节拍统计
+            """
+            stats = _G._G_.CDevice().ticker.stats()
+            return (f"频率: {stats['rate']}次/秒, 当前间隔: {stats['interval']}秒, "
+                    f"操作后平均等待: {stats['wait']}秒")
+
+        @regCmd(r"#计数统计|jstj")
+        def counterStats():
+            """
+            功能：查看本地计数器的统计
+            指令名: counterStats
+            中文名: 计数统计-jstj
+            参数: 无
+            示例: 计数统计
+            """
+            stats = _G._G_.CCounter().stats()
+            return (f"天数: {stats['days']}, 键数: {stats['keys']}, 待写入: {stats['pending']}, "
+                    f"日志: {stats['journal']}B, 写入: {stats['flushes']}次, "
+                    f"压缩: {stats['compacts']}次, 加载耗时: {stats['loadTime']}ms")
+
+        @regCmd(r"#开始录制|kslz(?P<name>\S+)?")
+        def beginRec(name=None):
+            """
+            功能：开始录制设备会话（每个节拍的应用、屏幕信息和检测到的页面）
+            指令名: beginRec
+            中文名: 开始录制-kslz
+            参数: name - 录制名称，默认为当前时间
+            示例: 开始录制 首页签到
+            """
+            path = _G._G_.CReplay().start(name)
+            return f"开始录制: {path}"
+
+        @regCmd(r"#停止录制|tzlz")
+        def endRec():
+            """
+            功能：停止录制设备会话
+            指令名: endRec
+            中文名: 停止录制-tzlz
+            参数: 无
+            示例: 停止录制
+            """
+            path, frames = _G._G_.CReplay().stop()
+            if not path:
+                return "w~没有正在进行的录制"
+            return f"录制已保存: {path}, 共{frames}帧"
+
+        @regCmd(r"#回放|hf (?P<name>\S+)(?P<speed>[\d.]+)?")
+        def replaySession(name, speed=None):
+            """
+            功能：在PC上回放录制的设备会话，输出各阶段耗时和页面检测结果
+            指令名: replaySession
+            中文名: 回放-hf
+            参数: name - 录制名称或文件路径
+                  speed - 回放速度倍数，默认0表示尽快回放
+            示例: 回放 首页签到 10
+            """
+            g = _G._G_
+            if g.android:
+                return "e~回放需要在没有android的PC客户端上运行"
+            replay = g.CReplay()
+            report = replay.replay(name, float(speed) if speed else 0)
+            return replay.format(report)
+
         @regCmd(r"#当前|dq(?P<what>\S*)?")
         def current(what=None):
             """
@@ -928,6 +999,7 @@ class CCmds_:
                 # 使用转换后的坐标点击
                 android = _G._G_.android
                 if android:
+                    tools._onAction()
                     success = android.click(windowX, windowY)
                 else:
                     success = True
@@ -0,0 +1,241 @@
+import atexit
+import json
+import os
+import re
+import threading
+import time
+from datetime import date, timedelta
+from typing import Dict, Optional
+import _G
+
+
+class CCounter_:
+    """设备本地计数器（页面进入次数、任务进度等），按天保存，重启后保留
+
+    修改只改内存，后台每FlushInterval秒把变化的键作为一行JSON追加到日志文件，
+    一次写入一行，断电时最多丢失最后一行，加载时跳过写了一半的行。
+    日志记录的是键的当前值而不是增量，重复回放结果相同。
+    日志超过CompactBytes时把全部数据写成快照（临时文件+替换），再清空日志。
+    启动时读取快照，再回放日志。
+    """
+    Dir = 'data/counters'
+    SnapshotName = 'counters.json'
+    JournalName = 'counters.journal'
+    FlushInterval = 2.0  # 写日志间隔（秒）
+    CompactBytes = 64 * 1024  # 日志超过该大小时压缩
+    KeepDays = 7  # 压缩时只保留最近几天的数据
+    # 旧版本按 应用名_日期.json 保存的计数文件
+    LegacyPattern = re.compile(r'^(?P<app>.+)_(?P<day>\d{4}-\d{2}-\d{2})\.json$')
+
+    _lock = threading.RLock()
+    _values: Dict[str, Dict[str, int]] = None  # {日期: {键: 值}}
+    _dirty: Dict[str, set] = {}  # {日期: {键}} 未写入日志的键
+    _journalSize = 0
+    _wake = threading.Event()
+    _running = False
+    _atexit = False
+    flushes = 0  # 写日志次数
+    compacts = 0  # 压缩次数
+    loadTime = 0.0  # 加载耗时（秒）
+
+    @classmethod
+    def _path(cls, name: str = None) -> str:
+        dir = os.path.join(_G._G_.rootDir(), cls.Dir)
+        return os.path.join(dir, name) if name else dir
+
+    @classmethod
+    def _today(cls) -> str:
+        return date.today().isoformat()
+
+    @classmethod
+    def _load(cls):
+        """读取快照并回放日志"""
+        log = _G._G_.Log()
+        start = time.time()
+        values = {}
+        snapshot = cls._path(cls.SnapshotName)
+        if os.path.exists(snapshot):
+            try:
+                with open(snapshot, 'r', encoding='utf-8') as f:
+                    values = json.load(f)
+            except Exception as e:
+                log.ex(e, '读取计数快照失败')
+        else:
+            values = cls._loadLegacy()
+        torn = False
+        size = 0
+        journal = cls._path(cls.JournalName)
+        if os.path.exists(journal):
+            with open(journal, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        batch = json.loads(line)
+                    except ValueError:
+                        # 断电时写了一半的行，之后的内容都不可信
+                        torn = True
+                        break
+                    size += len(line.encode('utf-8'))
+                    for day, items in batch.items():
+                        values.setdefault(day, {}).update(items)
+        cls._values = values
+        cls._dirty = {}
+        cls._journalSize = size
+        cls.loadTime = time.time() - start
+        if torn:
+            log.w('计数日志末尾不完整，已忽略')
+            cls.compact()
+
+    @classmethod
+    def _loadLegacy(cls) -> dict:
+        """读取旧版本的计数文件，键为 应用名.原键"""
+        values = {}
+        dir = cls._path()
+        if not os.path.isdir(dir):
+            return values
+        for name in os.listdir(dir):
+            m = cls.LegacyPattern.match(name)
+            if not m:
+                continue
+            try:
+                with open(os.path.join(dir, name), 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                items = values.setdefault(m.group('day'), {})
+                for key, value in data.items():
+                    items[f"{m.group('app')}.{key}"] = int(value)
+            except Exception as e:
+                _G._G_.Log().ex(e, f'读取旧计数文件失败: {name}')
+        return values
+
+    @classmethod
+    def _ensure(cls) -> Dict[str, Dict[str, int]]:
+        if cls._values is None:
+            with cls._lock:
+                if cls._values is None:
+                    cls._load()
+        return cls._values
+
+    @classmethod
+    def get(cls, key: str, default: Optional[int] = 0, day: str = None) -> Optional[int]:
+        """获取计数，day默认为今天"""
+        values = cls._ensure()
+        return values.get(day or cls._today(), {}).get(key, default)
+
+    @classmethod
+    def set(cls, key: str, value: int, day: str = None) -> int:
+        """设置计数"""
+        values = cls._ensure()
+        day = day or cls._today()
+        value = int(value)
+        with cls._lock:
+            items = values.setdefault(day, {})
+            if items.get(key) != value:
+                items[key] = value
+                cls._dirty.setdefault(day, set()).add(key)
+        if not cls._running:
+            cls.start()
+        return value
+
+    @classmethod
+    def add(cls, key: str, delta: int = 1, day: str = None) -> int:
+        """增加计数，返回增加后的值"""
+        with cls._lock:
+            return cls.set(key, cls.get(key, 0, day) + delta, day)
+
+    @classmethod
+    def flush(cls) -> bool:
+        """把变化的键追加到日志"""
+        with cls._lock:
+            if not cls._dirty:
+                return True
+            batch = {day: {k: cls._values[day][k] for k in keys if k in cls._values.get(day, {})}
+                     for day, keys in cls._dirty.items()}
+            line = json.dumps(batch, ensure_ascii=False) + '\n'
+            try:
+                os.makedirs(cls._path(), exist_ok=True)
+                with open(cls._path(cls.JournalName), 'a', encoding='utf-8') as f:
+                    f.write(line)
+                    f.flush()
+                    os.fsync(f.fileno())
+            except Exception as e:
+                # 保留脏标记，下次重试
+                _G._G_.Log().ex(e, '写入计数日志失败')
+                return False
+            cls._dirty = {}
+            cls._journalSize += len(line.encode('utf-8'))
+            cls.flushes += 1
+            if cls._journalSize > cls.CompactBytes:
+                cls.compact()
+            return True
+
+    @classmethod
+    def compact(cls) -> bool:
+        """把全部数据写成快照并清空日志，只保留最近KeepDays天"""
+        with cls._lock:
+            values = cls._ensure()
+            oldest = (date.today() - timedelta(days=cls.KeepDays)).isoformat()
+            for day in [d for d in values if d < oldest]:
+                del values[day]
+                cls._dirty.pop(day, None)
+            snapshot = cls._path(cls.SnapshotName)
+            tmp = snapshot + '.tmp'
+            try:
+                os.makedirs(cls._path(), exist_ok=True)
+                with open(tmp, 'w', encoding='utf-8') as f:
+                    json.dump(values, f, ensure_ascii=False)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, snapshot)
+                # 快照已包含日志中的全部数据，清空后断电也不会丢失
+                open(cls._path(cls.JournalName), 'w').close()
+            except Exception as e:
+                _G._G_.Log().ex(e, '压缩计数日志失败')
+                return False
+            cls._journalSize = 0
+            cls.compacts += 1
+            return True
+
+    @classmethod
+    def start(cls):
+        """启动定时写日志线程"""
+        with cls._lock:
+            if cls._running:
+                return
+            cls._running = True
+            if not cls._atexit:
+                cls._atexit = True
+                atexit.register(lambda: _G._G_.getClassLazy('CCounter').stop())
+        threading.Thread(target=cls._run, daemon=True).start()
+
+    @classmethod
+    def stop(cls):
+        """停止定时写日志，并写入剩余数据"""
+        cls._running = False
+        cls._wake.set()
+        cls.flush()
+
+    @classmethod
+    def _run(cls):
+        while cls._running:
+            cls._wake.wait(cls.FlushInterval)
+            cls._wake.clear()
+            cls.flush()
+
+    @classmethod
+    def stats(cls) -> dict:
+        """计数器统计"""
+        values = cls._ensure()
+        return {
+            'days': len(values),
+            'keys': sum(len(items) for items in values.values()),
+            'pending': sum(len(keys) for keys in cls._dirty.values()),
+            'journal': cls._journalSize,
+            'flushes': cls.flushes,
+            'compacts': cls.compacts,
+            'loadTime': round(cls.loadTime * 1000, 2),
+        }
+
+    @classmethod
+    def onLoad(cls, oldCls):
+        if oldCls:
+            # 热加载时先写入旧类未保存的数据，新类重新读取
+            oldCls.stop()
@@ -1,7 +1,8 @@
-import time
+import base64
 import socketio
 import _G
 import threading
+from collections import deque
 from concurrent.futures import ThreadPoolExecutor
 from typing import cast, List, TYPE_CHECKING, Tuple
 import socketio.exceptions  # 新增导入
@@ -14,6 +15,85 @@ if TYPE_CHECKING:
     from CApp import CApp_
 
 
+class Ticker:
+    """设备更新循环的节拍调度器
+    
+    点击、滑动等操作或页面切换后缩短间隔，尽快检测结果；
+    画面不变时指数退避，减少空转；当前页面配置了超时时，不晚于超时时刻检测。
+    """
+    MinInterval = 0.3   # 操作或页面切换后的间隔
+    BaseInterval = 2.0  # 画面变化时的间隔
+    MaxInterval = 8.0   # 画面不变时退避的最大间隔
+    Window = 30         # 统计最近的节拍数
+
+    def __init__(self):
+        self.interval = self.BaseInterval
+        self._fingerprint = None
+        self._page = None
+        self._tickTime = 0.0
+        self._actionTime = 0.0  # 尚未被检测到的操作时间
+        self._ticks = deque(maxlen=self.Window)
+        self._waits = deque(maxlen=self.Window)
+
+    @classmethod
+    def fingerprint(cls, items: list) -> int:
+        """屏幕信息指纹，文字和位置都不变视为同一画面"""
+        if not items:
+            return 0
+        return hash(tuple((i.get('t'), str(i.get('b'))) for i in items))
+
+    def wait(self, running=lambda: True):
+        """等待到下一次节拍，running返回False时提前结束"""
+        clock = _G._G_.clock
+        end = clock.time() + self.interval
+        while running():
+            left = end - clock.time()
+            if left <= 0:
+                break
+            clock.sleep(min(left, 0.5))
+        now = clock.time()
+        self._tickTime = now
+        self._ticks.append(now)
+        if self._actionTime:
+            self._waits.append(now - self._actionTime)
+            self._actionTime = 0.0
+
+    def update(self, app: 'CApp_'):
+        """根据本次节拍的结果计算下次间隔"""
+        tools = _G._G_.Tools()
+        page = app.curPage if app else None
+        fingerprint = self.fingerprint(tools.getScreenInfoCache())
+        acted = tools.actionTime > self._tickTime
+        if acted:
+            self._actionTime = tools.actionTime
+        if acted or page is not self._page:
+            interval = self.MinInterval
+        elif fingerprint == self._fingerprint:
+            interval = min(self.interval * 2, self.MaxInterval)
+        else:
+            interval = self.BaseInterval
+        timeLeft = page.timeLeft if page else None
+        if timeLeft is not None:
+            interval = min(interval, max(timeLeft, self.MinInterval))
+        self.interval = interval
+        self._fingerprint = fingerprint
+        self._page = page
+
+    def stats(self) -> dict:
+        """节拍统计：实际频率(次/秒)、当前间隔、操作到检测的平均等待(秒)"""
+        ticks = self._ticks
+        rate = 0.0
+        if len(ticks) > 1 and ticks[-1] > ticks[0]:
+            rate = (len(ticks) - 1) / (ticks[-1] - ticks[0])
+        waits = self._waits
+        wait = sum(waits) / len(waits) if waits else 0.0
+        return {
+            'rate': round(rate, 3),
+            'interval': round(self.interval, 3),
+            'wait': round(wait, 3),
+        }
+
+
 class CDevice_(Base_, _Device_):
     _instance = None  # 单例实例
 
@@ -34,6 +114,7 @@ class CDevice_(Base_, _Device_):
         # 统一使用data字典
         self.initialized = False
         self._running = False
+        self.ticker = Ticker()
 
 
     @property
@@ -208,6 +289,8 @@ class CDevice_(Base_, _Device_):
         log = g.Log()
         log.w(f'设备 {self.name} 断开连接')
         self._state = _G.ConnectState.OFFLINE  # 断开连接，状态设为offline
+        # 连接已断开，不会再收到应答
+        g.cancelPending()
 
     def send_command(self, cmd):
         """发送命令到服务器"""
@@ -229,12 +312,17 @@ class CDevice_(Base_, _Device_):
                 log.e("Android环境未初始化")
                 return False
             image = android.takeScreenshot()
-            log.i(f'截图成功: {image}')
-            if image:
-                g.emit("C2S_Screenshot", {
-                       "device_id": self.name, "image": image})
+            if not image or not image.startswith('data:image'):
+                log.e(f'截图失败: {image}')
+                return False
+            # 以二进制附件发送，比base64字符串少1/3的传输量
+            data = base64.b64decode(image.split(',', 1)[1])
+            log.i(f'截图成功: {len(data)} bytes')
+            return g.emit("C2S_Screenshot", {
+                   "device_id": self.name, "image": data})
         except Exception as e:
             log.ex(e, "截图失败")
+            return False
 
     @property
     def name(self):
@@ -550,11 +638,12 @@ class CDevice_(Base_, _Device_):
                             log.e(f"返回桌面失败: {appName}")
                             return False
                         # 等待2秒, 确保回到桌面
-                        time.sleep(2)
+                        g.clock.sleep(2)
                         log.i(f"点击应用: {appName}")
                         return tools.click(appName, 'LR')
                     else:
                         # Android系统使用服务方式打开
+                        tools._onAction()
                         opened = g.android.openApp(appName)
                 return opened
             except Exception as e:
@@ -566,15 +655,27 @@ class CDevice_(Base_, _Device_):
 
     def _update(self):
         """全局应用更新循环 - 客户端版本"""
-        interval = 2
-        while self._running:
-            time.sleep(interval)
-            self.detectApp()
-            app = self.currentApp
-            if app:
-                from CApp import CApp_
-                app = cast(CApp_, app)
-                app.doUpdate()
+        ticker = self.ticker
+        clock = None
+        try:
+            while self._running:
+                # 使用虚拟时钟时，更新循环作为推进时间的线程登记（时钟可能在运行中被替换）
+                if clock is not _G._G_.clock:
+                    if clock:
+                        clock.detach()
+                    clock = _G._G_.clock
+                    clock.attach()
+                ticker.wait(lambda: self._running)
+                self.detectApp()
+                app = self.currentApp
+                if app:
+                    from CApp import CApp_
+                    app = cast(CApp_, app)
+                    app.doUpdate()
+                ticker.update(app)
+        finally:
+            if clock:
+                clock.detach()
 
     def _begin(self):
         """启动全局应用更新循环线程 - 客户端版本"""
@@ -1,5 +1,7 @@
 import os
+import io
 import json
+import zipfile
 import requests
 from typing import Callable
 from threading import Thread
@@ -8,6 +10,8 @@ import _G
 class CFileServer_:
     
     _serverIP = None
+    _remoteEtag = None  # 最近一次获取的服务端清单ETag
+    VersionsName = '.versions.json'  # 增量包中记录完整版本的文件名，与SManifest_一致
 
     @classmethod
     def init(cls, serverIp):
@@ -32,6 +36,11 @@ class CFileServer_:
         def run():
             success = True
             try:
+                count = cls.sync()
+                if count is not None:
+                    log.d(f"更新了{count}个文件")
+                    return True
+                # 服务端不支持增量包，逐个文件下载
                 curVersions = cls.currentVersions()
                 remoteVersions = cls.remoteVersions()
                 # 遍历远程脚本的版本信息
@@ -53,6 +62,8 @@ class CFileServer_:
                     
                 if count > 0:
                     cls.setCurrentVersions(remoteVersions)
+                else:
+                    cls._saveEtag()
                 log.d(f"更新了{count}个文件")
             except Exception as e:
                 log.ex(e, "脚本更新失败")
@@ -66,6 +77,78 @@ class CFileServer_:
         
 
         
+    @classmethod
+    def sync(cls):
+        """增量同步：一次请求取回所有变化文件的zip包并整体应用
+
+        Returns:
+            更新的文件数；服务端不支持增量同步或请求失败时返回None，由调用方逐个文件下载
+        """
+        url = f"{cls.serverUrl()}/sync"
+        headers = {}
+        etag = cls.currentEtag()
+        if etag:
+            headers['If-None-Match'] = f'"{etag}"'
+        try:
+            response = requests.post(url, json={'versions': cls.currentVersions()},
+                                     headers=headers, timeout=30)
+            if response.status_code in (404, 405):
+                return None
+            if response.status_code == 304:
+                return 0
+            response.raise_for_status()
+        except requests.RequestException as e:
+            _G._G_.Log().ex(e, "增量同步失败，改为逐个文件下载")
+            return None
+        cls._remoteEtag = (response.headers.get('ETag') or '').strip('"') or None
+        if response.status_code == 204:
+            cls._saveEtag()
+            return 0
+        return cls._applyArchive(response.content)
+
+    @classmethod
+    def _applyArchive(cls, data: bytes) -> int:
+        """应用增量包：先把所有文件写到临时文件，全部成功后再逐个替换并更新version.txt，
+        中途失败时删除临时文件，本地文件和版本保持不变"""
+        g = _G._G_
+        log = g.Log()
+        rootDir = os.path.abspath(g.rootDir())
+        import CClient
+        write = CClient.CClient_.fromAndroid
+        staged = []
+        try:
+            with zipfile.ZipFile(io.BytesIO(data)) as zf:
+                versions = json.loads(zf.read(cls.VersionsName).decode('utf-8'))
+                names = [n for n in zf.namelist() if n != cls.VersionsName]
+                if write:
+                    for name in names:
+                        target = os.path.abspath(os.path.join(rootDir, name))
+                        if not target.startswith(rootDir + os.sep):
+                            raise ValueError(f"非法路径: {name}")
+                        os.makedirs(os.path.dirname(target), exist_ok=True)
+                        tmp = target + '.sync'
+                        with open(tmp, 'wb') as f:
+                            f.write(zf.read(name))
+                        staged.append((tmp, target))
+        except Exception:
+            for tmp, _ in staged:
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
+            raise
+        for tmp, target in staged:
+            os.replace(tmp, target)
+        versionFile = os.path.join(rootDir, "version.txt")
+        with open(versionFile + '.sync', 'w', encoding='utf-8') as f:
+            json.dump(versions, f)
+        os.replace(versionFile + '.sync', versionFile)
+        cls._saveEtag()
+        if any(n.startswith('scripts/') and n.endswith('.py') for n in names):
+            g.clearScriptNamesCache()
+        log.d(f"增量包应用完成: {len(names)}个文件 ({len(data)} bytes)")
+        return len(names)
+
     @classmethod
     def download(cls, filename, callback: Callable[[bool], None] = None):
         """下载文件
@@ -118,6 +201,24 @@ class CFileServer_:
         version_file = os.path.join(dir, "version.txt")
         with open(version_file, 'w', encoding='utf-8') as f:
             json.dump(versions, f)
+        cls._saveEtag()
+
+    @classmethod
+    def _saveEtag(cls):
+        """记录本地版本对应的服务端清单ETag，下次清单未变化时服务端返回304"""
+        if not cls._remoteEtag or cls._remoteEtag == cls.currentEtag():
+            return
+        path = os.path.join(_G._G_.rootDir(), "version.etag")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(cls._remoteEtag)
+
+    @classmethod
+    def currentEtag(cls):
+        path = os.path.join(_G._G_.rootDir(), "version.etag")
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
             
     @classmethod
     def remoteVersions(cls):
@@ -125,9 +226,18 @@ class CFileServer_:
         url = f"{cls.serverUrl()}/timestamps"
         # print('aaaaaaaaaaaaaaaaaaaaaaaaaa')
         try:
-            response = requests.get(url, timeout=8)
+            headers = {}
+            etag = cls.currentEtag()
+            if etag:
+                headers['If-None-Match'] = f'"{etag}"'
+            response = requests.get(url, timeout=8, headers=headers)
+            if response.status_code == 304:
+                # 服务端清单没有变化，本地版本即为最新
+                cls._remoteEtag = etag
+                return cls.currentVersions()
             response.raise_for_status()
             remote_versions = response.json()
+            cls._remoteEtag = (response.headers.get('ETag') or '').strip('"') or None
             # print(f'22remote_versions={remote_versions}')
             return remote_versions
         except requests.RequestException as e:
@@ -138,6 +248,7 @@ class CFileServer_:
     def onLoad(cls, oldCls):
         if oldCls:
             cls._serverIP = oldCls._serverIP
+            cls._remoteEtag = oldCls._remoteEtag
 
  
     @classmethod
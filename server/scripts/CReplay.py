@@ -0,0 +1,313 @@
+import json
+import os
+import threading
+import time
+from typing import Optional
+import _G
+
+
+class TickTimer:
+    """回放时统计每个节拍中各阶段的耗时
+
+    回放期间把CApp_.doUpdate中各阶段的方法替换为计时包装，结束后恢复。
+    """
+    # (阶段名, 模块名, 方法名)
+    Phases = [
+        ('tick', 'CApp', 'doUpdate'),
+        ('toast', 'CApp', 'detectToast'),
+        ('detect', 'CApp', 'detectPage'),
+        ('goPath', 'CApp', '_updateGoPath'),
+        ('page', '_Page', 'update'),
+    ]
+
+    def __init__(self):
+        self.costs = {name: [] for name, _, _ in self.Phases}  # {阶段: [每个节拍的耗时]}
+        self._tick = {}
+        self._patched = []
+
+    def install(self):
+        g = _G._G_
+        for name, moduleName, methodName in self.Phases:
+            cls = g.getClassLazy(moduleName)
+            original = cls.__dict__.get(methodName)
+            if original is None:
+                continue
+            setattr(cls, methodName, self._wrap(name, original))
+            self._patched.append((cls, methodName, original))
+
+    def uninstall(self):
+        for cls, methodName, original in reversed(self._patched):
+            setattr(cls, methodName, original)
+        self._patched = []
+
+    def _wrap(self, name, func):
+        tick = self._tick
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                tick[name] = tick.get(name, 0.0) + time.perf_counter() - start
+        return timed
+
+    def begin(self):
+        self._tick.clear()
+
+    def end(self) -> dict:
+        """结束一个节拍，返回该节拍各阶段耗时(ms)"""
+        tick = {name: round(self._tick.get(name, 0.0) * 1000, 3) for name in self.costs}
+        for name, cost in tick.items():
+            self.costs[name].append(cost)
+        return tick
+
+    def summary(self) -> dict:
+        """各阶段耗时统计(ms)：平均、P95、最大、合计"""
+        result = {}
+        for name, costs in self.costs.items():
+            if not costs:
+                continue
+            ordered = sorted(costs)
+            result[name] = {
+                'avg': round(sum(costs) / len(costs), 3),
+                'p95': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+                'max': ordered[-1],
+                'total': round(sum(costs), 3),
+            }
+        return result
+
+
+class CReplay_:
+    """设备会话的录制和回放
+
+    录制：设备更新循环每个节拍记录一帧（当前应用、屏幕信息、时间、检测到的页面），
+    每帧一行JSON写入 data/sessions/<名称>.jsonl，屏幕信息与上一帧相同时不重复保存。
+    回放：在PC上（没有android）按录制顺序把每帧的应用和屏幕信息设置为当前帧，
+    再执行CApp_.doUpdate，统计每个节拍各阶段的耗时和页面检测结果，
+    并与录制时检测到的页面对比，用于比较规则引擎修改前后的行为。
+    speed为回放速度倍数，0表示不等待、尽快回放。
+    使用虚拟时钟（g.setClock(VirtualClock())）时每帧把时钟推进到录制时的时刻，
+    页面超时、任务时长等按录制的时间计算，不需要真实等待。
+    """
+    Dir = 'sessions'
+    Version = 1
+
+    _lock = threading.Lock()
+    _file = None
+    _path: Optional[str] = None
+    _startTime = 0.0
+    _lastItems = None
+    _frames = 0
+
+    @classmethod
+    def path(cls, name: str) -> str:
+        if not name.endswith('.jsonl'):
+            name += '.jsonl'
+        return os.path.join(_G._G_.dataDir(cls.Dir), name)
+
+    @classmethod
+    def isRecording(cls) -> bool:
+        return cls._file is not None
+
+    @classmethod
+    def start(cls, name: str = None) -> str:
+        """开始录制，返回录制文件路径"""
+        g = _G._G_
+        cls.stop()
+        name = name or time.strftime('%Y-%m-%d_%H-%M-%S')
+        path = cls.path(name)
+        with cls._lock:
+            cls._file = open(path, 'w', encoding='utf-8')
+            cls._path = path
+            cls._startTime = time.time()
+            cls._lastItems = None
+            cls._frames = 0
+            device = g.CDevice()
+            # 应用列表来自服务端登录数据，保存下来供离线回放时创建应用
+            apps = [app.data for name, app in device.apps.items() if name != _G.TOP]
+            header = {'version': cls.Version, 'device': device.name,
+                      'start': time.strftime('%Y-%m-%d %H:%M:%S'), 'apps': apps}
+            cls._file.write(json.dumps(header, ensure_ascii=False, default=str) + '\n')
+        g.Log().i(f'开始录制: {path}')
+        return path
+
+    @classmethod
+    def stop(cls):
+        """停止录制，返回(录制文件路径, 帧数)"""
+        with cls._lock:
+            if cls._file is None:
+                return None, 0
+            cls._file.close()
+            cls._file = None
+            return cls._path, cls._frames
+
+    @classmethod
+    def record(cls, app, items: list, cost: float):
+        """记录一帧，由CApp_.doUpdate在每个节拍结束时调用
+        Args:
+            app: 当前应用
+            items: 本节拍开始时读取的屏幕信息
+            cost: 本节拍耗时（秒）
+        """
+        if cls._file is None:
+            return
+        try:
+            device = _G._G_.CDevice()
+            frame = {
+                't': round(time.time() - cls._startTime, 3),
+                'app': device.curAppInfo if device else {'appName': app.name},
+                'page': app.curPage.name if app.curPage else None,
+                'cost': round(cost * 1000, 3),
+            }
+            with cls._lock:
+                if cls._file is None:
+                    return
+                if items == cls._lastItems:
+                    frame['same'] = 1
+                else:
+                    frame['items'] = items
+                    cls._lastItems = items
+                cls._file.write(json.dumps(frame, ensure_ascii=False) + '\n')
+                cls._file.flush()
+                cls._frames += 1
+        except Exception as e:
+            _G._G_.Log().ex(e, '录制帧失败')
+
+    @classmethod
+    def load(cls, name: str):
+        """读取录制文件，返回(文件头, 帧列表)，每帧都带完整的屏幕信息"""
+        path = name if os.path.isfile(name) else cls.path(name)
+        frames = []
+        items = []
+        with open(path, 'r', encoding='utf-8') as f:
+            header = json.loads(f.readline())
+            if header.get('version') != cls.Version:
+                raise ValueError(f'不支持的录制文件版本: {header.get("version")}')
+            for line in f:
+                try:
+                    frame = json.loads(line)
+                except ValueError:
+                    # 录制中断时最后一行可能不完整
+                    break
+                if 'items' in frame:
+                    items = frame['items']
+                else:
+                    frame['items'] = items
+                frames.append(frame)
+        return header, frames
+
+    @classmethod
+    def fromSnapshots(cls, name: str, appName: str, pageNames: list, interval: float = 2.0) -> str:
+        """用保存的屏幕信息快照生成录制文件
+
+        快照按 data/screenshots/<页面名>.json（SDevice_._saveScreenInfoToFile保存的位置）、
+        data/<页面名>.json 的顺序查找。每个快照作为一帧，帧间隔interval秒，
+        期望检测到的页面为快照名（Last除外）。
+        Returns:
+            str: 录制文件路径
+        """
+        g = _G._G_
+        dirs = [g.dataDir('screenshots'), g.getDir('data')]
+        path = cls.path(name)
+        with open(path, 'w', encoding='utf-8') as f:
+            header = {'version': cls.Version, 'device': None,
+                      'start': time.strftime('%Y-%m-%d %H:%M:%S'), 'apps': [{'name': appName}]}
+            f.write(json.dumps(header, ensure_ascii=False) + '\n')
+            for i, pageName in enumerate(pageNames):
+                fileName = next((os.path.join(d, f'{pageName}.json') for d in dirs
+                                 if os.path.exists(os.path.join(d, f'{pageName}.json'))), None)
+                if fileName is None:
+                    raise FileNotFoundError(f'屏幕信息快照不存在: {pageName}')
+                with open(fileName, 'r', encoding='utf-8') as snapshot:
+                    items = json.load(snapshot)
+                frame = {'t': round(i * interval, 3), 'app': {'appName': appName}, 'items': items}
+                if pageName != 'Last':
+                    frame['page'] = pageName
+                f.write(json.dumps(frame, ensure_ascii=False) + '\n')
+        return path
+
+    @classmethod
+    def replay(cls, name: str, speed: float = 0) -> dict:
+        """回放录制文件
+        Args:
+            name: 录制名称或文件路径
+            speed: 回放速度倍数，0表示尽快回放
+        Returns:
+            dict: 回放报告，包括各阶段耗时统计、页面切换和与录制时不一致的帧
+        """
+        g = _G._G_
+        log = g.Log()
+        tools = g.Tools()
+        device = g.CDevice()
+        header, frames = cls.load(name)
+        if not device.apps and header.get('apps'):
+            device._initApps(header['apps'])
+        timer = TickTimer()
+        decisions = []  # 页面切换 (帧序号, 时间, 应用, 原页面, 新页面)
+        mismatches = []  # 与录制时检测结果不一致 (帧序号, 录制的页面, 回放的页面)
+        lastPage = None
+        clock = g.clock
+        base = clock.time()
+        start = time.time()
+        timer.install()
+        try:
+            for i, frame in enumerate(frames):
+                if clock.virtual:
+                    clock.advanceTo(base + frame['t'])
+                elif speed > 0:
+                    wait = start + frame['t'] / speed - time.time()
+                    if wait > 0:
+                        time.sleep(wait)
+                device.setCurApp(frame['app'])
+                tools._setScreenInfos(frame['items'])
+                app = device.currentApp
+                timer.begin()
+                if app:
+                    app.doUpdate()
+                timer.end()
+                page = app.curPage.name if app and app.curPage else None
+                key = (app.name if app else None, page)
+                if key != lastPage:
+                    decisions.append((i, frame['t'], key[0], lastPage[1] if lastPage else None, page))
+                    lastPage = key
+                if 'page' in frame and frame['page'] != page:
+                    mismatches.append((i, frame['page'], page))
+        finally:
+            timer.uninstall()
+        cost = time.time() - start
+        log.i(f'回放完成: {name}, {len(frames)}帧, 耗时{cost:.3f}秒')
+        return {
+            'frames': len(frames),
+            'duration': frames[-1]['t'] if frames else 0,
+            'cost': round(cost, 3),
+            'phases': timer.summary(),
+            'recorded': round(sum(f.get('cost', 0) for f in frames) / len(frames), 3) if frames else 0,
+            'decisions': decisions,
+            'mismatches': mismatches,
+        }
+
+    @classmethod
+    def format(cls, report: dict) -> str:
+        """回放报告转为文本"""
+        lines = [f"帧数: {report['frames']}, 录制时长: {report['duration']}秒, "
+                 f"回放耗时: {report['cost']}秒, 录制时平均节拍: {report['recorded']}ms",
+                 f"{'阶段':<8} {'平均(ms)':>10} {'P95':>10} {'最大':>10} {'合计':>10}"]
+        for name, s in report['phases'].items():
+            lines.append(f"{name:<8} {s['avg']:>10} {s['p95']:>10} {s['max']:>10} {s['total']:>10}")
+        lines.append(f"页面切换 {len(report['decisions'])} 次:")
+        for i, t, appName, old, new in report['decisions']:
+            lines.append(f"  #{i} {t}s {appName}: {old} -> {new}")
+        lines.append(f"与录制不一致 {len(report['mismatches'])} 帧:")
+        for i, recorded, page in report['mismatches']:
+            lines.append(f"  #{i} 录制: {recorded}, 回放: {page}")
+        return '\n'.join(lines)
+
+    @classmethod
+    def onLoad(cls, oldCls):
+        if oldCls and oldCls._file:
+            # 热加载时继续写同一个录制文件
+            cls._file = oldCls._file
+            cls._path = oldCls._path
+            cls._startTime = oldCls._startTime
+            cls._lastItems = oldCls._lastItems
+            cls._frames = oldCls._frames
@@ -5,6 +5,7 @@ import os
 import json
 from datetime import datetime
 from typing import List
+from _Tools import SpatialIndex
 
 class CScore_:
    
@@ -94,55 +95,41 @@ class CScore_:
         return date_items, amount_items, name_items
 
     @classmethod
-    def _findClosestDate(cls, amount_item: dict, date_items: list) -> dict:
-        """为金额项目找到最近的日期"""
-        closest_date = None
-        min_distance = float('inf')
-        
-        for date_item in date_items:
-            dx = abs(amount_item['x1'] - date_item['x1'])
-            dy = abs(amount_item['y1'] - date_item['y1'])
-            distance = dx + dy * 0.5
-            
-            if date_item['y1'] <= amount_item['y1'] + 200 and distance < min_distance:
-                closest_date = date_item
-                min_distance = distance
+    def _anchorIndex(cls, items: list) -> SpatialIndex:
+        """以项目左上角(x1, y1)为点建立空间索引"""
+        return SpatialIndex(items, [(i['x1'], i['y1'], i['x1'], i['y1']) for i in items])
+
+    @classmethod
+    def _findClosestDate(cls, amount_item: dict, date_items: list, index: SpatialIndex = None) -> dict:
+        """为金额项目找到最近的日期
         
-        return closest_date
+        Args:
+            index: 日期项目的空间索引，不提供时临时建立
+        """
+        if index is None:
+            index = cls._anchorIndex(date_items)
+        maxY = amount_item['y1'] + 200
+        found = index.nearest(amount_item['x1'], amount_item['y1'], 1, 1.0, 0.5,
+                              lambda date_item: date_item['y1'] <= maxY)
+        return found[0] if found else None
 
     @classmethod
-    def _findClosestName(cls, amount_item: dict, name_items: list) -> dict:
-        """为金额项目找到最近的名字"""
-        closest_name = None
-        min_distance = float('inf')
+    def _findClosestName(cls, amount_item: dict, name_items: list, index: SpatialIndex = None) -> dict:
+        """为金额项目找到最近的名字
         
+        Args:
+            index: 有效名字项目的空间索引，不提供时临时建立
+        """
+        if index is None:
+            index = cls._anchorIndex([i for i in name_items if cls._isValidNameText(i['t'])])
+        x, y = amount_item['x1'], amount_item['y1']
         # 优先找同行左方的名字
-        for name_item in name_items:
-            if not cls._isValidNameText(name_item['t']):
-                continue
-                
-            if abs(name_item['y1'] - amount_item['y1']) <= 50:
-                dx = amount_item['x1'] - name_item['x1']
-                if 0 < dx < 800 and dx < min_distance:
-                    closest_name = name_item
-                    min_distance = dx
-        
+        same_row = [i for i in index.within(x - 800, y - 50, x, y + 50) if 0 < x - i['x1'] < 800]
+        if same_row:
+            return min(same_row, key=lambda i: x - i['x1'])
         # 如果没找到同行的，找上方的名字
-        if not closest_name:
-            for name_item in name_items:
-                if not cls._isValidNameText(name_item['t']):
-                    continue
-                    
-                dx = abs(amount_item['x1'] - name_item['x1'])
-                dy = amount_item['y1'] - name_item['y1']
-                
-                if 0 < dy <= 200:
-                    distance = dx + dy * 0.5
-                    if distance < min_distance:
-                        closest_name = name_item
-                        min_distance = distance
-        
-        return closest_name
+        found = index.nearest(x, y, 1, 1.0, 0.5, lambda i: 0 < y - i['y1'] <= 200)
+        return found[0] if found else None
 
     @classmethod
     def _isValidNameText(cls, text: str) -> bool:
@@ -170,13 +157,16 @@ class CScore_:
             records: 匹配到的记录列表
         """
         records = []
+        # 日期和名字各建一次空间索引，每个金额只访问附近的项目
+        date_index = cls._anchorIndex(dates)
+        name_index = cls._anchorIndex([i for i in names if cls._isValidNameText(i['t'])])
         
         for amount in amounts:
-            closest_date = cls._findClosestDate(amount, dates)
+            closest_date = cls._findClosestDate(amount, dates, date_index)
             if not closest_date:
                 continue
                 
-            closest_name = cls._findClosestName(amount, names)
+            closest_name = cls._findClosestName(amount, names, name_index)
             if not closest_name:
                 continue
             
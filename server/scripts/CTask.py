@@ -1,7 +1,6 @@
 import json
 import os
 from datetime import datetime
-import time
 from _G import TaskState
 import _G
 from typing import TYPE_CHECKING
@@ -22,7 +21,7 @@ class CTask_(Task_, Base_):
         if not name:
             raise ValueError(f"任务名称不能为空: {data}")
         super().__init__(data)
-        self._startTime = datetime.now()
+        self._startTime = _G._G_.clock.now()
         self._lastInPage: bool = False
         self._interval: int = None
         self._deltaTime: int = 0
@@ -36,6 +35,7 @@ class CTask_(Task_, Base_):
         self._oldValues = data.copy()
         self._updateInterval = 5  # 更新间隔，默认5秒
         self._lastUpdateTime = 0  # 上次更新时间
+        self._restoreProgress()
 
     @property
     def score(self):
@@ -67,6 +67,18 @@ class CTask_(Task_, Base_):
     @progress.setter
     def progress(self, value:int):
         self.setDBProp('progress', value)
+        # 本地计数器保存进度，重启后不用等服务端同步
+        _G._G_.CCounter().set(self._counterKey, value)
+
+    @property
+    def _counterKey(self) -> str:
+        return f'T_{self.name}'
+
+    def _restoreProgress(self):
+        """从本地计数器恢复当天的进度（上次重启前未同步到服务端的部分）"""
+        saved = _G._G_.CCounter().get(self._counterKey, None)
+        if saved is not None and saved > self.progress:
+            self.setDBProp('progress', saved)
 
     
     @classmethod
@@ -250,11 +262,13 @@ class CTask_(Task_, Base_):
                 # 执行begin脚本（使用属性访问）
                 if self.beginScript:
                     try:
-                        exec(self.beginScript)
+                        # 使用缓存的代码对象，执行环境与直接exec相同
+                        exec(g.Tools().compileScript(self.beginScript), globals(),
+                             {'self': self, 'life': life, 'g': g, 'log': log})
                     except Exception as e:
                         log.ex(e, f"执行任务开始脚本失败: {e}")
             self.state = TaskState.RUNNING
-            self._startTime = datetime.now()
+            self._startTime = g.clock.now()
             self._lastTime = self._startTime
             if not self._Do(g):
                 log.e(f"任务{self.name}执行失败")
@@ -331,7 +345,7 @@ class CTask_(Task_, Base_):
                     return False
         if self.isDirty:
             # 检查更新间隔时间
-            currentTime = time.time()
+            currentTime = g.clock.time()
             if currentTime - self._lastUpdateTime >= self._updateInterval:
                 # 比较新旧值，只发送有变化的字段
                 changed = {}
@@ -348,7 +362,7 @@ class CTask_(Task_, Base_):
         if self.interval > 0:
             waitTime = self.interval - self._deltaTime or 0
             if waitTime > 0:
-                time.sleep(waitTime)
+                g.clock.sleep(waitTime)
         if not self._Do(g):
             g.Log().e(f"任务{self.name}执行失败")
             return False
@@ -366,7 +380,7 @@ class CTask_(Task_, Base_):
         progress = self.progress
         if life > 0:  # 时间模式
             # 计算当前会话运行时间
-            curTime = datetime.now()
+            curTime = g.clock.now()
             self._deltaTime = (curTime - self._lastTime).total_seconds()
             self._lastTime = curTime
             # 累加到总进度中
@@ -2,11 +2,28 @@ import functools
 import threading
 import uuid
 import inspect
+from datetime import datetime
 from typing import Dict, Any, Optional, Callable, ClassVar
 import _G
 
+class RpcEntry:
+    """RPC分派表项：注册时预先解析好的方法、参数转换器和实例获取器"""
+    __slots__ = ('className', 'methodName', 'func', 'converters', 'resolver')
+
+    def __init__(self, cls, methodName: str, func):
+        self.className = cls.__name__
+        self.methodName = methodName
+        self.func = func
+        self.converters = _buildConverters(func)
+        self.resolver = _instResolver(self.className)
+
+
 class RPCManager:
-    """RPC管理器 - 处理RPC方法注册和调用"""
+    """RPC管理器 - 处理RPC方法注册和调用
+
+    注册类时为每个RPC方法生成分派表项，以"类名.方法名"为键。
+    调用时只做一次字典查找，再执行预先生成的参数转换器，不再每次分析函数签名。
+    """
     
     _instance = None
     _lock = threading.Lock()
@@ -24,81 +41,69 @@ class RPCManager:
             return
         self._rpcMethods: Dict[str, Dict[str, Callable]] = {}  # {className: {methodName: method}}
         self._rpcClasses: Dict[str, type] = {}  # {className: class}
+        self._dispatch: Dict[str, RpcEntry] = {}  # {"className.methodName": RpcEntry}
         self._pendingCalls: Dict[str, Any] = {}  # {requestId: result}
         self._callLock = threading.Lock()
         self._initialized = True
     
     def registerRpcClass(self, cls):
-        """注册RPC类
+        """注册RPC类，重复注册（热加载）时替换该类原有的分派表项
         
         Args:
             cls: 要注册的类
         """
         className = cls.__name__
-        if className not in self._rpcMethods:
-            self._rpcMethods[className] = {}
-        
-        # 存储类对象
-        self._rpcClasses[className] = cls
-        
+        methods = {}
+        dispatch = {}
         # 扫描类中的RPC方法
         for methodName in dir(cls):
             method = getattr(cls, methodName)
             if hasattr(method, '_is_rpc_method'):
-                self._rpcMethods[className][methodName] = method
-                
+                methods[methodName] = method
+                dispatch[f'{className}.{methodName}'] = RpcEntry(cls, methodName, method)
+        with self._callLock:
+            # 整体替换，调用方不会看到一半新一半旧的分派表
+            table = {k: v for k, v in self._dispatch.items()
+                     if v.className != className}
+            table.update(dispatch)
+            self._rpcClasses[className] = cls
+            self._rpcMethods[className] = methods
+            self._dispatch = table
+
+    def reloadClass(self, cls):
+        """热加载后重新注册已注册过的类"""
+        if cls and cls.__name__ in self._rpcClasses:
+            self.registerRpcClass(cls)
 
-    
     def callRpcMethod(self, className: str, methodName: str, params: dict):
         """调用RPC方法"""
-        g = _G._G_
-        log = g.Log()
-        
         try:
             className = _G._G_.toClassName(className)
-            method = self._rpcMethods.get(className, {}).get(methodName)
-            if not method:
-                # log.e(f"RPC方法不存在: {className}.{methodName}")
+            entry = self._dispatch.get(f'{className}.{methodName}')
+            if entry is None:
                 return {
                     'error': f'RPC方法不存在: {className}.{methodName}'
                 }
-            
-            # 获取实例 - 直接使用通用的getInst函数
-            cls = self._rpcClasses.get(className)
-            if not cls:
-                return {
-                    'error': f'RPC类未注册: {className}'
-                }
             instance = None
             if not params:
                 params = {}
             instanceID = params.get('id')
-            # print(f'instanceID: {instanceID}')
             if instanceID is not None:
                 del params['id']
-                instance = getInst(cls, instanceID)
+                instance = entry.resolver(instanceID) if entry.resolver else None
                 if instance is None:
                     return {
                         'error': f'RPC实例不存在: {className}, id={instanceID}'
-                    } 
-            # 自动类型转换处理  
-            if cls:
-                original_method = getattr(cls, methodName, None)
-                if original_method:
-                    params = self._convertRpcTypes(original_method, params)
-            
-            # 智能方法调用逻辑：根据方法类型选择合适的调用方式
-            if cls:
-                # 从类对象获取原始方法定义
-                original_method = getattr(cls, methodName, None)
-                if original_method:
-                    result = self._callMethod(original_method, cls, instance, params)
-                else:
-                    # 回退到使用注册时获取的method
-                    result = self._callMethod(method, cls, instance, params)
+                    }
+            # 自动类型转换处理
+            for name, convert in entry.converters:
+                if name in params:
+                    params[name] = convert(params[name])
+            # 有实例时作为实例方法调用，否则是类方法或静态方法
+            if instance:
+                result = entry.func(instance, **params)
             else:
-                # 没有类对象，直接调用method
-                result = self._callMethod(method, None, instance, params)
+                result = entry.func(**params)
             
             # 检查方法返回值是否已经是标准格式
             if isinstance(result, dict) and ('error' in result or 'result' in result):
@@ -109,119 +114,89 @@ class RPCManager:
                     'result': result,
                 }
         except Exception as e:
-            log.ex(e, f"RPC方法调用失败: {className}.{methodName}")
+            _G._G_.Log().ex(e, f"RPC方法调用失败: {className}.{methodName}")
             return {
                 'error': str(e),
             }
-    
-    def _convertRpcTypes(self, method, kwargs: dict):
-        """自动转换RPC参数类型
-        
-        Args:
-            method: 目标方法对象，用于获取参数类型注解信息  
-            kwargs: 关键字参数字典
-            
-        Returns:
-            转换后的kwargs字典
-        """
-        import inspect
-        import _G
-        try:
-            # 获取方法签名
-            sig = inspect.signature(method)
-            params = sig.parameters
-            
-            # 转换关键字参数
-            converted_kwargs = {}
-            for key, value in kwargs.items():
-                if key in params:
-                    param = params[key]
-                    # 跳过self/cls参数的类型转换
-                    if key in ['self', 'cls']:
-                        converted_kwargs[key] = value
-                    else:
-                        converted_value = self._convertSingleType(value, param.annotation)
-                        converted_kwargs[key] = converted_value
-                else:
-                    converted_kwargs[key] = value
-            
-            return converted_kwargs
-            
-        except Exception as e:
-            # 如果类型转换失败，返回原始参数
-            g = _G._G_
-            g.Log().ex(e, f"RPC类型转换失败: {method}")
-            return kwargs
-    
-    def _convertSingleType(self, value, annotation):
-        """转换单个值的类型
-        
-        Args:
-            value: 要转换的值
-            annotation: 目标类型注解
-            
-        Returns:
-            转换后的值
-        """
-        from datetime import datetime, date
-        import _G
-        
-        # 如果没有类型注解或值为None，直接返回
-        if annotation == inspect.Parameter.empty or value is None:
-            return value
-        
-        # 如果已经是目标类型，直接返回
-        if isinstance(value, annotation):
-            return value
-        
-        # 字符串转datetime
-        if annotation == datetime and isinstance(value, str):
-            try:
-                return _G.DateHelper.toDate(value)
-            except Exception:
-                # g.Log().ex(e, f"字符串转datetime失败: {value}")
-                return value
-
-        # # 字符串转date
-        # if annotation == date and isinstance(value, str):
-        #     try:
-        #         dt = _G.DateHelper.toDate(value)
-        #         return dt.date() if dt else value
-        #     except Exception:
-        #         return value
-        
-        # 其他类型转换可以在这里添加
-        # ...
-        
+
+
+def _toDatetime(value):
+    """字符串转datetime，转换失败保留原值"""
+    if not isinstance(value, str):
         return value
-    
-    def _callMethod(self, method, cls_obj, instance, params: dict):
-        """调用方法，支持实例方法、类方法和静态方法
-        
-        Args:
-            method: 要调用的方法
-            cls_obj: 类对象（可选）
-            instance: 实例对象（可选）
-            params: 参数字典
-        
-        Returns:
-            方法调用结果
-        """
-        # 如果有实例对象，优先作为实例方法调用
-        if instance:
-            return method(instance, **params)
-        
-        # 检查是否是已绑定的方法（类方法或实例方法）
-        elif hasattr(method, '__self__'):
-            return method(**params)
-        
-        # 默认作为静态方法或函数调用
-        else:
-            return method(**params)
+    try:
+        return _G.DateHelper.toDate(value)
+    except Exception:
+        return value
+
+
+# 参数类型注解对应的转换器，没有列出的类型不做转换
+_Converters = {
+    datetime: _toDatetime,
+}
+
+
+def _buildConverters(func) -> tuple:
+    """根据方法签名生成参数转换器 ((参数名, 转换函数), ...)"""
+    try:
+        params = inspect.signature(func).parameters
+    except (TypeError, ValueError) as e:
+        _G._G_.Log().ex(e, f"RPC方法签名分析失败: {func}")
+        return ()
+    converters = []
+    for name, param in params.items():
+        if name in ('self', 'cls'):
+            continue
+        try:
+            convert = _Converters.get(param.annotation)
+        except TypeError:
+            # 不可哈希的类型注解
+            convert = None
+        if convert:
+            converters.append((name, convert))
+    return tuple(converters)
+
 
 # 全局RPC管理器实例
 rpcManager = RPCManager()
 
+def _getAppInst(id):
+    from _App import _App_
+    return _App_.get(id)
+
+
+def _getDeviceInst(id):
+    from _Device import _Device_
+    return _Device_.get(id)
+
+
+# 类名对应的实例获取器
+_Resolvers = {
+    '_App_': _getAppInst,
+    'SApp_': _getAppInst,
+    'CDevice_': _getDeviceInst,
+    'SDevice_': _getDeviceInst,
+    '_Device_': _getDeviceInst,
+}
+
+
+def _instResolver(className: str) -> Optional[Callable]:
+    """获取类名对应的实例获取器，不支持的类返回None"""
+    if className in ('CTask_', 'STask_', 'Task_'):
+        return _getTaskInst
+    resolver = _Resolvers.get(className)
+    if resolver is None:
+        return None
+
+    def resolve(id):
+        try:
+            return resolver(id)
+        except Exception as e:
+            _G._G_.Log().ex(e, f"获取默认实例失败: {className}")
+            return None
+    return resolve
+
+
 def getInst(cls, id=None):
     """默认实例获取器，支持App、Device、Task类的实例获取
     
@@ -234,31 +209,11 @@ def getInst(cls, id=None):
     """
     if id is None:
         return None
-    g = _G._G_
-    log = g.Log()
-    
-    try:
-        className = cls.__name__
-        # App类实例获取
-        if className in ['_App_', 'SApp_']:
-            from _App import _App_
-            return _App_.get(id)
-        # Device类实例获取
-        elif className in ['CDevice_', 'SDevice_', '_Device_']:
-            from _Device import _Device_
-            return _Device_.get(id)
-        
-        # Task类实例获取  
-        elif className in ['CTask_', 'STask_', 'Task_']:
-            return _getTaskInst(id)
-        
-        else:
-            log.w(f"不支持实例类型: {className}")
-            return None
-            
-    except Exception as e:
-        log.ex(e, f"获取默认实例失败: {className}")
+    resolver = _instResolver(cls.__name__)
+    if resolver is None:
+        _G._G_.Log().w(f"不支持实例类型: {cls.__name__}")
         return None
+    return resolver(id)
 
 def _getTaskInst(id=None):
     """获取Task实例"""
@@ -390,9 +345,10 @@ def _callRpcToClient(strDeviceID: str, rpcData: dict, timeout: int):
     try:
         # 先根据deviceID获取Device对象
         deviceMgr = g.SDeviceMgr()
-        devices = deviceMgr.devices
-        deviceID = int(strDeviceID)
-        device = next((d for d in devices if d.id == deviceID and d.isConnected()), None)
+        # 只按id查找，不能退回按名称查找（名称可能恰好是数字）
+        device = deviceMgr.getById(int(strDeviceID))
+        if device and (device.isConsole or not device.isConnected()):
+            device = None
         if not device:
             return {
                 'success': False,
@@ -172,6 +172,35 @@ class SCmds_:
                 _Log._Log_.ex(e, '保存日志失败')
                 return f'e~保存日志失败: {str(e)}'
 
+        @regCmd('#写入统计|xrtj')
+        def writeStats():
+            """功能：查看数据库延迟写入的统计
+            指令名：writeStats
+            中文名：写入统计
+            参数：无
+            示例：写入统计
+            """
+            from SModels import writeBehind
+            stats = writeBehind.stats()
+            return (f"待写入: {stats['pending']}行, 已写入: {stats['rows']}行/{stats['flushes']}次, "
+                    f"失败: {stats['errors']}次, 耗时(ms) 最近: {stats['lastLatency']} "
+                    f"平均: {stats['avgLatency']} 最大: {stats['maxLatency']}")
+
+        @regCmd('#截图统计|jttj')
+        def screenshotStats():
+            """功能：查看截图后台写入的统计
+            指令名：screenshotStats
+            中文名：截图统计
+            参数：无
+            示例：截图统计
+            """
+            from SDevice import screenshotWriter
+            stats = screenshotWriter.stats()
+            return (f"待写入: {stats['pending']}, 收到: {stats['received']}, 写入: {stats['written']}, "
+                    f"丢弃: {stats['dropped']}, 清理: {stats['removed']}, 失败: {stats['errors']}, "
+                    f"平均大小: {stats['avgBytes']}B, 处理耗时(ms) 平均: {stats['avgHandle']} "
+                    f"最大: {stats['maxHandle']}, 写入耗时(ms) 平均: {stats['avgWrite']}")
+
         @regCmd('#保存结果|bcjg')
         def saveResult():
             """功能：保存最近一次命令执行结果到JSON文件
@@ -1,6 +1,9 @@
+from collections import deque
 from datetime import datetime
 import json 
 import os
+import threading
+import time
 from typing import TYPE_CHECKING, Dict
 from SModels import DeviceModel_, TaskModel_
 import _Log
@@ -15,6 +18,192 @@ if TYPE_CHECKING:
     from STask import STask_
     from SApp import SApp_
 
+class ScreenshotWriter:
+    """截图后台写入：事件处理中只把截图放入队列，由后台线程写文件、生成缩略图，
+    并按设备限制保留的截图数量和总大小
+
+    eventlet模式下文件读写和缩略图生成放到线程池(tpool)中执行，不阻塞协程调度。
+    """
+    MaxPending = 20                # 待写入上限，超出时丢弃最旧的截图
+    MaxCount = 200                 # 每台设备保留的截图数
+    MaxBytes = 100 * 1024 * 1024   # 每台设备截图总大小上限（含缩略图）
+    ThumbSize = (320, 320)
+    ThumbDir = 'thumbs'
+
+    def __init__(self):
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._running = False
+        self._files = {}  # {设备id: [deque[(文件名, 大小)], 总大小]}，按时间排序
+        self.received = 0    # 收到的截图数
+        self.written = 0     # 写入的截图数
+        self.dropped = 0     # 队列满丢弃数
+        self.removed = 0     # 超出保留限制删除数
+        self.errors = 0
+        self.wireBytes = 0   # 收到的截图字节数
+        self._handleTime = 0.0  # 事件处理中的耗时合计（秒）
+        self.maxHandleTime = 0.0
+        self._writeTime = 0.0   # 后台写入耗时合计（秒）
+
+    def put(self, device: 'SDevice_', image) -> bool:
+        """放入待写入队列
+
+        Args:
+            image: 图片二进制数据；旧客户端发送的data:image开头的base64字符串也可以，解码在后台进行
+        """
+        start = time.perf_counter()
+        if isinstance(image, str):
+            if not image.startswith('data:image'):
+                return False
+        elif not isinstance(image, (bytes, bytearray)):
+            return False
+        with self._lock:
+            if len(self._queue) >= self.MaxPending:
+                self._queue.popleft()
+                self.dropped += 1
+            self._queue.append((device, image, datetime.now()))
+            self.received += 1
+            self.wireBytes += len(image)
+        if not self._running:
+            self.start()
+        self._wake.set()
+        cost = time.perf_counter() - start
+        self._handleTime += cost
+        self.maxHandleTime = max(self.maxHandleTime, cost)
+        return True
+
+    def start(self):
+        """启动后台写入线程"""
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def stop(self):
+        self._running = False
+        self._wake.set()
+
+    def _run(self):
+        while self._running:
+            self._wake.wait()
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        """写入队列中的所有截图"""
+        while True:
+            with self._lock:
+                if not self._queue:
+                    return
+                device, image, t = self._queue.popleft()
+            start = time.perf_counter()
+            try:
+                name, thumb = self._offload(self._write, device.id, image, t)
+                self.written += 1
+                device.onScreenshotSaved(name, thumb, t)
+            except Exception as e:
+                self.errors += 1
+                _Log._Log_.ex(e, "保存截图失败")
+            self._writeTime += time.perf_counter() - start
+
+    @classmethod
+    def _offload(cls, func, *args):
+        """eventlet模式下在真实线程中执行阻塞的磁盘操作"""
+        try:
+            from eventlet import patcher, tpool
+            if patcher.is_monkey_patched('thread'):
+                return tpool.execute(func, *args)
+        except ImportError:
+            pass
+        return func(*args)
+
+    @classmethod
+    def dir(cls, deviceId) -> str:
+        return _G._G_.dataDir(os.path.join(SDevice_.SCREENSHOTS_DIR, str(deviceId)))
+
+    def _write(self, deviceId, image, t: datetime):
+        """写入截图和缩略图并清理旧截图，返回(文件名, 是否有缩略图)"""
+        if isinstance(image, str):
+            image = base64.b64decode(image.split(',', 1)[1])
+        dir = self.dir(deviceId)
+        files = self._scan(deviceId, dir)
+        name = t.strftime('%Y-%m-%d_%H-%M-%S_%f.jpg')
+        with open(os.path.join(dir, name), 'wb') as f:
+            f.write(image)
+        thumbSize = self._thumb(dir, name, image)
+        files[0].append((name, len(image) + thumbSize))
+        files[1] += len(image) + thumbSize
+        self._retain(dir, files)
+        return name, thumbSize > 0
+
+    def _thumb(self, dir, name, image) -> int:
+        """生成缩略图，返回缩略图大小，没有安装Pillow时不生成"""
+        try:
+            from PIL import Image
+        except ImportError:
+            return 0
+        import io
+        thumbDir = os.path.join(dir, self.ThumbDir)
+        os.makedirs(thumbDir, exist_ok=True)
+        path = os.path.join(thumbDir, name)
+        with Image.open(io.BytesIO(image)) as img:
+            img.thumbnail(self.ThumbSize)
+            img.convert('RGB').save(path, 'JPEG', quality=70)
+        return os.path.getsize(path)
+
+    def _scan(self, deviceId, dir) -> list:
+        """获取设备已有的截图列表，首次使用时从目录读取"""
+        files = self._files.get(deviceId)
+        if files is None:
+            items = deque()
+            total = 0
+            for name in sorted(os.listdir(dir)):
+                path = os.path.join(dir, name)
+                if not name.endswith('.jpg') or not os.path.isfile(path):
+                    continue
+                size = os.path.getsize(path)
+                thumb = os.path.join(dir, self.ThumbDir, name)
+                if os.path.exists(thumb):
+                    size += os.path.getsize(thumb)
+                items.append((name, size))
+                total += size
+            files = [items, total]
+            self._files[deviceId] = files
+        return files
+
+    def _retain(self, dir, files):
+        """删除超出数量或总大小限制的最旧截图，至少保留最新的一张"""
+        items = files[0]
+        while len(items) > 1 and (len(items) > self.MaxCount or files[1] > self.MaxBytes):
+            name, size = items.popleft()
+            files[1] -= size
+            for path in (os.path.join(dir, name), os.path.join(dir, self.ThumbDir, name)):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            self.removed += 1
+
+    def stats(self) -> dict:
+        """截图统计"""
+        avgHandle = self._handleTime / self.received if self.received else 0.0
+        avgWrite = self._writeTime / self.written if self.written else 0.0
+        return {
+            'pending': len(self._queue),
+            'received': self.received,
+            'written': self.written,
+            'dropped': self.dropped,
+            'removed': self.removed,
+            'errors': self.errors,
+            'avgBytes': self.wireBytes // self.received if self.received else 0,
+            'avgHandle': round(avgHandle * 1000, 3),
+            'maxHandle': round(self.maxHandleTime * 1000, 3),
+            'avgWrite': round(avgWrite * 1000, 2),
+        }
+
+
 class SDevice_(_ModelBase_, _Device_):
     """设备管理类"""
     SCREENSHOTS_DIR = 'screenshots'
@@ -23,7 +212,8 @@ class SDevice_(_ModelBase_, _Device_):
         _Device_.__init__(self)  # 初始化App管理功能
         self.sid:str = None
         self._state = _G.ConnectState.OFFLINE
-        self._lastScreenshot = None
+        self._lastScreenshot = None  # 最近的截图文件名
+        self._lastThumb = False  # 最近的截图是否有缩略图
         self._tasks: Dict[int, 'STask_'] = None  # 缓存当天任务列表
         self.tasksDate = None  # 当前缓存的日期
         self.debug = False  # debug开关，临时属性，不保存到数据库
@@ -84,6 +274,7 @@ class SDevice_(_ModelBase_, _Device_):
         data = {
             'state': self._state,
             'debug': self.debug,  # 添加debug临时属性
+            'screenshot': self.screenshotUrl,
             **self.data
         }
         # log = _G._G_.Log()
@@ -223,6 +414,7 @@ class SDevice_(_ModelBase_, _Device_):
         try:
             deviceId = getattr(self, 'id', 'default_device')            
             from SApp import SApp_
+            from SDeviceMgr import deviceMgr
             appNames = SApp_.getAppNames()
             # log.i(f"开始创建 {len(appNames)} 个应用")            
             for name in appNames:
@@ -230,6 +422,7 @@ class SDevice_(_ModelBase_, _Device_):
                 app = SApp_.get(deviceId, name, create=True)
                 if app:
                     self._apps[name] = app
+                    deviceMgr.registry.set('app', app.id, app)
                     # log.d(f"创建App: {name}")
                 else:
                     log.e(f"创建App实例失败: {name}")
@@ -264,7 +457,7 @@ class SDevice_(_ModelBase_, _Device_):
         """设备登出"""
         self.state = _G.ConnectState.LOGOUT
     
-    def sendClientCmd(self, command, params=None):
+    def sendClientCmd(self, command, params=None, timeout=10):
         """执行设备命令并等待结果
         Args:
             command: 命令名称
@@ -289,44 +482,41 @@ class SDevice_(_ModelBase_, _Device_):
             return g.emitRet('S2C_DoCmd', {
                 'cmd': command,
                 'params': params,
-            }, sid=sid)
+            }, sid=sid, timeout=timeout)
         except Exception as e:
             log.ex(e, '执行设备命令出错')
             return None
         
-    def saveScreenshot(self, base64_data):
-        """保存截图并刷新设备信息
+    def saveScreenshot(self, image):
+        """保存截图，写入在后台进行，写入后刷新设备信息
         Args:
-            base64_data: Base64编码的图片数据
+            image: 图片二进制数据，或旧客户端发送的Base64编码的图片数据
         Returns:
-            bool: 保存成功返回True
+            bool: 放入写入队列返回True
         """
         try:
-            # 解码base64数据
-            if base64_data.startswith('data:image'):
-                image_data = base64_data.split(',', 1)[1]
-                image_bytes = base64.b64decode(image_data)                
-                # 生成文件名
-                filename = datetime.now().strftime('%Y-%m-%d_%H-%M-%S.jpg')
-                g = _G._G_
-                file_path = g.dataDir(os.path.join(self.SCREENSHOTS_DIR, str(self.id), filename))
-                
-                # 保存文件
-                with open(file_path, 'wb') as f:
-                    f.write(image_bytes)
-                
-                # 更新截图路径
-                self._lastScreenshot = file_path
-                self.data['_lastScreenshotTime'] = datetime.now()
-                
-                # 刷新设备信息到前端
-                self.refresh()
-                return True
-                
+            return screenshotWriter.put(self, image)
         except Exception as e:
             _Log._Log_.ex(e, "保存截图失败")
             return False
 
+    def onScreenshotSaved(self, name: str, thumb: bool, t: datetime):
+        """截图写入完成"""
+        self._lastScreenshot = name
+        self._lastThumb = thumb
+        self.data['_lastScreenshotTime'] = t
+        # 刷新设备信息到前端
+        self.refresh()
+
+    @property
+    def screenshotUrl(self) -> Optional[str]:
+        """最近截图的地址，有缩略图时使用缩略图"""
+        if not self._lastScreenshot:
+            return None
+        if self._lastThumb:
+            return f'/screenshots/{self.id}/{ScreenshotWriter.ThumbDir}/{self._lastScreenshot}'
+        return f'/screenshots/{self.id}/{self._lastScreenshot}'
+
     def takeScreenshot(self):
         """向客户端发送截屏指令"""
         try:
@@ -605,6 +795,9 @@ class SDevice_(_ModelBase_, _Device_):
             # 如果日期为当天，则创建任务列表
             tasks = self._createTasks(today)
         # log = _G._G_.Log()
+        from SDeviceMgr import deviceMgr
+        for t in tasks.values():
+            deviceMgr.registry.set('task', t.id, t)
         self._tasks = tasks
         self.tasksDate = date
         return tasks
@@ -676,3 +869,6 @@ class SDevice_(_ModelBase_, _Device_):
             return {
                 'error': f"获取收益失败: {str(e)}"
             }
+
+
+screenshotWriter = ScreenshotWriter()
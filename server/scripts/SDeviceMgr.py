@@ -1,9 +1,122 @@
 from flask import current_app
 from SDevice import SDevice_
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 import hashlib
 import time
+import weakref
 import _G
-from typing import Optional, List
+from typing import Any, Callable, Dict, Iterable, Optional, List
+
+
+class Registry:
+    """实体索引：按类别和键查找设备、任务、App
+    
+    只保存弱引用，实体被移除且不再使用后索引自动失效。
+    索引可能过期（如设备sid变化），查找方需要校验返回的实体。
+    """
+
+    def __init__(self):
+        self._maps = {}  # {类别: WeakValueDictionary}
+
+    def _map(self, kind: str) -> weakref.WeakValueDictionary:
+        m = self._maps.get(kind)
+        if m is None:
+            m = weakref.WeakValueDictionary()
+            self._maps[kind] = m
+        return m
+
+    def set(self, kind: str, key, obj):
+        if key is None or key == '' or obj is None:
+            return
+        self._map(kind)[key] = obj
+
+    def get(self, kind: str, key) -> Any:
+        if key is None:
+            return None
+        return self._map(kind).get(key)
+
+    def remove(self, kind: str, key, obj=None):
+        """删除索引，指定obj时只删除指向该实体的索引"""
+        m = self._map(kind)
+        if obj is None or m.get(key) is obj:
+            m.pop(key, None)
+
+
+class Fanout:
+    """多目标并发分发：同时向多个目标执行同一个操作
+
+    并发数不超过MaxWorkers，每个目标从开始执行算起最多等待timeout秒，
+    超时的目标记为超时结果，不再等待（执行线程自行结束）。
+    每个目标完成时在调用线程中回调onResult，调用方可以边收边推送。
+    服务器启用eventlet monkey_patch时，线程池中的线程是绿色线程。
+    """
+    MaxWorkers = 16  # 最大并发数
+    Timeout = 10  # 每个目标的默认超时（秒）
+    Grace = 1.0  # 目标自身已带超时，额外多等的时间（秒）
+    Poll = 0.2  # 检查超时的间隔（秒）
+    TimeoutResult = 'e~执行超时'
+
+    def run(self, targets: Iterable, func: Callable, onResult: Callable = None,
+            timeout: float = None, maxWorkers: int = None) -> Dict[Any, Any]:
+        """对每个目标执行func(target)
+        Args:
+            targets: 目标列表，重复的目标只执行一次
+            func: 执行函数，抛出异常时结果为错误信息
+            onResult: 每个目标完成时回调 onResult(target, result, cost)
+            timeout: 每个目标的超时（秒）
+            maxWorkers: 最大并发数
+        Returns:
+            {目标: 结果}，顺序与targets一致
+        """
+        targets = list(dict.fromkeys(targets))
+        timeout = timeout or self.Timeout
+        results = {}
+        if not targets:
+            return results
+        log = _G._G_.Log()
+        started = {}
+
+        def call(target):
+            started[target] = time.time()
+            try:
+                return func(target)
+            except Exception as e:
+                log.ex(e, f'分发执行失败: {target}')
+                return f'e~执行失败: {e}'
+
+        def finish(target, result):
+            results[target] = result
+            if onResult:
+                cost = time.time() - started.get(target, time.time())
+                try:
+                    onResult(target, result, cost)
+                except Exception as e:
+                    log.ex(e, f'分发结果回调失败: {target}')
+
+        workers = max(1, min(maxWorkers or self.MaxWorkers, len(targets)))
+        executor = ThreadPoolExecutor(max_workers=workers)
+        try:
+            futures = {executor.submit(call, target): target for target in targets}
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=self.Poll, return_when=FIRST_COMPLETED)
+                for future in done:
+                    finish(futures[future], future.result())
+                now = time.time()
+                for future in list(pending):
+                    start = started.get(futures[future])
+                    if start is not None and now - start > timeout + self.Grace:
+                        pending.discard(future)
+                        log.w(f'分发超时: {futures[future]}')
+                        finish(futures[future], self.TimeoutResult)
+        finally:
+            # 不等待超时目标的线程
+            executor.shutdown(wait=False)
+        return {target: results.get(target) for target in targets}
+
+
+fanout = Fanout()
+
 
 class SDeviceMgr_:
     """设备管理器：管理所有设备"""
@@ -26,13 +139,41 @@ class SDeviceMgr_:
             self.cmdTimeout = 15
             self.cmdResults = {}
             self.cmdEvents = {}
+            self.registry = Registry()
 
     @property
     def _devices(self) -> List['SDevice_']:
         """延迟加载设备列表"""
         if self.__devices is None:
             self.__devices = SDevice_.all()
+            for device in self.__devices:
+                self._index(device)
         return self.__devices
+
+    def _index(self, device: SDevice_):
+        """登记设备的id、名称、sid索引"""
+        registry = self.registry
+        registry.set('id', device.id, device)
+        if device.name:
+            registry.set('name', device.name.lower(), device)
+        registry.set('sid', device.sid, device)
+
+    def _unindex(self, device: SDevice_):
+        registry = self.registry
+        registry.remove('id', device.id, device)
+        if device.name:
+            registry.remove('name', device.name.lower(), device)
+        registry.remove('sid', device.sid, device)
+
+    def _findByName(self, name: str) -> Optional[SDevice_]:
+        """按名称（小写）查找已加载的设备"""
+        device = self.registry.get('name', name)
+        if device and device.name and device.name.lower() == name:
+            return device
+        device = next((d for d in self._devices if d.name and d.name.lower() == name), None)
+        if device:
+            self._index(device)
+        return device
     
     @property
     def devices(self)->List['SDevice_']:
@@ -44,43 +185,69 @@ class SDeviceMgr_:
         try:
             devices = self._devices
             # log.i(f'######%%%%%%: {name}, devices.len={len(devices)}')
-            device = next((d for d in devices if d.name == name), None)
+            device = self._findByName(name)
             if device is None:
                 from SModels import DeviceModel_
                 data = DeviceModel_.get(name, create)
                 if data:
                     device = SDevice_(data)
                     devices.append(device)                
+                    self._index(device)
             return device
         except Exception as e:
             log.ex(e, f'获取设备失败: {name}')
             return None
 
     def getBySID(self, sid : str) -> Optional[SDevice_]:
-        return next((d for d in self._devices if d.sid == sid), None)
+        if not sid:
+            return None
+        devices = self._devices  # 确保设备已加载并建立索引
+        device = self.registry.get('sid', sid)
+        if device and device.sid == sid:
+            return device
+        # 索引过期（设备已断开或sid已变化），逐个查找并重新建立索引
+        self.registry.remove('sid', sid)
+        device = next((d for d in devices if d.sid == sid), None)
+        if device:
+            self._index(device)
+        return device
+
+    def getById(self, id: int) -> Optional[SDevice_]:
+        """只按id查找设备，索引未命中时逐个查找并重新建立索引"""
+        devices = self._devices  # 确保设备已加载并建立索引
+        device = self.registry.get('id', id)
+        if device and device.id == id:
+            return device
+        device = next((d for d in devices if d.id == id), None)
+        if device:
+            self._index(device)
+        return device
 
     def get(self, key) -> Optional[SDevice_]:
+        """按id或名称查找设备，key不是已知的id时按名称查找"""
         if key is None:
             return None
         g = _G._G_
         log = g.Log()
         try:
             id = g.toInt(key, 0)
-            if id == 0:
-                key = key.lower()
-            for d in self._devices:
-                # log.i(f'设备: {d.id}, {d.name}, key={key}, id={id}')
-                if id == d.id:
-                    return d
-                if d.name.lower() == key:
-                    return d
-            return None
+            if id != 0:
+                device = self.getById(id)
+                if device:
+                    return device
+                key = str(key)
+            return self._findByName(key.lower())
         except Exception as e:
             log.ex(e, f'获取设备失败: {key}')
             return None
     
     def getTask(self, key):
         """根据ID获取任务"""
+        id = _G._G_.toInt(key)
+        if id:
+            task = self.registry.get('task', id)
+            if task and task.id == id:
+                return task
         for d in self._devices:
             task = d.getTask(key)
             if task:
@@ -94,17 +261,21 @@ class SDeviceMgr_:
         return self.devices[0]
     
     def addDevice(self, device: SDevice_):
-        devices = self._devices
-        exist = next((d for d in devices if d.id == device.id), None)
+        self._devices  # 确保设备已加载并建立索引
+        exist = self.registry.get('id', device.id)
+        if exist and exist.id != device.id:
+            exist = None
         # log = _G._G_.Log()
         # log.d_(f'添加设备fff: {device.id}, {device.name} exist={exist}')
         if exist is None:
             self._devices.append(device)
+        self._index(exist or device)
         if device.isConsole:
             _G._G_.addConsole(device.sid)
     
     def removeDevice(self, device: SDevice_):
         self._devices.remove(device)
+        self._unindex(device)
         if device.isConsole:
             _G._G_.removeConsole(device.sid)    
 
@@ -154,7 +325,20 @@ class SDeviceMgr_:
         cmd = {'cmd': command, 'params': params}
         return cmdMgr.do(cmd)
 
-    def onCmd(self, target:str, command:str, data=None):
+    def onCmds(self, targets: list, command: str, data=None,
+               onResult: Callable = None, timeout: float = None) -> dict:
+        """并发向多个目标发送命令
+        Args:
+            onResult: 每个目标返回时回调 onResult(target, result, cost)
+            timeout: 每个设备的超时（秒）
+        Returns:
+            {目标: 结果}
+        """
+        self._devices  # 先加载设备，避免并发加载
+        return fanout.run(targets, lambda t: self.onCmd(t, command, data, timeout),
+                          onResult, timeout)
+
+    def onCmd(self, target:str, command:str, data=None, timeout=None):
         """发送命令"""
         result = None
         log = _G._G_.Log()
@@ -172,7 +356,7 @@ class SDeviceMgr_:
                 device = self.get(target)
                 if device is None:
                     return f'e~设备不存在: {target}'
-                result = device.sendClientCmd(command, data)
+                result = device.sendClientCmd(command, data, timeout or fanout.Timeout)
                 # log.i(f'处理客户端命令结果: {result}')
             
             # 添加调试信息
@@ -99,9 +99,11 @@ def createApp(configName='development', debug=False):
     # 初始化SocketIO
     socketio.init_app(app, cors_allowed_origins="*")
     
-    # 创建数据库表
+    # 创建数据库表，并补齐缺少的字段和索引
     with app.app_context():
         db.create_all()
+        from SModels import SModel_
+        SModel_.migrateAll(db)
     
     # 导入并注册路由
     from SRoutes import bp
@@ -229,4 +231,6 @@ if __name__ == '__main__':
         log.ex(e, '服务器启动失败')
     finally:
         log.i_('服务器关闭') 
+        from SModels import writeBehind
+        writeBehind.stop()
         log.uninit()
\ No newline at end of file
@@ -0,0 +1,209 @@
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+import zipfile
+from typing import Dict, Optional
+import _G
+
+
+class SManifest_:
+    """客户端可下载文件的清单（路径、修改时间、大小、内容哈希）
+
+    首次请求时遍历scripts和config目录建立清单，之后由watchdog的文件变化通知
+    标记变化的路径，下次请求时只重新读取这些路径。清单内容不变时ETag不变，
+    客户端带If-None-Match请求可以直接得到304。
+    没有watchdog时，清单超过RefreshInterval秒后整体重建。
+    """
+    Dirs = ['scripts', 'config']
+    RefreshInterval = 2.0  # 没有文件变化通知时的重建间隔（秒）
+    VersionsName = '.versions.json'  # 增量包中记录完整版本的文件名
+
+    _lock = threading.Lock()
+    _entries: Dict[str, dict] = None  # {相对路径: {'mtime', 'size', 'hash'}}
+    _dirty = set()  # 需要重新读取的绝对路径
+    _rebuild = True  # 需要整体重建
+    _buildTime = 0.0
+    _etag: Optional[str] = None
+    _body: Optional[str] = None  # /timestamps返回的JSON
+    _observer = None
+
+    @classmethod
+    def _skip(cls, name: str) -> bool:
+        # 忽略大写S开头的服务器本地文件和__pycache__等目录
+        return name.startswith('S') or name.startswith('__')
+
+    @classmethod
+    def _relPath(cls, path: str) -> Optional[str]:
+        """绝对路径转为清单中的相对路径，不属于清单的路径返回None"""
+        rootDir = _G._G_.rootDir()
+        rel = os.path.relpath(path, rootDir)
+        parts = rel.replace('\\', '/').split('/')
+        if parts[0] not in cls.Dirs or len(parts) < 2:
+            return None
+        if any(cls._skip(p) for p in parts[1:]):
+            return None
+        return '/'.join(parts)
+
+    @classmethod
+    def _stat(cls, path: str) -> Optional[dict]:
+        """读取文件信息，文件不存在返回None"""
+        try:
+            if not os.path.isfile(path):
+                return None
+            with open(path, 'rb') as f:
+                digest = hashlib.sha1(f.read()).hexdigest()
+            stat = os.stat(path)
+            return {'mtime': int(stat.st_mtime), 'size': stat.st_size, 'hash': digest}
+        except OSError:
+            return None
+
+    @classmethod
+    def _build(cls):
+        """遍历目录建立清单"""
+        rootDir = _G._G_.rootDir()
+        entries = {}
+
+        def walk(dir):
+            if not os.path.exists(dir):
+                return
+            for name in os.listdir(dir):
+                if cls._skip(name):
+                    continue
+                path = os.path.join(dir, name)
+                if os.path.isfile(path):
+                    info = cls._stat(path)
+                    rel = cls._relPath(path)
+                    if info and rel:
+                        entries[rel] = info
+                else:
+                    walk(path)
+        for dir in cls.Dirs:
+            walk(os.path.join(rootDir, dir))
+        cls._entries = entries
+        cls._dirty = set()
+        cls._rebuild = False
+        cls._buildTime = time.time()
+
+    @classmethod
+    def _update(cls):
+        """应用文件变化，返回清单是否变化"""
+        if cls._observer is None:
+            cls._watch()
+        if cls._observer is None and time.time() - cls._buildTime > cls.RefreshInterval:
+            cls._rebuild = True
+        if cls._rebuild or cls._entries is None:
+            old = cls._entries
+            cls._build()
+            return old != cls._entries
+        if not cls._dirty:
+            return False
+        dirty = cls._dirty
+        cls._dirty = set()
+        changed = False
+        for path in dirty:
+            rel = cls._relPath(path)
+            if not rel:
+                continue
+            info = cls._stat(path)
+            if info is None:
+                changed |= cls._entries.pop(rel, None) is not None
+            elif cls._entries.get(rel) != info:
+                cls._entries[rel] = info
+                changed = True
+        return changed
+
+    @classmethod
+    def _watch(cls):
+        """监听目录变化"""
+        try:
+            from watchdog.observers import Observer
+            from watchdog.events import FileSystemEventHandler
+        except ImportError:
+            return
+        log = _G._G_.Log()
+        manifest = cls
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                with manifest._lock:
+                    if event.is_directory:
+                        # 目录创建、移动、删除影响整个子树，整体重建
+                        if event.event_type != 'modified':
+                            manifest._rebuild = True
+                        return
+                    manifest._dirty.add(event.src_path)
+                    dest = getattr(event, 'dest_path', None)
+                    if dest:
+                        manifest._dirty.add(dest)
+        try:
+            observer = Observer()
+            rootDir = _G._G_.rootDir()
+            for dir in cls.Dirs:
+                path = os.path.join(rootDir, dir)
+                if os.path.exists(path):
+                    observer.schedule(Handler(), path, recursive=True)
+            observer.daemon = True
+            observer.start()
+            cls._observer = observer
+            cls._rebuild = True
+        except Exception as e:
+            log.ex(e, '监听文件变化失败')
+
+    @classmethod
+    def get(cls):
+        """获取清单的ETag和/timestamps的JSON内容"""
+        with cls._lock:
+            if cls._update() or cls._body is None:
+                timestamps = {rel: str(info['mtime'])
+                              for rel, info in sorted(cls._entries.items())}
+                cls._body = json.dumps(timestamps)
+                digest = hashlib.sha1()
+                for rel, info in sorted(cls._entries.items()):
+                    digest.update(f"{rel}:{info['mtime']}:{info['hash']}\n".encode('utf-8'))
+                cls._etag = digest.hexdigest()
+            return cls._etag, cls._body
+
+    @classmethod
+    def entries(cls) -> Dict[str, dict]:
+        """获取完整清单"""
+        with cls._lock:
+            cls._update()
+            return dict(cls._entries)
+
+    @classmethod
+    def archive(cls, versions: Dict[str, str]):
+        """把比客户端版本新的文件打成一个zip包
+
+        Args:
+            versions: 客户端version.txt中的版本 {相对路径: 修改时间}
+        Returns:
+            (zip内容, 文件数)，没有需要更新的文件时zip内容为None。
+            包内的VersionsName记录打包时服务端的完整版本，客户端应用后直接写入version.txt
+        """
+        entries = cls.entries()
+        changed = []
+        for rel, info in sorted(entries.items()):
+            try:
+                current = int(versions.get(rel, 0))
+            except (TypeError, ValueError):
+                current = 0
+            if info['mtime'] > current:
+                changed.append(rel)
+        if not changed:
+            return None, 0
+        rootDir = _G._G_.rootDir()
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as zf:
+            for rel in changed:
+                zf.write(os.path.join(rootDir, rel), rel)
+            timestamps = {rel: str(info['mtime']) for rel, info in sorted(entries.items())}
+            zf.writestr(cls.VersionsName, json.dumps(timestamps))
+        return buf.getvalue(), len(changed)
+
+    @classmethod
+    def onLoad(cls, oldCls):
+        if oldCls and oldCls._observer:
+            oldCls._observer.stop()
@@ -1,13 +1,234 @@
-from datetime import datetime
+from datetime import date as Date, datetime
+import atexit
+import threading
+import time
 import _G
 
 
+class WriteBehind:
+    """延迟写入：合并模型数据的修改，定时在一个事务中批量写入数据库
+    
+    以(表名, id)为键记录待写入的行（身份映射），同一行多次修改只写最后的数据。
+    写入使用upsert，读取时用待写入的数据覆盖数据库中的旧值。
+    整批写入失败时改为逐行写入，写不进去的行（如数据库拒绝的值）不影响其它行；
+    同一行连续失败MaxAttempts次后丢弃并记录日志。多行全部失败时视为数据库不可用，不计失败次数。
+    """
+    FlushInterval = 1.0  # 写入间隔（秒）
+    MaxAttempts = 5  # 一行连续写入失败的次数达到该值时丢弃
+
+    def __init__(self):
+        self._pending = {}  # {(表名, id): (SModel_, data)}
+        self._attempts = {}  # {(表名, id): 连续失败次数}
+        self._lock = threading.Lock()
+        self._flushLock = threading.Lock()
+        self._wake = threading.Event()
+        self._running = False
+        self.flushes = 0       # 写入次数
+        self.rows = 0          # 写入行数
+        self.errors = 0        # 失败次数
+        self.dropped = 0       # 丢弃的行数
+        self.lastLatency = 0.0  # 最近一次写入耗时（秒）
+        self.maxLatency = 0.0
+        self._totalLatency = 0.0
+        atexit.register(self.stop)
+
+    def add(self, model: 'SModel_', data: dict):
+        """记录待写入的行，data为模型数据本身，写入时取最新值"""
+        with self._lock:
+            self._pending[(model.table, data['id'])] = (model, data)
+        if not self._running:
+            self.start()
+
+    def get(self, table: str, id) -> dict:
+        """获取待写入的行数据"""
+        item = self._pending.get((table, id))
+        return item[1] if item else None
+
+    def hasPending(self, table: str, where: dict) -> bool:
+        """是否有满足条件的待写入行"""
+        with self._lock:
+            return any(t == table and all(data.get(k) == v for k, v in where.items())
+                       for (t, _), (_, data) in self._pending.items())
+
+    @property
+    def pendingCount(self) -> int:
+        return len(self._pending)
+
+    def flush(self) -> bool:
+        """将待写入的行在一个事务中写入数据库"""
+        with self._flushLock:
+            with self._lock:
+                items = list(self._pending.values())
+                self._pending.clear()
+            if not items:
+                return True
+            start = time.time()
+            if self._write(items):
+                written = items
+                failed = []
+            else:
+                # 整批失败，逐行写入找出写不进去的行
+                self.errors += 1
+                written, failed = [], []
+                for item in items:
+                    (written if self._write([item]) else failed).append(item)
+                self._retry(failed, count=bool(written) or len(items) == 1)
+            with self._lock:
+                for model, data in written:
+                    self._attempts.pop((model.table, data['id']), None)
+            if not written:
+                return False
+            cost = time.time() - start
+            self.flushes += 1
+            self.rows += len(written)
+            self.lastLatency = cost
+            self.maxLatency = max(self.maxLatency, cost)
+            self._totalLatency += cost
+            return not failed
+
+    def _write(self, items: list) -> bool:
+        """在一个事务中写入多行，按表和字段分组，每组一次批量upsert"""
+        groups = {}
+        for model, data in items:
+            row = model._fillDefaults(dict(data))
+            key = (model.table, tuple(row.keys()))
+            groups.setdefault(key, (model, []))[1].append(row)
+
+        def db_operation(db):
+            try:
+                dialect = db.engine.dialect.name
+                for (_, keys), (model, rows) in groups.items():
+                    db.session.execute(model.genUpsertSql(keys, dialect), rows)
+                db.session.commit()
+                return True
+            except Exception as e:
+                _G._G_.Log().ex_(e, "批量写入数据失败")
+                db.session.rollback()
+                return False
+        return bool(items[0][0].SQL(db_operation))
+
+    def _retry(self, items: list, count: bool):
+        """写入失败的行放回待写入列表，已有更新的行保持不变
+        Args:
+            count: 是否累计失败次数，数据库不可用时不累计
+        """
+        dropped = []
+        with self._lock:
+            for model, data in items:
+                key = (model.table, data['id'])
+                if count:
+                    attempts = self._attempts.get(key, 0) + 1
+                    if attempts >= self.MaxAttempts:
+                        self._attempts.pop(key, None)
+                        dropped.append(key)
+                        continue
+                    self._attempts[key] = attempts
+                self._pending.setdefault(key, (model, data))
+        for table, id in dropped:
+            self.dropped += 1
+            _G._G_.Log().e(f"写入失败{self.MaxAttempts}次，丢弃: {table} id={id}")
+
+    def start(self):
+        """启动定时写入线程"""
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def stop(self):
+        """停止定时写入，并写入剩余数据"""
+        self._running = False
+        self._wake.set()
+        self.flush()
+
+    def _run(self):
+        while self._running:
+            self._wake.wait(self.FlushInterval)
+            self._wake.clear()
+            self.flush()
+
+    def stats(self) -> dict:
+        """写入统计"""
+        avg = self._totalLatency / self.flushes if self.flushes else 0.0
+        return {
+            'pending': self.pendingCount,
+            'flushes': self.flushes,
+            'rows': self.rows,
+            'errors': self.errors,
+            'dropped': self.dropped,
+            'lastLatency': round(self.lastLatency * 1000, 2),
+            'avgLatency': round(avg * 1000, 2),
+            'maxLatency': round(self.maxLatency * 1000, 2),
+        }
+
+
+writeBehind = WriteBehind()
+
+
 class SModel_:
-    """基础模型类，只支持('type', default) tuple字段声明"""
-    def __init__(self, table: str, fields: dict = None, pk: str = 'id'):
+    """基础模型类，只支持('type', default) tuple字段声明
+    
+    有day字段时，day由time字段自动得出，用于按天查询（可以使用索引）。
+    """
+    _models: list = []  # 所有模型，用于启动时迁移表结构
+    # 字段类型对应的数据库列类型
+    ColumnTypes = {
+        'int': 'INTEGER',
+        'float': 'FLOAT',
+        'str': 'VARCHAR(255)',
+        'datetime': 'DATETIME',
+        'date': 'DATE',
+    }
+
+    def __init__(self, table: str, fields: dict = None, pk: str = 'id', indexes: dict = None):
         self.table = table
         self.fields = self._normalizeFields(fields or {})
         self.pk = pk
+        self.indexes = indexes or {}  # {索引名: (字段, ...)}
+        SModel_._models.append(self)
+
+    @classmethod
+    def toDay(cls, value) -> str:
+        """时间转为日期字符串YYYY-MM-DD"""
+        if isinstance(value, (datetime, Date)):
+            return value.strftime('%Y-%m-%d')
+        return str(value)[:10]
+
+    def migrate(self, db):
+        """补齐数据表缺少的字段和索引"""
+        from sqlalchemy import inspect
+        log = _G._G_.Log()
+        try:
+            inspector = inspect(db.engine)
+            if self.table not in inspector.get_table_names():
+                return
+            columns = {c['name'] for c in inspector.get_columns(self.table)}
+            for name, field in self.fields.items():
+                if name in columns:
+                    continue
+                colType = self.ColumnTypes.get(field['type'], 'VARCHAR(255)')
+                db.session.execute(f"ALTER TABLE {self.table} ADD COLUMN {name} {colType}")
+                log.i(f"数据表{self.table}新增字段: {name} {colType}")
+                if name == 'day' and 'time' in self.fields:
+                    db.session.execute(f"UPDATE {self.table} SET day = DATE(time) WHERE day IS NULL")
+            db.session.commit()
+            indexes = {i['name'] for i in inspector.get_indexes(self.table)}
+            for name, keys in self.indexes.items():
+                if name in indexes:
+                    continue
+                db.session.execute(f"CREATE INDEX {name} ON {self.table} ({', '.join(keys)})")
+                db.session.commit()
+                log.i(f"数据表{self.table}新增索引: {name}{keys}")
+        except Exception as e:
+            log.ex(e, f"迁移数据表失败: {self.table}")
+            db.session.rollback()
+
+    @classmethod
+    def migrateAll(cls, db):
+        """启动时迁移所有模型的数据表"""
+        for model in cls._models:
+            model.migrate(db)
 
     def _normalizeFields(self, fields):
         new_fields = {}
@@ -29,6 +250,8 @@ class SModel_:
                 d = v['default']
                 result[k] = d() if callable(d) else d
             # 如果default为None，则不设置该字段
+        if 'day' in self.fields and result.get('time'):
+            result['day'] = self.toDay(result['time'])
         return result
 
     def genInsertSql(self, data: dict):
@@ -42,6 +265,19 @@ class SModel_:
         setStr = ', '.join([f"{k} = :{k}" for k in keys])
         return f"UPDATE {self.table} SET {setStr} WHERE {self.pk} = :{self.pk}"
 
+    def genUpsertSql(self, keys, dialect: str = 'mysql'):
+        """生成插入或更新的SQL（按主键冲突判断）"""
+        columns = ', '.join(keys)
+        values = ', '.join([f':{k}' for k in keys])
+        others = [k for k in keys if k != self.pk]
+        if dialect == 'sqlite':
+            setStr = ', '.join([f"{k} = excluded.{k}" for k in others])
+            return (f"INSERT INTO {self.table} ({columns}) VALUES ({values}) "
+                    f"ON CONFLICT({self.pk}) DO UPDATE SET {setStr}")
+        setStr = ', '.join([f"{k} = VALUES({k})" for k in others])
+        return (f"INSERT INTO {self.table} ({columns}) VALUES ({values}) "
+                f"ON DUPLICATE KEY UPDATE {setStr}")
+
     def genSelectSql(self):
         columns = ', '.join(self.fields.keys())
         return f"SELECT {columns} FROM {self.table}"
@@ -58,7 +294,10 @@ class SModel_:
                 params = {}
                 where_clauses = []
                 
-                if date and 'time' in self.fields:
+                if date and 'day' in self.fields:
+                    where_clauses.append("day = :date")
+                    params['date'] = self.toDay(date)
+                elif date and 'time' in self.fields:
                     where_clauses.append("date(time) = :date")
                     if isinstance(date, datetime):
                         date = date.strftime('%Y-%m-%d')
@@ -128,6 +367,13 @@ class SModel_:
                 return False
         self.SQL(db_operation)
 
+    def commitLater(self, data: dict):
+        """延迟提交：有id的行交给writeBehind合并写入，没有id的直接插入"""
+        if not data.get(self.pk):
+            return self.commit(data)
+        writeBehind.add(self, data)
+        return True
+
     def save(self, data: dict):
         return self._insert(data)
 
@@ -135,9 +381,15 @@ class SModel_:
         if not row:
             return None
         data = dict(row)
+        # 还未写入数据库的修改优先
+        pending = writeBehind.get(self.table, data.get(self.pk))
+        if pending:
+            data.update({k: v for k, v in pending.items() if k in self.fields})
         for k, v in data.items():
             if isinstance(v, datetime):
                 data[k] = v.strftime('%Y-%m-%d %H:%M:%S')
+            elif isinstance(v, Date):
+                data[k] = v.strftime('%Y-%m-%d')
         return data
 
         
@@ -188,12 +440,17 @@ class TaskModel_:
         'deviceId': ('str', None),
         'name': ('str', None),
         'time': ('datetime', lambda: datetime.now()),
+        'day': ('date', None),  # 由time得出，按天查询用
         'progress': ('int', 0.0),
         'state': ('str', 'idle'),
         'score': ('int', 0),
         'life': ('int', 0)
     }
-    model = SModel_(table, fields)
+    indexes = {
+        'idx_tasks_device_name_day': ('deviceId', 'name', 'day'),
+        'idx_tasks_device_day': ('deviceId', 'day'),
+    }
+    model = SModel_(table, fields, indexes=indexes)
 
     @classmethod
     def all(cls, date: datetime = None, where: str = None):
@@ -211,7 +468,7 @@ class TaskModel_:
                 date_str = date.strftime('%Y-%m-%d')
                 sql = (cls.model.genSelectSql() +
                        " WHERE deviceId = :deviceId AND name = :name AND "
-                       "DATE(time) = :date")
+                       "day = :date")
                 params = {'deviceId': deviceId, 'name': name, 'date': date_str}
                 result = db.session.execute(sql, params)
                 row = result.fetchone()
@@ -283,6 +540,10 @@ class AppModel_:
     @classmethod
     def updateStats(cls, deviceId: str, name: str, totalScore: float = None, income: float = None, status: str = None):
         """更新App统计数据"""
+        # 先写入同一行的延迟修改，否则之后写入的upsert会覆盖本次更新
+        if writeBehind.hasPending(cls.table, {'deviceId': deviceId, 'name': name}):
+            writeBehind.flush()
+
         def db_operation(db):
             try:
                 updates = []
@@ -325,4 +586,12 @@ class AppModel_:
         return cls.model.commit(data)
 
 
+class SModels_:
+    """SModels模块的热加载回调"""
+    writeBehind = writeBehind
 
+    @classmethod
+    def onLoad(cls, oldCls):
+        if oldCls and oldCls.writeBehind is not cls.writeBehind:
+            # 重新加载模块会创建新的writeBehind，写入旧实例中待写入的数据并停止其写入线程
+            oldCls.writeBehind.stop()
@@ -1,5 +1,5 @@
-from flask import Blueprint, send_file, render_template, jsonify, request
-from SDeviceMgr import deviceMgr
+from flask import Blueprint, send_file, render_template, jsonify, request, make_response, send_from_directory
+from SDeviceMgr import deviceMgr, fanout
 import os
 import json
 import _G
@@ -32,36 +32,51 @@ def serve_file(filename):
     # log.i('Server', f'处理文件请求: {file_path}')
     return send_file(file_path)
 
+@bp.route('/screenshots/<int:device_id>/<path:filename>')
+def serve_screenshot(device_id, filename):
+    """设备截图和缩略图"""
+    from SDevice import ScreenshotWriter
+    return send_from_directory(ScreenshotWriter.dir(device_id), filename)
+
 @bp.route('/timestamps')
 def get_timestamps():
-    """处理时间戳请求"""
-    g = _G._G_
-    log = g.Log()
-    # log.i('Server', "处理时间戳请求")
-    timestamps = {}
-    rootDir = g.rootDir()
-    # log.i(f'获取目录文件版本:{dir}')
-    def getVersion(dir, timestamps):
-        """获取目录下所有文件的时间戳"""
-        if os.path.exists(dir):
-            for file in os.listdir(dir):
-                # 忽略大写S开头的服务器本地文件
-                if file.startswith('S'):
-                    continue
-                if file.startswith('__'):
-                    continue
-                filePath = os.path.join(dir, file)  
-                if os.path.isfile(filePath):
-                    # 获取文件的绝对路径，然后去掉根目录
-                    relative_path = os.path.relpath(filePath, rootDir)
-                    # 统一使用正斜杠作为路径分隔符，确保Android端能正确处理
-                    relative_path = relative_path.replace('\\', '/')
-                    timestamps[f"{relative_path}"] = str(int(os.path.getmtime(filePath)))
-                else:
-                    getVersion(filePath, timestamps)
-    getVersion(os.path.join(rootDir, 'scripts'), timestamps)
-    getVersion(os.path.join(rootDir, 'config'), timestamps)
-    return json.dumps(timestamps)
+    """处理时间戳请求，清单未变化时返回304"""
+    from SManifest import SManifest_
+    etag, body = SManifest_.get()
+    if request.if_none_match.contains(etag):
+        response = make_response('', 304)
+    else:
+        response = make_response(body)
+        response.mimetype = 'application/json'
+    response.set_etag(etag)
+    return response
+
+@bp.route('/sync', methods=['POST'])
+def sync_files():
+    """增量同步：根据客户端版本返回一个只包含变化文件的zip包
+
+    请求体: {"versions": {相对路径: 修改时间}}
+    返回: 304 清单未变化；204 没有需要更新的文件；200 zip包
+    """
+    from SManifest import SManifest_
+    etag, _ = SManifest_.get()
+    if request.if_none_match.contains(etag):
+        response = make_response('', 304)
+        response.set_etag(etag)
+        return response
+    data = request.get_json(silent=True) or {}
+    versions = data.get('versions') or {}
+    if not isinstance(versions, dict):
+        return jsonify({'success': False, 'message': 'versions格式错误'}), 400
+    body, count = SManifest_.archive(versions)
+    if body is None:
+        response = make_response('', 204)
+    else:
+        response = make_response(body)
+        response.mimetype = 'application/zip'
+        response.headers['X-Sync-Count'] = str(count)
+    response.set_etag(etag)
+    return response
 
 @bp.route('/logs')
 def get_logs():
@@ -97,28 +112,38 @@ def batch_operation():
     data = request.json
     device_ids = data.get('device_ids', [])
     operation = data.get('operation')
-    
-    results = []
-    for device_id in device_ids:
-        device = deviceMgr.getByName(device_id)
+
+    # 设备在请求线程中查找（可能需要读数据库），操作在各设备上并发执行
+    devices = {device_id: deviceMgr.getByName(device_id) for device_id in device_ids}
+
+    def run(device_id):
+        device = devices[device_id]
         if not device:
-            results.append({'device_id': device_id, 'success': False, 'message': '设备不存在'})
-            continue
-            
+            return {'device_id': device_id, 'success': False, 'message': '设备不存在'}
         if operation == 'screenshot':
             success = device.takeScreenshot()
-            results.append({
+            return {
                 'device_id': device_id,
                 'success': success,
                 'message': '截图指令已发送' if success else '截图失败'
-            })
+            }
         elif operation == 'refresh':
             device.refresh()
-            results.append({
+            return {
                 'device_id': device_id,
                 'success': True,
                 'message': '设备已刷新'
-            })
+            }
+        return None
+
+    ret = fanout.run(device_ids, run, timeout=data.get('timeout'))
+    results = []
+    for device_id, result in ret.items():
+        if isinstance(result, dict):
+            results.append(result)
+        elif result is not None:
+            # 超时或出错，单个设备不影响其他设备
+            results.append({'device_id': device_id, 'success': False, 'message': result[2:]})
     
     return jsonify({'results': results})
 
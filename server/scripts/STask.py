@@ -22,6 +22,9 @@ class STask_(_ModelBase_, Task_):
     def getByID(cls, id: int):
         """根据ID获取任务"""
         from SDeviceMgr import deviceMgr
+        task = deviceMgr.registry.get('task', id)
+        if task and task.id == id:
+            return task
         devices = deviceMgr.devices
         for device in devices:
             task = device.getTask(id)
@@ -1,6 +1,7 @@
 from flask import request
 from flask_socketio import emit
 from datetime import datetime
+import time
 import _G
 import _Log
 from SDeviceMgr import deviceMgr
@@ -63,6 +64,8 @@ def onConnect(auth=None)->bool:
 def onDisconnect():
     """处理客户端断开连接"""
     try:
+        # 连接已断开，不会再收到应答
+        _G._G_.cancelPending(request.sid)
         device = deviceMgr.getBySID(request.sid)
         if device and device.onDisconnect():
             # 如果设备数量超过100个，从设备管理器中移除设备
@@ -109,10 +112,10 @@ def onC2S_Screenshot(data):
         device = deviceMgr.getBySID(request.sid)
         if not device:
             return
-        screenshotData = data.get('image')
+        screenshotData = data.get('image')  # 二进制附件，旧客户端为base64字符串
         if screenshotData is None:
             return
-        device.saveScreenshot(screenshotData)  # 保存后会自动刷新前端
+        device.saveScreenshot(screenshotData)  # 后台写入后会自动刷新前端
     except Exception as e:
         _Log._Log_.ex(e, '处理设备截图更新失败')
 
@@ -186,11 +189,29 @@ def on2S_Cmd(data):
         # Log.i(f'处理2S命令请求: {targets}, {command}')
 
         params = data.get('params')
-        ret = {}
+        timeout = data.get('timeout')
         if targets is None or len(targets) == 0:
             targets = [_G.ServerTag]
-        for target in targets:
-            ret[target] = deviceMgr.onCmd(target, command, params)
+        if len(targets) == 1:
+            target = targets[0]
+            return {target: deviceMgr.onCmd(target, command, params, timeout)}
+        # 多个目标并发执行，每个目标返回时推送给发起的控制台，最后推送汇总
+        sid = request.sid
+        g = _G._G_
+        start = time.time()
+
+        def onResult(target, result, cost):
+            g.emit('S2B_CmdResult', {
+                'command': command, 'target': target,
+                'result': result, 'cost': round(cost, 3),
+            }, sid)
+        ret = deviceMgr.onCmds(targets, command, params, onResult, timeout)
+        failed = [t for t, r in ret.items() if r is None or (isinstance(r, str) and r.startswith('e~'))]
+        g.emit('S2B_CmdResult', {
+            'command': command, 'done': True,
+            'total': len(ret), 'success': len(ret) - len(failed), 'failed': failed,
+            'cost': round(time.time() - start, 3),
+        }, sid)
         return ret
     except Exception as e:
         Log.ex(e, '执行命令失败')
@@ -232,7 +253,13 @@ def onB2S_loadDatas(data):
             # Log.i(f'获取任务数据: {date}, {datas}')
         elif type == 'logs':
             from _Log import _Log_  
-            datas = [logItem.toSheetData() for logItem in _Log_.gets(date)]
+            # 按条件分页查询，只读取日志索引命中的部分
+            logs = _Log_.gets(date,
+                              start=filters.get('start'), end=filters.get('end'),
+                              level=filters.get('level'), tag=filters.get('tag'),
+                              page=filters.get('page', 0),
+                              pageSize=filters.get('pageSize', _Log_.PageSize))
+            datas = [logItem.toSheetData() for logItem in logs]
         else:
             return []
         return datas
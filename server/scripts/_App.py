@@ -128,8 +128,11 @@ class _App_(_ModelBase_):
         g = _G._G_
         try:
             if g.isServer():
-                # 服务端：在所有设备中查找
+                # 服务端：先查索引，再在所有设备中查找
                 deviceMgr = g.SDeviceMgr()
+                app = deviceMgr.registry.get('app', id)
+                if app and app.id == id:
+                    return app
                 devices = deviceMgr.devices
                 for device in devices:
                     app = device.getAppByID(id)
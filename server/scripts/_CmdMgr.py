@@ -10,6 +10,7 @@ import json
 
 class Cmd:
     """命令类，存储命令信息"""
+    _Meta = set('.^$*+?{}[]()|\\')
     
     def __init__(self, func, match=None, doc=None):
         self.func = func      # 命令函数
@@ -23,6 +24,8 @@ class Cmd:
         
         # 预编译命令名正则表达式(从match中提取)
         self.nameRegex = None
+        self.prefixes = None  # 命令名列表（小写），为None时每次分派都要尝试匹配
+        self.order = 0        # 在已排序命令中的序号，匹配长度相同时序号小的优先
         if match:
             try:
                 from _CmdMgr import _CmdMgr_
@@ -36,8 +39,20 @@ class Cmd:
                         f"({searchPattern})", 
                         re.IGNORECASE
                     )
+                    # 命令名都是字面文字时，记录小写的命令名用于分派索引
+                    names = [n.strip().lower() for n in searchPattern.split('|')]
+                    if not any(c in self._Meta for n in names for c in n):
+                        self.prefixes = names
             except Exception:
                 pass
+        # 参数绑定计划：正则参数名、函数参数名、必须参数名，执行时不再分析函数签名
+        from _CmdMgr import _CmdMgr_
+        groups = self.matchRegex.groupindex if self.matchRegex else {}
+        self.groups = tuple(k for k in groups if k != _CmdMgr_.CmdKey)
+        params = inspect.signature(func).parameters
+        self.paramNames = frozenset(params)
+        self.required = tuple(name for name, param in params.items()
+                              if param.default == inspect.Parameter.empty)
 
 
 class _CmdMgr_:
@@ -57,6 +72,13 @@ class _CmdMgr_:
     
     # 预编译正则表达式
     _SPACE_PATTERN = re.compile(r'\s+')
+    
+    # 命令分派索引：命令名(小写) -> [Cmd]，注册或排序后重建
+    _index = None
+    _prefixLens = ()  # 索引中命令名的所有长度
+    _fallback = []    # 命令名不是字面文字的命令，每次都要尝试
+    # 可以直接JSON序列化的返回值类型
+    _JsonTypes = (str, int, float, bool, type(None))
 
     @classmethod
     def processParamSpaces(cls, pattern):
@@ -231,6 +253,7 @@ class _CmdMgr_:
             
         # 添加命令到模块命令集合
         cmdMap[func_name] = cmd
+        cls._index = None
     
     
     @classmethod
@@ -238,6 +261,7 @@ class _CmdMgr_:
         """清除所有命令"""
         cls.cmdModules.clear()
         cls.modulePriority.clear()
+        cls._index = None
 
     @classmethod
     def _sort(cls):
@@ -249,6 +273,71 @@ class _CmdMgr_:
         
         # 按优先级排序模块
         cls.cmdModules.sort(key=lambda x: cls.modulePriority.get(x[0], 999))
+        cls._index = None
+
+    @classmethod
+    def _buildIndex(cls):
+        """按命令名建立分派索引"""
+        index = {}
+        fallback = []
+        lens = set()
+        order = 0
+        for _, cmds in cls.cmdModules:
+            for cmdObj in cmds.values():
+                cmdObj.order = order
+                order += 1
+                if cmdObj.prefixes is None:
+                    fallback.append(cmdObj)
+                    continue
+                for name in cmdObj.prefixes:
+                    index.setdefault(name, []).append(cmdObj)
+                    lens.add(len(name))
+        cls._prefixLens = sorted(lens)
+        cls._fallback = fallback
+        cls._index = index
+
+    @classmethod
+    def _candidates(cls, cmdStr: str) -> list:
+        """获取可能匹配命令字符串的命令：命令名是命令字符串前缀的命令，按原顺序"""
+        if cls._index is None:
+            cls._buildIndex()
+        index = cls._index
+        lower = cmdStr.lower()
+        found = {cmdObj: None for cmdObj in cls._fallback}
+        for n in cls._prefixLens:
+            if n > len(lower):
+                break
+            cmds = index.get(lower[:n])
+            if cmds:
+                for cmdObj in cmds:
+                    found[cmdObj] = None
+        return sorted(found, key=lambda c: c.order)
+
+    @classmethod
+    def _match(cls, cmdStr: str):
+        """查找与命令字符串完全匹配的命令，多个命令匹配时取命令名最长的
+        Returns:
+            (Cmd, re.Match)，未找到时为(None, None)
+        """
+        log = _G._G_.Log()
+        bestMatch = None
+        m = None
+        bestMatchLength = -1
+        for cmdObj in cls._candidates(cmdStr):
+            try:
+                # 使用预编译的正则表达式
+                match = cmdObj.matchRegex.fullmatch(cmdStr)
+            except Exception as e:
+                log.ex(e, f"命令: {cmdStr} 正则表达式错误: {cmdObj.match}")
+                continue
+            if match:
+                cmdMatch = match.groupdict().get(cls.CmdKey)
+                matchLength = len(cmdMatch) if cmdMatch else 0
+                if matchLength > bestMatchLength:
+                    bestMatch = cmdObj
+                    m = match
+                    bestMatchLength = matchLength
+        return bestMatch, m
 
     @classmethod
     def _findCommand(cls, cmdName, moduleName=None):
@@ -332,59 +421,27 @@ class _CmdMgr_:
             return
         # 不再转换为小写，保持原始大小写
         try:
-            find = None
-            m = None
-            # 尝试匹配所有命令的正则表达式，找到最长的匹配
-            bestMatch = None
-            bestMatchLength = -1
-            
-            # 使用已排序的模块列表
-            for module_name in cls.cmdModules:
-                module_cmds = module_name[1]
-                
-                # 遍历模块中的所有命令
-                for cmdObj in module_cmds.values():
-                    try:
-                        # 使用预编译的正则表达式
-                        match = cmdObj.matchRegex.fullmatch(cmdStr)
-                    except Exception as e:
-                        log.ex(e, f"命令: {cmdStr} 正则表达式错误: {cmdObj.match}")
-                        continue
-                    if match:
-                        cmdMatch = match.groupdict().get(cls.CmdKey)
-                        matchLength = len(cmdMatch) if cmdMatch else 0
-                        if matchLength > bestMatchLength:
-                            bestMatch = cmdObj
-                            m = match
-                            bestMatchLength = matchLength
-            find = bestMatch
+            # 由分派索引取出候选命令，找到命令名最长的匹配
+            find, m = cls._match(cmdStr)
             if find is None:
                 log.e(f'命令: {cmdStr} 未找到')
                 return None
             # 设置匹配到的参数
             kwargs = {}
-            for key, value in m.groupdict().items():
-                # 跳过命令关键字,这个不能作为参数
-                if key != cls.CmdKey:
-                    kwargs[key] = cls._cleanParam(value)
+            for key in find.groups:
+                kwargs[key] = cls._cleanParam(m.group(key))
             cmdName = find.name.lower()
             cmd['name'] = cmdName
             # 设置参数
             params = cmd.get('params') or {}
             params['cmd'] = cmd
-            sig = inspect.signature(find.func)
             for key, value in params.items():
-                if key in sig.parameters:
+                if key in find.paramNames:
                     kwargs[key] = value
             
             # 验证必须参数
-            missing_params = []
-            for param_name, param in sig.parameters.items():
-                # 检查参数是否有默认值
-                if param.default == inspect.Parameter.empty:
-                    # 没有默认值的参数是必须的
-                    if param_name not in kwargs or kwargs[param_name] is None:
-                        missing_params.append(param_name)
+            missing_params = [name for name in find.required
+                              if name not in kwargs or kwargs[name] is None]
             
             if missing_params:
                 error_msg = f"命令 '{cmdName}' 缺少必须参数: {', '.join(missing_params)}"
@@ -394,8 +451,9 @@ class _CmdMgr_:
             log.c_(f'<{cmdName}>:{cmdStr}', '')
             result = find.func(**kwargs)
             try:
-                # 检查是否能被json序列化
-                json.dumps(result)
+                # 检查是否能被json序列化，基本类型不需要检查
+                if not isinstance(result, cls._JsonTypes):
+                    json.dumps(result)
             except TypeError:
                 raise Exception(f"命令返回值不支持JSON序列化: {type(result)}，请检查实现")
             cmd['result'] = result
@@ -427,7 +485,8 @@ class _CmdMgr_:
                 if not cls._reloadSingleModule(moduleToReload):
                     log.e(f"重新加载模块 {moduleToReload} 失败")
                     return False
-            
+            # 模块更新后，清空已编译的规则缓存
+            g.Tools().clearRules()
             return True
         except Exception as e:
             _Log._Log_.ex(e, f"重新加载模块 {moduleName} 失败")
@@ -612,7 +671,11 @@ class _CmdMgr_:
                 
                 # 重新注册命令
                 cls._regCmd(module, log)
-                
+
+                # 重建该类的RPC分派表项
+                from RPC import rpcManager
+                rpcManager.reloadClass(g.getClassLazy(moduleName))
+
             else:
                 # 首次加载直接使用import_module
                 try:
@@ -144,6 +144,136 @@ class DateHelper:
     
 
 
+class PendingCall:
+    """等待应答的请求，由emit的应答回调完成
+    
+    使用threading.Event等待，eventlet模式下monkey_patch后为协程事件，
+    等待期间不占用轮询循环。
+    """
+
+    def __init__(self, requestId: int, event: str, sid=None):
+        self.requestId = requestId
+        self.event = event
+        self.sid = sid
+        self.result = None
+        self.cancelled = False
+        self._done = threading.Event()
+
+    def resolve(self, *args):
+        """应答回调"""
+        self.result = args[0] if args else None
+        self._done.set()
+        return self.result
+
+    def cancel(self):
+        """取消等待，等待方立即返回None"""
+        self.cancelled = True
+        self._done.set()
+
+    def wait(self, timeout: float) -> bool:
+        """等待应答，返回是否在超时前完成"""
+        return self._done.wait(timeout)
+
+
+class Clock:
+    """真实时钟：time/sleep/now直接使用系统时间"""
+    virtual = False
+
+    def time(self) -> float:
+        return time.time()
+
+    def sleep(self, seconds: float):
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def now(self) -> datetime:
+        return datetime.fromtimestamp(self.time())
+
+    def attach(self, thread: threading.Thread = None):
+        """登记推进时间的线程，真实时钟不需要"""
+
+    def detach(self, thread: threading.Thread = None):
+        """注销线程"""
+
+
+class VirtualClock(Clock):
+    """虚拟时钟：sleep不真正等待，时间直接推进到下一个唤醒时刻
+
+    只有sleep会推进时间，正在执行的代码不占用虚拟时间，
+    用于在录制的屏幕上加速模拟任务执行（模拟一小时只需几秒）。
+    推进时间的线程（设备更新循环等）用attach登记，所有登记的线程都在sleep时，
+    唤醒时刻最早的线程把时间推进到该时刻，避免某个线程还在执行时其他线程把时间推过头。
+    未登记的线程（如延迟清除屏幕信息的线程）只等待时间到达自己的唤醒时刻，不推进时间；
+    没有登记任何线程时，sleep的线程自己推进时间（单线程使用）。
+    """
+    virtual = True
+    Poll = 0.05  # 等待其他线程推进时间的检查间隔（真实秒）
+
+    def __init__(self, start: float = None):
+        self._now = time.time() if start is None else start
+        self._actors = set()  # 登记的线程
+        self._wakes = {}  # {登记的线程: 唤醒时刻}
+        self._others = []  # 未登记线程的唤醒时刻
+        self._cond = threading.Condition()
+        self.slept = 0.0  # 累计推进的虚拟时间（秒）
+
+    def time(self) -> float:
+        return self._now
+
+    def sleep(self, seconds: float):
+        thread = threading.current_thread()
+        with self._cond:
+            wake = self._now + max(0.0, seconds)
+            actor = thread in self._actors
+            if actor:
+                self._wakes[thread] = wake
+            else:
+                self._others.append(wake)
+            self._cond.notify_all()
+            try:
+                while self._now < wake:
+                    if actor:
+                        wakes = self._wakes
+                        ready = len(wakes) >= len(self._actors) and min(wakes.values()) >= wake
+                    else:
+                        ready = not self._actors and min(self._others) >= wake
+                    if ready:
+                        self.slept += wake - self._now
+                        self._now = wake
+                        break
+                    self._cond.wait(self.Poll)
+            finally:
+                if actor:
+                    del self._wakes[thread]
+                else:
+                    self._others.remove(wake)
+                self._cond.notify_all()
+
+    def attach(self, thread: threading.Thread = None):
+        """登记推进时间的线程，默认为当前线程，可以在线程启动前传入线程对象登记"""
+        with self._cond:
+            self._actors.add(thread or threading.current_thread())
+            self._cond.notify_all()
+
+    def detach(self, thread: threading.Thread = None):
+        """注销线程，默认为当前线程"""
+        with self._cond:
+            self._actors.discard(thread or threading.current_thread())
+            self._cond.notify_all()
+
+    def advance(self, seconds: float):
+        """直接推进时间（不等待唤醒）"""
+        self.advanceTo(self._now + seconds)
+
+    def advanceTo(self, t: float):
+        """推进到指定时刻，不会倒退"""
+        with self._cond:
+            if t > self._now:
+                self.slept += t - self._now
+                self._now = t
+            self._cond.notify_all()
+
+
 class _G_:
     # 使用线程安全的存储
     _lock = threading.Lock()
@@ -156,8 +286,16 @@ class _G_:
     android = None   # Android服务对象，由客户端设置
     _sio = None  # 实际的Socket.IO实例
     _consoles = set()  # 当前连接的控制台列表
-    _pending_requests = {}  # {request_id: (event, callback/future)}
+    _pending_requests = {}  # {request_id: PendingCall}
     _rpc_lock = threading.Lock()
+    _requestId = 0
+    clock: Clock = Clock()  # 时钟，模拟时替换为VirtualClock
+
+    @classmethod
+    def setClock(cls, clock: Clock = None) -> Clock:
+        """设置时钟，None表示使用真实时钟"""
+        cls.clock = clock or Clock()
+        return cls.clock
 
     @classmethod
     def sio(cls):
@@ -302,6 +440,7 @@ class _G_:
                     data = {}
                 data['device_id'] = device.name
                 sio.emit(event, data, callback=callback)
+            return True
         except Exception as e:
             log.ex_(e, f"发送事件失败: {event}, {data}")
             return False
@@ -309,37 +448,44 @@ class _G_:
     @classmethod
     def emitRet(cls, event, data=None, sid=None, timeout=10):
         """发送事件并等待结果"""
+        log = cls.log
+        call = None
         try:
-            log = cls.log
-            # log.i_(f'发送ddd: event={event}, data={data}')
-            result = None
-            wait = True
-            start_time = time.time()
-            
-            def onResult(*args):
-                nonlocal result
-                nonlocal wait
-                response = args[0] if args else None
-                result = response
-                # log.i_(f'收到事件结果: event={event}, result={result}')
-                wait = False
-                return result
-                
-            if not cls.emit(event, data, sid, timeout, onResult):
-                result = None
-                
-            # 添加超时控制的等待循环
-            while wait:
-                if time.time() - start_time > timeout:
-                    log.w_(f'事件超时: event={event}, timeout={timeout}s')
-                    wait = False
-                    result = None
-                    break
-                time.sleep(0.1)
-            return result
+            with cls._rpc_lock:
+                cls._requestId += 1
+                call = PendingCall(cls._requestId, event, sid)
+                cls._pending_requests[call.requestId] = call
+            if not cls.emit(event, data, sid, timeout, call.resolve):
+                return None
+            if not call.wait(timeout):
+                log.w_(f'事件超时: event={event}, timeout={timeout}s')
+                return None
+            if call.cancelled:
+                log.w_(f'事件已取消: event={event}')
+                return None
+            return call.result
         except Exception as e:
             log.ex_(e, f"发送事件失败: {event}, {data}")
             return None
+        finally:
+            if call:
+                with cls._rpc_lock:
+                    cls._pending_requests.pop(call.requestId, None)
+
+    @classmethod
+    def cancelPending(cls, sid=None) -> int:
+        """取消等待中的请求
+        Args:
+            sid: 只取消发往该连接的请求，为None时取消全部
+        Returns:
+            int: 取消的请求数
+        """
+        with cls._rpc_lock:
+            calls = [c for c in cls._pending_requests.values()
+                     if sid is None or c.sid == sid]
+        for call in calls:
+            call.cancel()
+        return len(calls)
     
     # @classmethod
     # def rpc(cls, event, data=None, timeout=8):
@@ -532,6 +678,16 @@ class _G_:
     def CFileServer(cls) -> 'CFileServer_':
         return cls.getClassLazy('CFileServer')
     
+    @classmethod
+    def CCounter(cls) -> 'CCounter_':
+        """获取设备本地计数器"""
+        return cls.getClassLazy('CCounter')
+    
+    @classmethod
+    def CReplay(cls) -> 'CReplay_':
+        """获取会话录制回放"""
+        return cls.getClassLazy('CReplay')
+    
     @classmethod
     def CmdMgr(cls) -> '_CmdMgr_':
         """获取命令管理器"""
@@ -738,6 +894,11 @@ class _G_:
             cls._dir = oldCls._dir
             cls._store = oldCls._store
             cls.android = oldCls.android  # 保留android对象
+            cls.clock = oldCls.clock
+            # 保留等待应答的请求，热更新前发出的请求仍能收到应答或被取消
+            cls._pending_requests = oldCls._pending_requests
+            cls._rpc_lock = oldCls._rpc_lock
+            cls._requestId = oldCls._requestId
         import _Log
         log = _Log._Log_
         cls.log = log
@@ -7,6 +7,7 @@ import json
 import glob
 import time
 import re
+from collections import deque
 from datetime import datetime, timedelta
 from typing import List
 from enum import Enum
@@ -20,6 +21,325 @@ class TAG(Enum):
     Server = "@"
 
 
+class LogIndex:
+    """日志文件的旁路索引 <日期>.idx
+    
+    日志按写入批次分块，每块记录在日志文件中的字节范围、条数、时间范围，
+    以及各级别、各标签的条数。_save追加日志时同步追加索引；
+    查询时只读取可能包含结果的块，并尽量按条数直接跳过整块。
+    """
+    BlockSize = 100  # 重建索引时每块的日志条数
+    _lock = threading.RLock()
+    _blocks = {}  # {日志文件路径: [块]}
+    _stale = set()  # 索引已删除、等待查询时重建的日志文件，追加时不再更新索引
+
+    @classmethod
+    def idxPath(cls, logFile: str) -> str:
+        return os.path.splitext(logFile)[0] + '.idx'
+
+    @classmethod
+    def tagKey(cls, tag) -> str:
+        return str(tag) if tag else ''
+
+    @classmethod
+    def makeBlock(cls, start: int, end: int, datas: List[dict]) -> dict:
+        """生成一个索引块"""
+        levels = {}
+        tags = {}
+        times = []
+        for data in datas:
+            level = data.get('level') or ''
+            levels[level] = levels.get(level, 0) + 1
+            tag = cls.tagKey(data.get('tag'))
+            tags[tag] = tags.get(tag, 0) + 1
+            times.append(data.get('time') or '')
+        return {
+            'o': start, 'e': end, 'c': len(datas),
+            't0': min(times) if times else '',
+            't1': max(times) if times else '',
+            'l': levels, 'g': tags,
+        }
+
+    @classmethod
+    def _read(cls, logFile: str) -> List[dict]:
+        """读取索引文件（已加载则直接返回）"""
+        blocks = cls._blocks.get(logFile)
+        if blocks is not None:
+            return blocks
+        blocks = []
+        path = cls.idxPath(logFile)
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        try:
+                            blocks.append(json.loads(line))
+                        except json.JSONDecodeError:
+                            blocks = []
+                            break
+        cls._blocks[logFile] = blocks
+        return blocks
+
+    @classmethod
+    def _write(cls, logFile: str, blocks: List[dict], mode='w'):
+        with open(cls.idxPath(logFile), mode, encoding='utf-8') as f:
+            for block in blocks:
+                f.write(json.dumps(block, ensure_ascii=False) + '\n')
+
+    @classmethod
+    def rebuild(cls, logFile: str) -> List[dict]:
+        """扫描日志文件重建索引"""
+        blocks = []
+        with open(logFile, 'rb') as f:
+            start = f.tell()
+            datas = []
+            for line in f:
+                try:
+                    datas.append(json.loads(line))
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    pass
+                if len(datas) >= cls.BlockSize:
+                    end = f.tell()
+                    blocks.append(cls.makeBlock(start, end, datas))
+                    start = end
+                    datas = []
+            end = f.tell()
+            if end > start:
+                blocks.append(cls.makeBlock(start, end, datas))
+        cls._write(logFile, blocks)
+        cls._blocks[logFile] = blocks
+        cls._stale.discard(logFile)
+        return blocks
+
+    @classmethod
+    def blocks(cls, logFile: str) -> List[dict]:
+        """获取与日志文件一致的索引，不一致时重建"""
+        with cls._lock:
+            blocks = cls._read(logFile)
+            size = os.path.getsize(logFile)
+            last = blocks[-1]['e'] if blocks else 0
+            if last != size:
+                blocks = cls.rebuild(logFile)
+            return blocks
+
+    @classmethod
+    def append(cls, logFile: str, start: int, end: int, datas: List[dict]):
+        """日志追加到文件后更新索引，需在写日志时持有_lock"""
+        if logFile in cls._stale:
+            return
+        blocks = cls._read(logFile)
+        last = blocks[-1]['e'] if blocks else 0
+        if last != start:
+            # 索引和日志文件不一致，删除索引，查询时重建
+            cls.forget(logFile)
+            cls._stale.add(logFile)
+            return
+        block = cls.makeBlock(start, end, datas)
+        cls._write(logFile, [block], 'a')
+        blocks.append(block)
+
+    @classmethod
+    def forget(cls, logFile: str):
+        """删除索引"""
+        with cls._lock:
+            cls._blocks.pop(logFile, None)
+            path = cls.idxPath(logFile)
+            if os.path.exists(path):
+                os.remove(path)
+
+    @classmethod
+    def _count(cls, block: dict, start, end, level, tag) -> int:
+        """块内满足条件的条数，无法从索引确定时返回None"""
+        if start and block['t0'] < start:
+            return None
+        if end and block['t1'] >= end:
+            return None
+        if level is not None and tag is not None:
+            return None
+        if level is not None:
+            return block['l'].get(level, 0)
+        if tag is not None:
+            return block['g'].get(tag, 0)
+        return block['c']
+
+    @classmethod
+    def query(cls, logFile: str, start: str = None, end: str = None, level: str = None,
+              tag: str = None, offset: int = 0, limit: int = None) -> List[dict]:
+        """查询日志
+        Args:
+            start/end: 时间范围[start, end)，格式同日志time字段
+            level: 日志级别
+            tag: 日志标签
+            offset/limit: 分页，从最新的日志往前计算
+        Returns:
+            List[dict]: 按时间顺序排列的日志数据
+        """
+        if not os.path.exists(logFile):
+            return []
+        blocks = cls.blocks(logFile)
+        if tag is not None:
+            tag = cls.tagKey(tag)
+
+        def hit(data):
+            t = data.get('time') or ''
+            if start and t < start:
+                return False
+            if end and t >= end:
+                return False
+            if level is not None and (data.get('level') or '') != level:
+                return False
+            if tag is not None and cls.tagKey(data.get('tag')) != tag:
+                return False
+            return True
+
+        result = []  # 从新到旧
+        skip = offset or 0
+        with open(logFile, 'rb') as f:
+            for block in reversed(blocks):
+                if limit is not None and len(result) >= limit:
+                    break
+                if start and block['t1'] < start:
+                    continue
+                if end and block['t0'] >= end:
+                    continue
+                if level is not None and not block['l'].get(level):
+                    continue
+                if tag is not None and not block['g'].get(tag):
+                    continue
+                count = cls._count(block, start, end, level, tag)
+                if count is not None and skip >= count:
+                    skip -= count
+                    continue
+                f.seek(block['o'])
+                datas = []
+                for line in f.read(block['e'] - block['o']).splitlines():
+                    try:
+                        data = json.loads(line)
+                    except (json.JSONDecodeError, UnicodeDecodeError):
+                        continue
+                    if hit(data):
+                        datas.append(data)
+                for data in reversed(datas):
+                    if skip > 0:
+                        skip -= 1
+                        continue
+                    result.append(data)
+                    if limit is not None and len(result) >= limit:
+                        break
+        result.reverse()
+        return result
+
+
+class LogBroadcaster:
+    """服务端日志推送
+    
+    每个控制台有自己的环形缓冲，新日志每隔FlushInterval秒或积累BatchSize条时合并为一次
+    S2B_sheetUpdate推送。控制台确认收到上一批之前不再推送（确认超时AckTimeout秒后视为已收到），
+    跟不上的控制台丢弃自己缓冲中最早的日志，丢弃条数随下一批数据的dropped字段上报，不影响其它控制台。
+    """
+    FlushInterval = 0.2  # 推送间隔（秒）
+    BatchSize = 50       # 积累到该条数立即推送
+    MaxPending = 1000    # 每个控制台的缓冲上限
+    AckTimeout = 5.0     # 等待控制台确认的超时（秒）
+
+    def __init__(self):
+        self._buffers = {}   # {sid: deque} 每个控制台待推送的日志
+        self._dropped = {}   # {sid: 条数} 每个控制台待上报的丢弃条数
+        self._inflight = {}  # {sid: 推送时间} 已推送未确认的控制台
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._running = False
+        self.sent = 0          # 已推送条数
+        self.batches = 0       # 已推送批次
+        self.totalDropped = 0  # 累计丢弃条数
+
+    def push(self, logData: dict):
+        """加入所有控制台的待推送日志"""
+        full = False
+        with self._lock:
+            for sid in tuple(_G._G_._consoles):
+                buffer = self._buffers.get(sid)
+                if buffer is None:
+                    buffer = self._buffers[sid] = deque(maxlen=self.MaxPending)
+                if len(buffer) == buffer.maxlen:
+                    self._dropped[sid] = self._dropped.get(sid, 0) + 1
+                buffer.append(logData)
+                if len(buffer) >= self.BatchSize and sid not in self._inflight:
+                    full = True
+        if not self._running:
+            self.start()
+        if full:
+            self._wake.set()
+
+    def _ack(self, sid):
+        """控制台确认收到一批日志"""
+        with self._lock:
+            self._inflight.pop(sid, None)
+        self._wake.set()
+
+    def flush(self):
+        """立即推送缓冲中的日志，跳过未确认上一批的控制台"""
+        now = time.time()
+        batches = []
+        with self._lock:
+            consoles = _G._G_._consoles
+            for sid in list(self._buffers):
+                if sid not in consoles:
+                    # 控制台已断开
+                    self._buffers.pop(sid, None)
+                    self._dropped.pop(sid, None)
+                    self._inflight.pop(sid, None)
+                    continue
+                sentAt = self._inflight.get(sid)
+                if sentAt is not None and now - sentAt < self.AckTimeout:
+                    continue
+                buffer = self._buffers[sid]
+                dropped = self._dropped.pop(sid, 0)
+                if not buffer and not dropped:
+                    continue
+                batches.append((sid, list(buffer), dropped))
+                buffer.clear()
+                self._inflight[sid] = now
+        for sid, batch, dropped in batches:
+            data = {'type': 'logs', 'data': batch}
+            if dropped:
+                data['dropped'] = dropped
+                self.totalDropped += dropped
+            try:
+                _G._G_.emit('S2B_sheetUpdate', data, sid=sid,
+                            callback=lambda *args, sid=sid: self._ack(sid))
+                self.sent += len(batch)
+                self.batches += 1
+            except Exception as e:
+                # 避免递归，直接打印错误而不是调用日志方法
+                print(f"[ERROR] 刷新前台日志数据失败: {e}")
+
+    def start(self):
+        """启动推送线程"""
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止推送线程，并推送剩余日志"""
+        self._running = False
+        self._wake.set()
+        with self._lock:
+            self._inflight.clear()
+        self.flush()
+
+    def _run(self):
+        while self._running:
+            self._wake.wait(self.FlushInterval)
+            self._wake.clear()
+            self.flush()
+
+
 class _Log_:
     """统一的日志管理类"""
     _cache: List['_Log_'] = []
@@ -27,6 +347,8 @@ class _Log_:
     _logCacheLock = threading.Lock()
     _maxCacheSize = 100  # 最大缓存条数
     _threadLocal = threading.local()  # 线程本地存储，避免递归调用
+    _broadcaster: LogBroadcaster = None  # 服务端日志推送
+    PageSize = 1000  # 前台每次加载的日志条数
 
     def __init__(self, data):
         """初始化日志对象"""
@@ -88,26 +410,19 @@ class _Log_:
                 return
                 
             today = datetime.now().strftime(_G.DateHelper.DATE_FORMAT)
-            baseLogDir = g.logDir()
-            
-            # 根据环境确定子目录名
-            if g.isServer():
-                subDir = 'server'
-            else:
-                device = g.CDevice()
-                subDir = device.name if device else 'unknown'
-            
+            logFile = cls._logFile(today)
             # 创建带设备/服务器名的日志目录
-            logDir = os.path.join(baseLogDir, subDir)
-            os.makedirs(logDir, exist_ok=True)
+            os.makedirs(os.path.dirname(logFile), exist_ok=True)
             
-            logFile = os.path.join(logDir, f'{today}.log')
-            
-            # 将dirty为True的日志追加到文件末尾，并设置dirty为False
-            with open(logFile, 'a', encoding='utf-8') as f:
-                for log in dirtyLogs:
-                    f.write(json.dumps(log.toSheetData(), 
-                                     ensure_ascii=False) + '\n')
+            # 将dirty为True的日志追加到文件末尾，同步更新索引，并设置dirty为False
+            datas = [log.toSheetData() for log in dirtyLogs]
+            with LogIndex._lock:
+                with open(logFile, 'ab') as f:
+                    start = f.tell()
+                    for data in datas:
+                        f.write((json.dumps(data, ensure_ascii=False) + '\n').encode('utf-8'))
+                    end = f.tell()
+                LogIndex.append(logFile, start, end, datas)
             # 将dirty为True的日志设置为False
             for log in dirtyLogs:
                 log.dirty = False
@@ -152,6 +467,7 @@ class _Log_:
                 
                 if fileDate < cutoffDate:
                     os.remove(logFile)
+                    LogIndex.forget(logFile)
                     cls.log_(f'删除过期日志文件: {fileName}')
                     
         except Exception as e:
@@ -169,93 +485,110 @@ class _Log_:
             cls.ex_(e, '添加日志到缓存失败')
 
     @classmethod
-    def _loadLogs(cls, date):
-        """内部日志加载方法，统一从文件加载"""
-        logs = []
+    def _logFile(cls, date) -> str:
+        """指定日期的日志文件路径"""
+        g = _G._G_
+        baseLogDir = g.logDir()
+        # 根据环境确定子目录名
+        if g.isServer():
+            subDir = 'server'
+        else:
+            device = g.CDevice()
+            subDir = device.name if device else 'unknown'
+        return os.path.join(baseLogDir, subDir, f'{date}.log')
+
+    @classmethod
+    def _loadLogs(cls, date, **filters):
+        """内部日志加载方法，统一从文件加载，filters见LogIndex.query"""
         try:
-            g = _G._G_
-            baseLogDir = g.logDir()
-            
-            # 根据环境确定子目录名
-            if g.isServer():
-                subDir = 'server'
-            else:
-                device = g.CDevice()
-                subDir = device.name if device else 'unknown'
-            
-            logDir = os.path.join(baseLogDir, subDir)
-            logFile = os.path.join(logDir, f'{date}.log')
-            
-            if os.path.exists(logFile):
-                with open(logFile, 'r', encoding='utf-8') as f:
-                    for line in f:
-                        line = line.strip()
-                        if line:
-                            try:
-                                logData = json.loads(line)
-                                logs.append(cls(logData))
-                            except json.JSONDecodeError:
-                                continue
+            datas = LogIndex.query(cls._logFile(date), **filters)
+            return [cls(data) for data in datas]
         except Exception as e:
             cls.ex_(e, f'从文件加载日志失败: {date}')
-        return logs
+            return []
 
     @classmethod
-    def getLogs(cls, date=None):
-        """获取指定日期的日志"""
-        g = _G._G_
-        try:
+    def _toTime(cls, date: str, value) -> str:
+        """查询时间参数转为日志time格式，只有时分秒时补上日期"""
+        if not value:
+            return None
+        value = str(value).strip()
+        if re.match(r'^\d{1,2}:\d{2}(:\d{2})?$', value):
+            value = f'{date} {value.zfill(8 if value.count(":") == 2 else 5)}'
+        return value
 
+    @classmethod
+    def getLogs(cls, date=None, start=None, end=None, level=None, tag=None,
+                page=0, pageSize=None):
+        """获取指定日期的日志
+        Args:
+            date: 日期，默认为今天
+            start/end: 时间范围[start, end)，支持"HH:MM[:SS]"或完整时间
+            level: 日志级别
+            tag: 日志标签
+            page/pageSize: 分页，第0页为最新的pageSize条，pageSize为空时返回全部
+        Returns:
+            List[_Log_]: 按时间顺序排列的日志
+        """
+        try:
             # 统一日期格式处理
             dateHelper = _G.DateHelper()
             date = dateHelper.normalize(date)
-            
+            start = cls._toTime(date, start)
+            end = cls._toTime(date, end)
+            if tag is not None:
+                tag = LogIndex.tagKey(tag)
+            # 今天还未写入文件的日志
+            pending = []
             if date == datetime.now().strftime(dateHelper.DATE_FORMAT):
-                # 如果是今天的日志，检查缓存
-                if cls._cache and len(cls._cache) > 0:
-                    first = cls._cache[0]
-                    # 使用统一格式比较缓存中的日期
-                    if dateHelper.normalize(first.date) == date:
-                        return cls._cache
-                # 缓存为空或缓存日期不匹配，加载今天的日志并缓存
-                logs = cls._loadLogs(date)
-                cls._cache = logs
+                with cls._logCacheLock:
+                    pending = [log for log in cls._cache if log.dirty]
+                pending = [log for log in pending if
+                           (not start or log.data.get('time', '') >= start) and
+                           (not end or log.data.get('time', '') < end) and
+                           (level is None or (log.data.get('level') or '') == level) and
+                           (tag is None or LogIndex.tagKey(log.data.get('tag')) == tag)]
                 cls._lastDate = date
-                cls.log_(f'加载了 {len(logs)} 条日志 (日期: {date})')
-                
-                # 如果是服务端，更新前台日志数据
-                if g.isServer():
-                    try:
-                        logData = [log.toSheetData() for log in logs]
-                        g.emit('S2B_sheetUpdate', 
-                               {'type': 'logs', 'data': logData})
-                        cls.log_(f'已更新前台日志数据，共 {len(logData)} 条')
-                    except Exception as e:
-                        cls.ex_(e, '更新前台日志数据失败')
-                
-                return cls._cache
-            else:
-                # 如果不是今天的日志，不缓存，直接返回
-                return cls._loadLogs(date)
+            if not pageSize:
+                return cls._loadLogs(date, start=start, end=end, level=level, tag=tag) + pending
+            # 分页：未写入文件的日志是最新的，先从中取
+            offset = max(0, int(page or 0)) * int(pageSize)
+            limit = int(pageSize)
+            n = len(pending)
+            pending = pending[n - min(offset + limit, n):n - min(offset, n)]
+            limit -= len(pending)
+            if limit <= 0:
+                return pending
+            return cls._loadLogs(date, start=start, end=end, level=level, tag=tag,
+                                 offset=max(0, offset - n), limit=limit) + pending
         except Exception as e:
             cls.ex_(e, '获取日志失败')
             return []
 
+    @classmethod
+    def broadcaster(cls) -> LogBroadcaster:
+        """获取服务端日志推送器"""
+        if cls._broadcaster is None:
+            cls._broadcaster = LogBroadcaster()
+        return cls._broadcaster
+
     @classmethod
     def uninit(cls):
         """反初始化日志系统，保存日志到文件"""
+        if cls._broadcaster:
+            cls._broadcaster.stop()
         cls._save(True)
         cls._clean()
         cls.clear()
 
     @classmethod
-    def gets(cls, date=None) -> List['_Log_']:
+    def gets(cls, date=None, **filters) -> List['_Log_']:
         """
         获取特定日期的所有日志（兼容方法，调用getLogs）
         :param date: 日期，默认为今天
         :return: 日志列表
         """
-        return cls.getLogs(date) 
+        return cls.getLogs(date, **filters) 
        
     @classmethod
     def genID(cls):
@@ -295,14 +628,9 @@ class _Log_:
             log = cls(logData)
             log.dirty = True
             cls._add(log)
-            # 服务器环境下刷新前台数据
+            # 服务器环境下刷新前台数据（批量推送）
             if _G._G_.isServer():
-                try:
-                    _G._G_.emit('S2B_sheetUpdate', 
-                               {'type': 'logs', 'data': [logData]})
-                except Exception as e:
-                    # 避免递归，直接打印错误而不是调用日志方法
-                    print(f"[ERROR] 刷新前台日志数据失败: {e}")
+                cls.broadcaster().push(logData)
                     
             return logData
         except Exception as e:
@@ -537,6 +865,7 @@ class _Log_:
         """初始化日志系统"""
         if oldCls:
             cls._cache = oldCls._cache        
+            cls._broadcaster = getattr(oldCls, '_broadcaster', None)
         print('日志系统初始化完成')
         # 延迟预加载日志，避免在系统初始化时调用emit
         try:
@@ -547,8 +876,11 @@ class _Log_:
                     import time
                     time.sleep(3)  # 等待2秒让系统完全初始化
                     try:
-                        today = datetime.now().strftime(_G.DateHelper.DATE_FORMAT)
-                        cls.getLogs(today)  # 这会加载今天的日志并发送到前台
+                        # 加载今天最新的一页日志并发送到前台
+                        logs = cls.getLogs(None, pageSize=cls.PageSize)
+                        logData = [log.toSheetData() for log in logs]
+                        _G._G_.emit('S2B_sheetUpdate', {'type': 'logs', 'data': logData})
+                        cls.log_(f'已更新前台日志数据，共 {len(logData)} 条')
                     except Exception as e:
                         print(f'延迟预加载日志失败: {e}')
                 
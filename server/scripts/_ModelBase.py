@@ -29,7 +29,8 @@ class _ModelBase_(Base_):
                 log.e('提交数据更新失败,modelClass为空')
                 return False
             
-            self.modelClass.commit(self.data)
+            # 延迟写入，由SModels.writeBehind合并后批量提交
+            self.modelClass.model.commitLater(self.data)
             self._isDirty = False
             return True
         except Exception as e:
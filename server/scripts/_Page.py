@@ -6,7 +6,6 @@ if TYPE_CHECKING:
     from _Tools import _Tools_
     from CApp import CApp_
 import threading
-import time
 import re
 
 class _Page_:
@@ -78,17 +77,29 @@ class _Page_:
         self._timeout = None  # 超时时间
         self._timeoutOp = None  # 超时操作
         self._timeouted = False  # 是否已经处理过超时
-        self._startTime = time.time()  # 开始时间
+        self._startTime = _G.g.clock.time()  # 开始时间
+
+    # 进入次数，客户端保存在本地计数器中（按天），重启后保留
+    @property
+    def _counterKey(self) -> str:
+        appName = self._app.name if self._app else ''
+        return f'{appName}.P_{self._name}'
 
-    # 进入次数
     @property
     def count(self) -> int:
-        """获取进入次数"""
-        return self.data.get('count', 0)
+        """获取当天进入次数"""
+        g = _G.g
+        if g.isServer():
+            return self.data.get('count', 0)
+        return g.CCounter().get(self._counterKey)
     @count.setter
     def count(self, value: int):
-        """设置进入次数"""
-        self.data['count'] = value
+        """设置当天进入次数"""
+        g = _G.g
+        if g.isServer():
+            self.data['count'] = value
+        else:
+            g.CCounter().set(self._counterKey, value)
 
     # 最大进入次数
     @property
@@ -234,6 +245,14 @@ class _Page_:
         else:
             self.setProp('timeout', [0, None])
 
+    @property
+    def timeLeft(self) -> Optional[float]:
+        """距离超时的剩余秒数，未配置超时或已经超时返回None"""
+        timeout = self.timeout[0]
+        if timeout <= 0 or self._timeouted:
+            return None
+        return max(0.0, timeout - (_G.g.clock.time() - self._startTime))
+
     def _updateTimeout(self, tools: "_Tools_")->bool:
         """更新超时检查"""
         timeoutConfig = self.timeout  # 这会触发getter处理
@@ -245,7 +264,7 @@ class _Page_:
         if self._timeouted:
             return True
         
-        pastTime = time.time() - self._startTime
+        pastTime = _G.g.clock.time() - self._startTime
         g = _G.g
         log = g.Log()
         log.d(f"{self.name} 倒计时 {timeout-pastTime}")
@@ -290,6 +309,11 @@ class _Page_:
         return self._running
 
     
+    def _onPropChanged(self, prop: str):
+        """属性修改后的处理：exit变化时清空应用的导航表"""
+        if prop == 'exit' and self.app:
+            self.app.clearNav()
+
     def addProp(self, prop: str, value: str, value1: str = None) -> bool:
         g = _G.g
         log = g.Log()
@@ -315,6 +339,7 @@ class _Page_:
             else:
                 log.e(f"不支持add的属性: {prop}")
                 return False
+            self._onPropChanged(prop)
             return True
         except Exception as e:
             log.ex(e, f"add{prop}失败: {value}")
@@ -345,6 +370,7 @@ class _Page_:
             else:
                 log.e(f"不支持remove的属性: {prop}")
                 return False
+            self._onPropChanged(prop)
             return True
         except Exception as e:
             log.ex(e, f"remove{prop}失败: {value}")
@@ -439,7 +465,7 @@ class _Page_:
                     # 延时执行：-5 表示延时5秒后执行
                     delay = int(key[1:])
                     log.d(f"延时{delay}秒后执行")
-                    time.sleep(delay)
+                    g.clock.sleep(delay)
                     execute = True
                 elif key == '':
                     log.d("无条件执行")
@@ -447,11 +473,9 @@ class _Page_:
                 else:
                     if key.startswith('%'):
                         # 处理概率
-                        probability = 0
-                        m = re.match(r'%(\d+)(.*)', key)
-                        if m:
-                            probability = int(m.group(1))
-                            key = m.group(2)
+                        rule = tools.toRule(key)
+                        probability = rule.prob
+                        key = rule.body
                         if probability > 0:
                             import random
                             if random.randint(1, 100) > probability:
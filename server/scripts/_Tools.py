@@ -3,6 +3,8 @@ import json
 from enum import Enum
 import re
 from typing import Any, Tuple, Optional, List, TYPE_CHECKING
+from collections import OrderedDict
+import threading
 import _G
 import time
 
@@ -70,12 +72,588 @@ class RegionCheck:
         """判断矩形是否在区域内"""
         return self.isIn(x1, y1) and self.isIn(x2, y2)
 
+    def rect(self) -> tuple:
+        """转换为SpatialIndex查询用的区域(x_min, y_min, x_max, y_max)，不限制的边为None"""
+        x_min = self._convertValue(self.region[0], True)
+        y_min = self._convertValue(self.region[1], False)
+        x_max = self._convertValue(self.region[2], True)
+        y_max = self._convertValue(self.region[3], False)
+        return tuple(v if v > 0 else None for v in (x_min, y_min, x_max, y_max))
+
     @staticmethod
     def values():
         """返回所有状态值"""
         return [state.value for state in TaskState]
     
 
+class Rule:
+    """编译后的规则表达式
+    
+    表达式在第一次使用时解析（分段、操作符、区域、概率、正则），
+    之后由_Tools_.toRule按表达式文本缓存复用，避免每次检查都重新解析
+    
+    不含@脚本段的规则，连续相同操作符的段（一组）内可以交换检查顺序而不改变结果：
+    &组遇到不满足即失败，|组遇到满足即成功。每段记录检查次数、满足次数和耗时，
+    按 耗时/失败概率（&组）或 耗时/满足概率（|组）从小到大排序，尽早得出结果。
+    """
+    _ProbPattern = re.compile(r'%(\d+)(.*)')
+    ReorderInterval = 16  # 每检查多少次重新排序
+    UnitCost = 0.0001     # 没有统计数据时，静态代价1对应的耗时（秒）
+    # 规则会在多个线程中检查（设备更新循环、指令线程），统计数据的修改需要加锁
+    _statsLock = threading.Lock()
+
+    def __init__(self, expr: str):
+        self.expr = expr
+        # 概率前缀：%50xxx 表示50%概率执行xxx
+        self.prob = 0
+        self.body = expr
+        if expr.startswith('%'):
+            m = self._ProbPattern.match(expr)
+            if m:
+                self.prob = int(m.group(1))
+                self.body = m.group(2)
+        self.segments = _Tools_._parseSegments(expr, '&') or []
+        # 不含@脚本段的规则只依赖屏幕内容，同一帧内结果可以复用
+        self.pure = not any(seg['condition'].lstrip('~').startswith('@')
+                            for seg in self.segments)
+        self._regexes = {}
+        # 可重排的段分组（按原顺序），只有一段或含@脚本段时为None
+        self.runs = self._runs() if self.pure and len(self.segments) > 1 else None
+        if self.runs:
+            self._costs = [self._staticCost(seg) for seg in self.segments]
+            self._stats = [[0, 0, 0.0] for _ in self.segments]  # [检查次数, 满足次数, 耗时合计]
+            self._order = None
+            self._evals = 0
+
+    def _runs(self) -> Optional[List[List[int]]]:
+        """按操作符把段分组，只有一组且只有一段时无需重排"""
+        runs = []
+        lastOp = None
+        for i, seg in enumerate(self.segments):
+            if runs and seg['op'] == lastOp:
+                runs[-1].append(i)
+            else:
+                runs.append([i])
+                lastOp = seg['op']
+        if all(len(run) == 1 for run in runs):
+            return None
+        return runs
+
+    @classmethod
+    def _staticCost(cls, seg: dict) -> float:
+        """静态估计检查代价：纯文字可用倒排索引，正则中有字面量可缩小范围，否则扫描整帧"""
+        pattern = seg['condition'].lstrip('~').strip()
+        if not any(c in ScreenIndex._Meta for c in pattern):
+            return 1.0
+        if ScreenIndex.literals(pattern):
+            return 2.0
+        return 4.0
+
+    def _rank(self, i: int, op: str) -> float:
+        calls, hits, total = self._stats[i]
+        cost = total / calls if calls else self._costs[i] * self.UnitCost
+        # 拉普拉斯平滑的满足概率
+        p = (hits + 1) / (calls + 2)
+        return cost / (1 - p) if op == '&' else cost / p
+
+    def order(self) -> Optional[List[List[int]]]:
+        """获取各组段的检查顺序"""
+        if not self.runs:
+            return None
+        with self._statsLock:
+            if self._order is None or self._evals % self.ReorderInterval == 0:
+                segments = self.segments
+                self._order = [sorted(run, key=lambda i: self._rank(i, segments[i]['op']))
+                               for run in self.runs]
+            self._evals += 1
+            return self._order
+
+    def record(self, i: int, ok: bool, cost: float):
+        """记录段的检查结果和耗时"""
+        with self._statsLock:
+            stat = self._stats[i]
+            stat[0] += 1
+            if ok:
+                stat[1] += 1
+            stat[2] += cost
+
+    def regex(self, pattern: str, ocr: bool = False) -> re.Pattern:
+        """获取条件对应的预编译正则（忽略大小写）
+        Args:
+            pattern: 条件文本
+            ocr: 是否替换OCR错误字符
+        """
+        key = (pattern, ocr)
+        regex = self._regexes.get(key)
+        if regex is None:
+            text = _G._G_.replaceOcrError(pattern) if ocr else pattern
+            regex = re.compile(text, re.IGNORECASE)
+            self._regexes[key] = regex
+        return regex
+
+    def __str__(self):
+        return f"Rule({self.expr}, segments={len(self.segments)})"
+
+
+class Rulebook:
+    """规则集：将一组规则（页面匹配、toast等）合并判定
+    
+    所有规则中的文字条件（原子）去重后，对当前帧统一匹配一次得到满足的原子集合，
+    每条规则再由该集合判定，规则数量增加时不会重复扫描屏幕。
+    含@脚本段或宏变量的规则无法预先判定，视为可能满足，由调用方按原逻辑检查。
+    原子按整个屏幕匹配，不考虑规则中的区域限制，得到的候选规则只会多不会少（故意放宽），
+    候选规则仍由调用方完整检查一次。
+    """
+
+    def __init__(self, exprs: List[str]):
+        self.exprs = tuple(exprs)
+        self.rules: List[Optional[Rule]] = []
+        atoms = {}
+        for expr in self.exprs:
+            rule = None if not expr or '#' in expr else _Tools_.toRule(expr)
+            if rule and rule.pure and rule.segments:
+                for seg in rule.segments:
+                    atoms[seg['condition'].lstrip('~').strip()] = False
+            else:
+                rule = None
+            self.rules.append(rule)
+        self.atoms = list(atoms)
+        self._version = -1
+        self._satisfied = atoms
+
+    def satisfied(self) -> dict:
+        """当前帧各原子的匹配结果 {原子: bool}，每帧只计算一次"""
+        tools = _Tools_
+        if self._version != tools.frameVersion:
+            recorder = tools._recorder
+            recorder.dry = True
+            try:
+                result = {atom: tools.toBool(tools.matchText(atom, None))
+                          for atom in self.atoms}
+            finally:
+                recorder.dry = False
+            self._satisfied = result
+            self._version = tools.frameVersion
+        return self._satisfied
+
+    def candidates(self, include=()) -> List[int]:
+        """返回当前帧可能满足的规则序号（按原顺序）
+        Args:
+            include: 不经过预判、始终作为候选的规则序号
+        """
+        tools = _Tools_
+        satisfied = None
+        result = []
+        for i, rule in enumerate(self.rules):
+            if rule is None or i in include:
+                result.append(i)
+                continue
+            if satisfied is None:
+                satisfied = self.satisfied()
+
+            def lookup(code, region):
+                ok = satisfied.get(code.strip(), False)
+                return ok, None
+            if tools.toBool(tools._evalSegments(rule.segments, lookup, True)):
+                result.append(i)
+        return result
+
+
+class ScreenIndex:
+    """屏幕文字倒排索引（每帧构建一次）
+    
+    - 文本缓冲：所有文字块(小写)用换行拼接，配合偏移表可由位置反查文字块
+    - 二元索引：字符二元组 -> 包含它的文字块序号列表
+    查询时先从正则中提取必须出现的字面量，用索引缩小候选文字块，再执行完整正则
+    """
+    _Meta = set('.^$*+?{}[]()|\\')
+    _Quantifiers = set('*?{')
+
+    def __init__(self, items: list):
+        self.items = items
+        self.size = len(items)
+        texts = [str(item.get('t') or '').lower() for item in items]
+        self.texts = texts
+        self.buffer = '\n'.join(texts)
+        # 每个文字块在缓冲中的起始偏移
+        self.offsets = []
+        self.bigrams = {}
+        offset = 0
+        for i, t in enumerate(texts):
+            self.offsets.append(offset)
+            offset += len(t) + 1
+            bigrams = self.bigrams
+            for j in range(len(t) - 1):
+                posting = bigrams.get(t[j:j + 2])
+                if posting is None:
+                    bigrams[t[j:j + 2]] = [i]
+                elif posting[-1] != i:
+                    posting.append(i)
+
+    def itemAt(self, offset: int) -> int:
+        """由缓冲偏移获取文字块序号"""
+        import bisect
+        return bisect.bisect_right(self.offsets, offset) - 1
+
+    @classmethod
+    def literals(cls, pattern: str) -> List[str]:
+        """提取正则匹配成功时必须出现的字面量（保守提取，无法确定时返回空）"""
+        if not pattern:
+            return []
+        # 十六进制/Unicode/反向引用等转义不做解析
+        if re.search(r'\\[xuUN0-9]', pattern):
+            return []
+        result = []
+        cur = []
+        depth = 0
+        inClass = False
+        i = 0
+        n = len(pattern)
+
+        def flush():
+            if cur:
+                result.append(''.join(cur))
+                cur.clear()
+        while i < n:
+            c = pattern[i]
+            if inClass:
+                if c == '\\':
+                    i += 1
+                elif c == ']':
+                    inClass = False
+                i += 1
+                continue
+            if c == '\\':
+                nxt = pattern[i + 1] if i + 1 < n else ''
+                i += 2
+                if depth > 0:
+                    continue
+                # 转义的标点是字面量，其它(\d \w \s等)为字符类
+                if nxt and not nxt.isalnum() and nxt not in ' \t':
+                    cur.append(nxt)
+                    if i < n and pattern[i] in cls._Quantifiers:
+                        cur.pop()
+                        flush()
+                else:
+                    flush()
+                continue
+            if c == '[':
+                inClass = True
+                flush()
+                i += 1
+                continue
+            if c == '(':
+                depth += 1
+                flush()
+            elif c == ')':
+                depth = max(depth - 1, 0)
+            elif c == '|':
+                # 存在分支时无法确定必须出现的字面量
+                if depth == 0:
+                    return []
+            elif depth == 0:
+                if c in cls._Quantifiers:
+                    # 前一个字符可以不出现
+                    if cur:
+                        cur.pop()
+                    flush()
+                    if c == '{':
+                        end = pattern.find('}', i)
+                        i = n if end < 0 else end
+
+                elif c in cls._Meta:
+                    flush()
+                else:
+                    cur.append(c)
+            i += 1
+        flush()
+        # 只保留大小写转换后长度不变的字面量，保证与忽略大小写的正则一致
+        ret = []
+        for lit in result:
+            low = lit.lower()
+            if low and len(low) == len(lit):
+                ret.append(low)
+        return ret
+
+    def _candidates(self, literal: str) -> Optional[set]:
+        """获取包含字面量的文字块序号集合"""
+        if len(literal) == 1:
+            found = set()
+            buffer = self.buffer
+            pos = buffer.find(literal)
+            while pos >= 0:
+                idx = self.itemAt(pos)
+                found.add(idx)
+                # 跳到下一个文字块继续查找
+                nxt = self.offsets[idx + 1] if idx + 1 < self.size else len(buffer)
+                pos = buffer.find(literal, nxt)
+            return found
+        postings = []
+        for j in range(len(literal) - 1):
+            posting = self.bigrams.get(literal[j:j + 2])
+            if not posting:
+                return set()
+            postings.append(posting)
+        postings.sort(key=len)
+        found = set(postings[0])
+        for posting in postings[1:]:
+            found.intersection_update(posting)
+            if not found:
+                break
+        return found
+
+    def candidates(self, pattern: str) -> list:
+        """获取可能匹配正则的文字块列表（保持原始顺序）"""
+        literals = self.literals(pattern)
+        if not literals:
+            return self.items
+        found = None
+        for literal in sorted(literals, key=len, reverse=True):
+            ids = self._candidates(literal)
+            found = ids if found is None else found & ids
+            if not found:
+                return []
+        items = self.items
+        texts = self.texts
+        # 二元组可能来自不连续的位置，这里用子串确认
+        return [items[i] for i in sorted(found)
+                if all(lit in texts[i] for lit in literals)]
+
+
+class SpatialIndex:
+    """二维网格空间索引（每帧构建一次）
+
+    屏幕按CellSize划分为均匀网格，每个文字块登记到它的矩形覆盖的所有格子。
+    - within: 查询完全落在区域内的文字块，只访问与区域相交的格子
+    - nearest: 按加权曼哈顿距离(以矩形左上角为锚点)查询最近的k个文字块，由近到远逐圈访问格子
+    """
+    CellSize = 200
+
+    def __init__(self, items: list, rects: list = None, cell: int = None):
+        """
+        Args:
+            items: 文字块列表
+            rects: 与items对应的矩形(x1, y1, x2, y2)，不提供时由文字块的'b'解析
+            cell: 格子大小
+        """
+        self.items = items
+        self.size = len(items)
+        self.cell = cell or self.CellSize
+        self.rects = rects if rects is not None else [self.toRect(i.get('b')) for i in items]
+        self.grid = {}
+        self._extent = None  # 有文字块的格子范围(cx0, cy0, cx1, cy1)
+        c = self.cell
+        for i, r in enumerate(self.rects):
+            if r is None:
+                continue
+            cx0, cx1 = sorted((int(r[0] // c), int(r[2] // c)))
+            cy0, cy1 = sorted((int(r[1] // c), int(r[3] // c)))
+            for cx in range(cx0, cx1 + 1):
+                for cy in range(cy0, cy1 + 1):
+                    cellItems = self.grid.get((cx, cy))
+                    if cellItems is None:
+                        self.grid[(cx, cy)] = [i]
+                    else:
+                        cellItems.append(i)
+            e = self._extent
+            self._extent = (cx0, cy0, cx1, cy1) if e is None else (
+                min(e[0], cx0), min(e[1], cy0), max(e[2], cx1), max(e[3], cy1))
+
+    @classmethod
+    def toRect(cls, b) -> Optional[tuple]:
+        """解析边界坐标，支持"x1,y1,x2,y2"字符串和列表，非法时返回None"""
+        try:
+            if isinstance(b, str):
+                b = b.split(',')
+            if not b or len(b) < 4:
+                return None
+            return tuple(int(v) for v in b[:4])
+        except (TypeError, ValueError):
+            return None
+
+    def within(self, x1=None, y1=None, x2=None, y2=None) -> list:
+        """获取完全落在区域内的文字块（保持原顺序），为None的边不限制"""
+        e = self._extent
+        if e is None:
+            return []
+        c = self.cell
+        cx0 = e[0] if x1 is None else max(e[0], int(x1 // c))
+        cy0 = e[1] if y1 is None else max(e[1], int(y1 // c))
+        cx1 = e[2] if x2 is None else min(e[2], int(x2 // c))
+        cy1 = e[3] if y2 is None else min(e[3], int(y2 // c))
+        found = set()
+        grid = self.grid
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                cellItems = grid.get((cx, cy))
+                if cellItems:
+                    found.update(cellItems)
+        rects = self.rects
+        result = []
+        for i in sorted(found):
+            r = rects[i]
+            if x1 is not None and min(r[0], r[2]) < x1:
+                continue
+            if x2 is not None and max(r[0], r[2]) > x2:
+                continue
+            if y1 is not None and min(r[1], r[3]) < y1:
+                continue
+            if y2 is not None and max(r[1], r[3]) > y2:
+                continue
+            result.append(self.items[i])
+        return result
+
+    def _ring(self, cx, cy, r):
+        """第r圈的格子"""
+        if r == 0:
+            yield cx, cy
+            return
+        for dx in range(-r, r + 1):
+            yield cx + dx, cy - r
+            yield cx + dx, cy + r
+        for dy in range(-r + 1, r):
+            yield cx - r, cy + dy
+            yield cx + r, cy + dy
+
+    def nearest(self, x, y, k=1, wx=1.0, wy=1.0, accept=None) -> list:
+        """获取距离(x, y)最近的k个文字块，由近到远排列，距离相同时按原顺序
+
+        Args:
+            wx, wy: 距离权重，距离为 wx*|dx| + wy*|dy|，以矩形左上角为锚点
+            accept: 过滤函数，参数为文字块，返回False的不参与比较
+        """
+        e = self._extent
+        if e is None or k <= 0:
+            return []
+        c = self.cell
+        cx, cy = int(x // c), int(y // c)
+        maxR = max(abs(cx - e[0]), abs(cx - e[2]), abs(cy - e[1]), abs(cy - e[3]))
+        w = min(wx, wy) * c
+        grid = self.grid
+        rects = self.rects
+        items = self.items
+        seen = set()
+        best = []
+        for r in range(maxR + 1):
+            for cell in self._ring(cx, cy, r):
+                cellItems = grid.get(cell)
+                if not cellItems:
+                    continue
+                for i in cellItems:
+                    if i in seen:
+                        continue
+                    seen.add(i)
+                    if accept and not accept(items[i]):
+                        continue
+                    rect = rects[i]
+                    best.append((wx * abs(rect[0] - x) + wy * abs(rect[1] - y), i))
+            if len(best) >= k:
+                best.sort()
+                del best[k:]
+                # 锚点在更外圈的文字块距离都大于 w*r
+                if best[-1][0] <= w * r:
+                    break
+        best.sort()
+        return [items[i] for _, i in best[:k]]
+
+
+class Similarity:
+    """位并行LCS相似度计算（Hyyrö/Allison-Dix算法）
+    
+    对查询文本预先计算每个字符的位置位掩码，比较时每个字符只需几次整数位运算，
+    支持一个查询文本对整帧文字批量打分，并在无法达到阈值时提前退出
+    """
+
+    def __init__(self, query: str):
+        self.query = query or ''
+        self.m = len(self.query)
+        self.full = (1 << self.m) - 1
+        masks = {}
+        for i, c in enumerate(self.query):
+            masks[c] = masks.get(c, 0) | (1 << i)
+        self.masks = masks
+
+    @staticmethod
+    def _bitCount(value: int) -> int:
+        return bin(value).count('1')
+
+    @staticmethod
+    def _need(length: int, threshold: float, strict: bool = False, best: float = 0.0) -> int:
+        """达到阈值（以及严格超过best）所需的最小LCS长度"""
+        k = max(int(threshold * length) - 1, 0)
+        while k <= length:
+            sim = k / length
+            if sim >= threshold and (not strict or sim > best):
+                break
+            k += 1
+        return k
+
+    def lcs(self, text: str, need: int = 0) -> int:
+        """计算与text的最长公共子序列长度
+        Args:
+            text: 待比较文本
+            need: 需要达到的最小长度，确定无法达到时提前返回-1
+        """
+        m = self.m
+        n = len(text) if text else 0
+        if m == 0 or n == 0:
+            return -1 if need > 0 else 0
+        if need > min(m, n):
+            return -1
+        masks = self.masks
+        full = self.full
+        v = full
+        for j, c in enumerate(text):
+            mask = masks.get(c)
+            if mask:
+                u = v & mask
+                v = ((v + u) | (v - u)) & full
+            rest = n - j - 1
+            # 只有剩余字符数不足时才可能提前退出
+            if rest < need and m - self._bitCount(v) + rest < need:
+                return -1
+        return m - self._bitCount(v)
+
+    def similarity(self, text: str) -> float:
+        """相似度：最长公共子序列长度 / 较长字符串的长度"""
+        if not self.query or not text:
+            return 0.0
+        if self.query == text:
+            return 1.0
+        return self.lcs(text) / max(self.m, len(text))
+
+    def best(self, items, threshold=0) -> Tuple[Any, float]:
+        """在一组文字中查找相似度最高的项（首个最大值，且不低于阈值）
+        Args:
+            items: 文字列表，元素为字符串或{'t':...}
+            threshold: 相似度阈值
+        Returns:
+            (item, similarity): 未找到时item为None
+        """
+        retItem = None
+        maxSim = 0
+        query = self.query
+        for item in items:
+            text = item if isinstance(item, str) else item['t']
+            if not query or not text:
+                sim = 0.0
+            elif query == text:
+                sim = 1.0
+            else:
+                length = max(self.m, len(text))
+                need = self._need(length, threshold, retItem is not None, maxSim)
+                lcs = self.lcs(text, need)
+                if lcs < 0:
+                    continue
+                sim = lcs / length
+            if sim < threshold:
+                continue
+            if retItem is None or sim > maxSim:
+                retItem = item
+                maxSim = sim
+        return retItem, maxSim
+
+
 class _Tools_:
 
     class eRet(Enum):
@@ -95,6 +673,20 @@ class _Tools_:
     screenSize: tuple[int, int] = (1080, 1920)
     _fixFactor = 0
     _screenInfoCache: list[dict] = None
+    _screenIndex: ScreenIndex = None
+    _spatialIndex: SpatialIndex = None
+    # 帧版本号：屏幕信息每次变化加1
+    frameVersion = 0
+    # 执行点击、滑动等操作后，当前帧视为过期，下次获取时重新读取屏幕
+    _frameStale = False
+    # 当前线程是否在设备更新节拍内，只有节拍内getScreenInfo才复用本节拍读取的屏幕
+    _tick = threading.local()
+    # 最近一次点击、滑动等操作的时间，用于设备更新循环调度
+    actionTime = 0.0
+    # 当前帧内的条件检查结果缓存：(帧版本号, 检查结果)，整体替换，多线程下版本号和结果不会错配
+    _memo = (-1, {})
+    _memoLock = threading.Lock()
+    _recorder = threading.local()
     
     # 文本查找计数的键名常量
     FINDCOUNT_KEY = 'findCount'
@@ -168,7 +760,8 @@ class _Tools_:
             return True
         if this is None:
             this = g.CDevice().currentApp
-        segments = cls._parseSegments(str, '&', this)
+        rule = cls.toRule(str, this)
+        segments = rule.segments if rule else None
         if not segments:
             return False        
 
@@ -179,7 +772,32 @@ class _Tools_:
             else:
                 result, data = ret
                 return cls.toBool(result), data
-        success, _ = cls._evalSegments(segments, call, True)
+        if not rule.pure:
+            success, _ = cls._evalSegments(segments, call, True)
+            return success
+        # 同一帧内复用检查结果，并重放匹配结果对this.data的写入
+        memo = cls._frameMemo()
+        key = ('c', rule.expr)
+        hit = memo.get(key)
+        if hit is not None:
+            success, applied = hit
+            for matches in applied:
+                cls._applyMatches(matches, this)
+            return success
+        recorder = cls._recorder
+        outer = getattr(recorder, 'matches', None)
+        applied = []
+        recorder.matches = applied
+        try:
+            if rule.runs:
+                success = cls._checkOrdered(rule, call, this)
+            else:
+                success, _ = cls._evalSegments(segments, call, True)
+        finally:
+            recorder.matches = outer
+            if outer is not None:
+                outer.extend(applied)
+        memo[key] = (success, applied)
         return success
     
     @classmethod
@@ -198,7 +816,8 @@ class _Tools_:
             if str == '':
                 return
             this = this or g.CDevice().currentApp
-            segments = cls._parseSegments(str, '&', this)
+            rule = cls.toRule(str, this)
+            segments = rule.segments if rule else None
             if not segments:
                 # 如果解析失败，返回None
                 return None
@@ -212,6 +831,91 @@ class _Tools_:
             log.ex(e, f"执行多条件逻辑失败: {str}")
             return None
 
+    # 编译规则缓存，按LRU淘汰：
+    # 不含宏或宏替换结果与上下文无关的表达式，键为原始表达式；宏替换依赖上下文变量的，键为(原始表达式, 替换结果)
+    _rules: "OrderedDict[Any, Rule]" = OrderedDict()
+    _rulesLock = threading.Lock()
+    MaxRules = 1024
+
+    @classmethod
+    def toRule(cls, expr: str, this: "_App_" = None) -> Optional[Rule]:
+        """获取表达式的编译规则（带缓存）
+        
+        Args:
+            expr: 规则表达式
+            this: 调用上下文，用于宏变量替换
+            
+        Returns:
+            Rule: 编译后的规则，表达式为空时返回None
+        """
+        expr = expr.strip() if expr else ''
+        if expr == '':
+            return None
+        rules = cls._rules
+        macro = '#' in expr
+        if not macro or this is not None:
+            # 按原始表达式查找，命中时不再做宏替换
+            with cls._rulesLock:
+                rule = rules.get(expr)
+                if rule is not None:
+                    rules.move_to_end(expr)
+                    return rule
+        key = text = expr
+        if macro:
+            if this is not None:
+                text = cls._replaceMacro(this, expr)
+            if this is None or not cls._isStaticMacro(expr):
+                key = (expr, text)
+                with cls._rulesLock:
+                    rule = rules.get(key)
+                    if rule is not None:
+                        rules.move_to_end(key)
+                        return rule
+        rule = Rule(text)
+        with cls._rulesLock:
+            rules[key] = rule
+            if len(rules) > cls.MaxRules:
+                rules.popitem(last=False)
+        return rule
+
+    @classmethod
+    def _isStaticMacro(cls, text: str) -> bool:
+        """表达式中的宏是否都是MacroMap中的宏命令（替换结果与上下文变量无关）"""
+        text = _G._G_.replaceSymbols(text)
+        for match in re.finditer(r'#([^#]+)#?', text):
+            name = match.group(1)
+            if not any(re.match(f"^{pattern}$", name, re.IGNORECASE) for pattern in cls.MacroMap):
+                return False
+        return True
+
+    @classmethod
+    def clearRules(cls):
+        """清空编译规则和脚本缓存，配置重新加载或模块热更新时调用"""
+        with cls._rulesLock:
+            cls._rules.clear()
+            cls._scripts.clear()
+        cls._evalLocal = threading.local()
+
+    # 脚本编译缓存：脚本源码 -> 代码对象，按LRU淘汰
+    _scripts: "OrderedDict[str, Any]" = OrderedDict()
+    MaxScripts = 512
+
+    @classmethod
+    def compileScript(cls, code: str):
+        """获取脚本的代码对象（带缓存），语法错误时抛出SyntaxError"""
+        scripts = cls._scripts
+        with cls._rulesLock:
+            co = scripts.get(code)
+            if co is not None:
+                scripts.move_to_end(code)
+                return co
+        co = compile(code, '<script>', 'exec')
+        with cls._rulesLock:
+            scripts[code] = co
+            if len(scripts) > cls.MaxScripts:
+                scripts.popitem(last=False)
+        return co
+
     @classmethod
     def _parseSegments(cls, expr: str, default_op: str = None, this: "_App_" = None) -> list:
         """解析逻辑表达式为段列表（通用版本）
@@ -269,6 +973,73 @@ class _Tools_:
         
         return segments
 
+    @classmethod
+    def _checkOrdered(cls, rule: Rule, func: callable, this: "_App_") -> bool:
+        """按规则统计的代价顺序检查，结果和对this.data的写入都与按书写顺序检查相同
+
+        检查时匹配结果（_mt/_mb、分组参数、findCount）先暂存。一组提前得出结果后，
+        再按书写顺序走一遍该组：书写顺序下会检查到、但还没有检查的段补做检查，
+        书写顺序下不会检查到的段丢弃其匹配结果。最后按书写顺序写入this.data。
+        补做的检查通常命中当前帧的匹配缓存（Rulebook预判时已匹配过各原子），代价很小。
+        """
+        segments = rule.segments
+        recorder = cls._recorder
+        outer = getattr(recorder, 'deferred', None)
+        effects = {}
+        evaluated = {}  # {段序号: 是否满足}
+        result = None
+
+        def condition(i):
+            code = segments[i]['condition']
+            if code.startswith('~'):
+                # 如果当前是安卓平台，则跳过~开始的测试指令。
+                if cls.isAndroid():
+                    return None
+                code = code[1:]
+            return code
+        try:
+            for run in rule.order():
+                op = segments[run[0]]['op']
+                stopped = False
+                for i in run:
+                    code = condition(i)
+                    if code is None:
+                        continue
+                    recorder.deferred = effects.setdefault(i, [])
+                    start = time.perf_counter()
+                    result = func(code, segments[i]['region'])
+                    bResult = cls.toBool(result)
+                    evaluated[i] = bResult
+                    rule.record(i, bResult, time.perf_counter() - start)
+                    if (not bResult and op == '&') or (bResult and op == '|'):
+                        result = bResult
+                        stopped = True
+                        break
+                if not stopped:
+                    continue
+                # 按书写顺序补齐该组的检查，并丢弃书写顺序下不会检查到的段的匹配结果
+                last = None
+                for i in sorted(run):
+                    code = condition(i)
+                    if code is None:
+                        continue
+                    if i not in evaluated:
+                        recorder.deferred = effects.setdefault(i, [])
+                        evaluated[i] = cls.toBool(func(code, segments[i]['region']))
+                    if (not evaluated[i] and op == '&') or (evaluated[i] and op == '|'):
+                        last = i
+                        break
+                for i in run:
+                    if i > last:
+                        effects.pop(i, None)
+                break
+        finally:
+            recorder.deferred = outer
+        for i in sorted(effects):
+            for matches in effects[i]:
+                cls._applyMatches(matches, this)
+        return cls.toBool(result)
+
     @classmethod
     def _evalSegments(cls, segments: list, func: callable, logicOpt: bool = False) -> Any:
         """评估段列表的匹配结果（通用版本）
@@ -416,6 +1187,11 @@ class _Tools_:
         "clk(\S+)": "cPage.click($1,'')" # 点击回退上一页
     }
 
+    # 脚本执行环境中的变量名，其它变量是脚本中定义的临时变量，执行后清除
+    _EvalKeys = frozenset(('app', 't', 'log', 'it', 'cPage', 'cTask', 'cApp', 'g', 'R', 'r'))
+    # 每个线程复用一个执行环境
+    _evalLocal = threading.local()
+
     @classmethod
     def eval(cls, this: "_App_", code: str, log: _G._G_.Log):
         """执行脚本
@@ -423,33 +1199,48 @@ class _Tools_:
         result = True  # 这个值会作为执行结果返回
         
         不支持在顶层代码中使用return语句，因为在Python的非函数上下文中不允许return。
+        脚本编译后按源码缓存；执行环境每个线程复用一个，每次执行前重新设置全部环境变量
+        （脚本可能给t、g、R等重新赋值，_G热加载后g也会变化），
+        脚本中嵌套执行脚本时使用新的执行环境。
         """
         g = _G._G_
+        local = cls._evalLocal
+        nested = getattr(local, 'busy', False)
+        env = None if nested else getattr(local, 'env', None)
         try:
-            App = g.App()
-            cApp = g.CDevice().currentApp
-            # 创建安全的执行环境
-            locals = {
-                'app': App,
-                't': cls,
-                'log': log,
-                'it': this,
-                'cPage': this.curPage,
-                'cTask': g.CDevice().curTask(),
-                'cApp': cApp,
-                'g': g,
-                'R': _Tools_.eRet,
-                'r': None  # 用于存储结果
-            }
-            # 使用exec执行代码
-            exec(code, cls.gl, locals)
+            co = cls.compileScript(code)
+            if env is None:
+                env = {}
+                if not nested:
+                    local.env = env
+            device = g.CDevice()
+            env['t'] = cls
+            env['g'] = g
+            env['R'] = _Tools_.eRet
+            env['app'] = g.App()
+            env['log'] = log
+            env['it'] = this
+            env['cPage'] = this.curPage
+            env['cTask'] = device.curTask()
+            env['cApp'] = device.currentApp
+            env['r'] = None  # 用于存储结果
+            local.busy = True
+            try:
+                # 使用exec执行代码
+                exec(co, cls.gl, env)
+            finally:
+                local.busy = nested
             # 返回result变量的值
-            ret = locals.get('r', cls.eRet.none)
+            ret = env.get('r', cls.eRet.none)
             # log.i(f"执行脚本结果: {ret}")
             return ret
         except Exception as ex:
             log.ex(ex, f"执行规则失败: {code}")
             return None
+        finally:
+            if env is not None and len(env) != len(cls._EvalKeys):
+                for k in [k for k in env if k not in cls._EvalKeys]:
+                    del env[k]
         
 
     @classmethod
@@ -670,56 +1461,17 @@ class _Tools_:
         """
         if not tarText or not text:
             return 0.0
-        
         # 如果两个字符串完全相同，直接返回1.0
         if tarText == text:
             return 1.0
-        
-        # 最长公共子序列算法
-        len1, len2 = len(tarText), len(text)
-        
-        # 创建动态规划表
-        dp = [[0] * (len2 + 1) for _ in range(len1 + 1)]
-        
-        # 填充动态规划表
-        for i in range(1, len1 + 1):
-            for j in range(1, len2 + 1):
-                if tarText[i-1] == text[j-1]:
-                    dp[i][j] = dp[i-1][j-1] + 1
-                else:
-                    dp[i][j] = max(dp[i-1][j], dp[i][j-1])
-        
-        # 计算最长公共子序列的长度
-        lcs_length = dp[len1][len2]
-        
-        # 计算相似度：最长公共子序列长度 / 较长字符串的长度
-        similarity = lcs_length / max(len1, len2)
-        
-        return similarity
-    
+        # 位并行计算最长公共子序列，相似度 = LCS长度 / 较长字符串的长度
+        return Similarity(tarText).similarity(text)
 
     @classmethod
     def similarMatch(cls, tarText, items, threshold=0)->Tuple[Any, float]:
         log = _G._G_.Log()
         log.i(f"wildMatch: {tarText}, threshold={threshold}")
-        retItem = None
-        maxSim = 0
-        for item in items:
-            if isinstance(item, str):
-                text = item
-            else:
-                text = item['t']
-            sim = cls.getSimilarity(tarText, text)
-            if sim < threshold:
-                continue
-            if retItem is None:
-                retItem = item
-                maxSim = sim
-            else:
-                if sim > maxSim:
-                    retItem = item
-                    maxSim = sim
-        return retItem, maxSim
+        return Similarity(tarText).best(items, threshold)
     
     @classmethod
     def wildMatchText(cls, pattern, items):
@@ -746,7 +1498,7 @@ class _Tools_:
             return []
     
     @classmethod
-    def matchItems(cls, pattern:str, items:list, replaceOcrError:bool=False):
+    def matchItems(cls, pattern:str, items:list, replaceOcrError:bool=False, rule:Rule=None):
         """正则匹配项目列表
         
         使用正则表达式进行匹配，直接返回匹配的项目和匹配结果组成的元组列表
@@ -755,6 +1507,7 @@ class _Tools_:
             pattern: 正则表达式模式字符串
             items: 项目列表
             replaceOcrError: 是否替换OCR错误字符
+            rule: 编译规则，提供时复用其中预编译的正则
         Returns:
             list: 包含元组(item, match)的列表，item是匹配的项目，match是正则表达式匹配结果
         """
@@ -763,10 +1516,18 @@ class _Tools_:
         matches = []
         if pattern and items:
             try:
-                if replaceOcrError:
-                    pattern = g.replaceOcrError(pattern)
-                # 编译正则表达式
-                regex = re.compile(pattern, re.IGNORECASE)            
+                if rule:
+                    regex = rule.regex(pattern, replaceOcrError)
+                else:
+                    if replaceOcrError:
+                        pattern = g.replaceOcrError(pattern)
+                    # 编译正则表达式
+                    regex = re.compile(pattern, re.IGNORECASE)
+                # 当前帧的文字块，先用索引缩小候选范围
+                if items is cls._screenInfoCache:
+                    index = cls.screenIndex()
+                    if index:
+                        items = index.candidates(regex.pattern)
                 # 存储匹配结果的元组列表
                 for item in items:
                     t = item.get('t', '')
@@ -833,6 +1594,7 @@ class _Tools_:
         log = g.Log()
         log.i("返回桌面")
         if g.android:
+            cls._onAction()
             if not g.android.goHome():
                 return False
         return True     
@@ -842,6 +1604,7 @@ class _Tools_:
         """统一返回上一页实现"""
         g = _G._G_
         if g.android:
+            cls._onAction()
             return g.android.goBack()
         else:
             return True
@@ -940,6 +1703,10 @@ class _Tools_:
             android = g.android
             if not android:
                 return cls._screenInfoCache
+            # 节拍内当前帧未过期时直接使用缓存，节拍外每次都重新读取
+            if not refresh and not cls._frameStale and cls._screenInfoCache is not None \
+                    and getattr(cls._tick, 'active', False):
+                return cls._screenInfoCache
             
             info = android.getScreenInfo()
             if info is None:
@@ -964,7 +1731,7 @@ class _Tools_:
                     'b': bound
                 })
                 
-            cls._screenInfoCache = result
+            cls._setScreenInfos(result)
             return result
         except Exception as e:
             log.ex(e, "获取屏幕信息失败")
@@ -992,7 +1759,7 @@ class _Tools_:
             if not isinstance(screenInfo, list):
                 return False            
             # 保存到缓存
-            cls._screenInfoCache = screenInfo
+            cls._setScreenInfos(screenInfo)
             log.i(f"屏幕信息已设置，共{len(screenInfo)}个元素")
             return True
         except Exception as e:
@@ -1002,7 +1769,7 @@ class _Tools_:
     @classmethod
     def clearScreenInfo(cls):
         """清除屏幕信息"""
-        cls._screenInfoCache = []
+        cls._setScreenInfos([])
         return True
     
     @classmethod
@@ -1012,7 +1779,7 @@ class _Tools_:
         try:
             if cls._screenInfoCache is None:
                 return False
-            cls._screenInfoCache = [item for item in cls._screenInfoCache if item['t'] != content]
+            cls._setScreenInfos([item for item in cls._screenInfoCache if item['t'] != content])
             # log.i(f"删除屏幕信息: {content} \n info={cls._screenInfoCache}")
             return True
         except Exception as e:
@@ -1023,8 +1790,10 @@ class _Tools_:
     def _addDelayedClear(cls, text: str, timeout: int):
         """添加延迟清除任务"""
         import threading
+        clock = _G._G_.clock
+
         def delayed_clear():
-            time.sleep(timeout)
+            clock.sleep(timeout)
             cls.delScreenInfo(text)
         threading.Thread(target=delayed_clear, daemon=True).start()
 
@@ -1113,6 +1882,7 @@ class _Tools_:
                         cls._addDelayedClear(text, timeout)
                 
                 cls._screenInfoCache.append(screenInfo)
+                cls._onScreenChanged()
                 log.i(f"屏幕信息已添加: {text}")
             
             return True
@@ -1160,12 +1930,113 @@ class _Tools_:
                     'b': b
                 })
             # 更新缓存
-            cls._screenInfoCache = result
+            cls._setScreenInfos(result)
             return result
         except Exception as e:
             log.ex(e, "获取屏幕信息失败")
             return []
 
+    @classmethod
+    def beginTick(cls) -> list:
+        """开始一个设备更新节拍：读取屏幕，节拍内的匹配复用这一帧"""
+        items = cls.refreshScreenInfos()
+        cls._tick.active = True
+        return items
+
+    @classmethod
+    def endTick(cls):
+        """结束设备更新节拍，之后getScreenInfo恢复每次重新读取"""
+        cls._tick.active = False
+
+    @classmethod
+    def _setScreenInfos(cls, items: list):
+        """更新屏幕信息缓存（新的一帧）"""
+        cls._screenInfoCache = items
+        cls._frameStale = False
+        cls._onScreenChanged()
+
+    @classmethod
+    def _onScreenChanged(cls):
+        """屏幕信息变化，帧版本号加1，丢弃上一帧的索引和检查结果"""
+        cls.frameVersion += 1
+        cls._screenIndex = None
+        cls._spatialIndex = None
+
+    @classmethod
+    def _onAction(cls):
+        """执行了会改变屏幕的操作：标记当前帧过期，并记录操作时间"""
+        cls._frameStale = True
+        cls.actionTime = _G._G_.clock.time()
+
+    @classmethod
+    def _frameMemo(cls) -> dict:
+        """获取当前帧的检查结果缓存，帧变化后自动清空"""
+        version = cls.frameVersion
+        memo = cls._memo
+        if memo[0] == version:
+            return memo[1]
+        with cls._memoLock:
+            memo = cls._memo
+            if memo[0] < version:
+                memo = (version, {})
+                cls._memo = memo
+            elif memo[0] > version:
+                # 读取版本号后屏幕已更新，本次检查的结果不再缓存
+                return {}
+        return memo[1]
+
+    @classmethod
+    def _applyMatches(cls, matches: list, this):
+        """处理匹配结果的附带效果：更新findCount，将匹配参数写入this.data"""
+        if getattr(cls._recorder, 'dry', False):
+            return
+        deferred = getattr(cls._recorder, 'deferred', None)
+        if deferred is not None:
+            deferred.append(matches)
+            return
+        recorded = getattr(cls._recorder, 'matches', None)
+        if recorded is not None:
+            recorded.append(matches)
+        # 对匹配到的每个项目更新findCount
+        for match in matches:
+            cls._tryDelInfo(match[0])
+        if matches and this:
+            # 将匹配结果中argument添加到this中，属性名称为argument加_
+            data = this.data
+            if not data:
+                data = {}
+                this.data = data
+            for m in matches:
+                if m[1]:
+                    for k, v in m[1].groupdict().items():
+                        data[f'_{k}'] = v
+                    # 设置data._item 为匹配到的内容
+                    data['_mt'] = m[0]['t'] 
+                    data['_mb'] = m[0]['b']
+
+    @classmethod
+    def screenIndex(cls) -> Optional[ScreenIndex]:
+        """获取当前帧的文字索引，首次查询时构建"""
+        items = cls._screenInfoCache
+        if not items:
+            return None
+        index = cls._screenIndex
+        if index is None or index.items is not items or index.size != len(items):
+            index = ScreenIndex(items)
+            cls._screenIndex = index
+        return index
+
+    @classmethod
+    def spatialIndex(cls) -> Optional[SpatialIndex]:
+        """获取当前帧的空间索引，首次查询时构建"""
+        items = cls._screenInfoCache
+        if not items:
+            return None
+        index = cls._spatialIndex
+        if index is None or index.items is not items or index.size != len(items):
+            index = SpatialIndex(items)
+            cls._spatialIndex = index
+        return index
     
     @classmethod
     def _tryDelInfo(cls, item):
@@ -1243,49 +2114,28 @@ class _Tools_:
             items = cls.getScreenInfo(refresh)
             if not items:
                 return None
-            matches = cls.matchItems(pattern, items)
-            if len(matches) == 0:
-                matches = cls.matchItems(pattern, items, True)
-            if region:
-                filtered_matches = []
-                for i, m in matches:
-                    box = i.get('b')
-                    _G._G_.Log().i_(f"匹配文本: {text}, 区域: {region}, 匹配: {i}")
-                    if box and isinstance(box, list) and len(box) >= 4:
-                        try:
-                            # 确保坐标都是整数
-                            box = [int(b) for b in box]
-                            if region.isRectIn(box[0], box[1], box[2], box[3]):
-                                filtered_matches.append((i, m))
-                        except (ValueError, TypeError):
-                            continue
-                matches = filtered_matches
-                
-            # 对匹配到的每个项目更新findCount
-            for match in matches:
-                cls._tryDelInfo(match[0])
-                
-            if matches and this:
-                # 将匹配结果中argument添加到this中，属性名称为argument加_
-                data = this.data
-                if not data:
-                    data = {}
-                    this.data = data
-                for m in matches:
-                    if m[1]:
-                        for k, v in m[1].groupdict().items():
-                            data[f'_{k}'] = v
-                            # print(f":: {k} = {v}")
-                        # 设置data._item 为匹配到的内容
-                        data['_mt'] = m[0]['t'] 
-                        data['_mb'] = m[0]['b']
+            # 同一帧内相同条件只匹配一次
+            memo = cls._frameMemo()
+            key = ('m', pattern, region.region if region else None)
+            matches = memo.get(key)
+            if matches is None:
+                matches = cls.matchItems(pattern, items, False, rule)
+                if len(matches) == 0:
+                    matches = cls.matchItems(pattern, items, True, rule)
+                if region and matches:
+                    # 用空间索引取出区域内的文字块，只访问与区域相交的格子
+                    index = cls.spatialIndex() if items is cls._screenInfoCache else SpatialIndex(items)
+                    inside = {id(i) for i in index.within(*region.rect())}
+                    matches = [(i, m) for i, m in matches if id(i) in inside]
+                memo[key] = matches
+            cls._applyMatches(matches, this)
             return matches
         
-        segments = cls._parseSegments(text, '&', this)
-        if not segments:
+        rule = cls.toRule(text, this)
+        if not rule or not rule.segments:
             return None
         
-        return cls._evalSegments(segments, evalCondition, True)
+        return cls._evalSegments(rule.segments, evalCondition, True)
 
     @classmethod
     def onLoad(cls, old):
@@ -1295,6 +2145,7 @@ class _Tools_:
             cls.screenSize = old.screenSize
             cls._fixFactor = old._fixFactor
             cls._screenInfoCache = old._screenInfoCache
+            cls.frameVersion = old.frameVersion
         
         # 初始化屏幕尺寸(如果android对象已由_G_初始化)
         if _G._G_.android:
@@ -1365,7 +2216,7 @@ class _Tools_:
             cls.clickPos(pos, offset)
             # 等待指定时间
             if waitTime > 0 and cls.isAndroid():
-                time.sleep(waitTime)
+                g.clock.sleep(waitTime)
             return True
         except Exception as e:
             log.ex(e, f"点击文本失败: {text}")
@@ -1393,6 +2244,7 @@ class _Tools_:
             x, y = cls.convertScreenToWindow(x, y)
             
             if g.android:
+                cls._onAction()
                 return g.android.click(x, y)
             else:
                 return True
@@ -1421,6 +2273,7 @@ class _Tools_:
         try:
             g = _G._G_
             android = g.android
+            cls._onAction()
             # 默认持续时间为0.5秒
             default_duration = 500
 
@@ -1521,7 +2374,7 @@ class _Tools_:
                 return False
             
             cls.swipe(f"{cmd} 500")
-            time.sleep(2)  # 等待滑动完成
+            _G._G_.clock.sleep(2)  # 等待滑动完成
             # 检查滑动后是否匹配
             if matchFunc():
                 log.i(f"在方向{current_dir}的第{tries+1}次滑动后找到匹配")
@@ -554,28 +554,46 @@ class SheetPage {
             console.error('Socket未初始化');
             return;
         }
-        sio.on('S2B_sheetUpdate', (data) => { 
-            // 统一使用映射表检查类型
-            if (!Array.isArray(data.data)) return;
-            const targetTab = Object.keys(this.tabTypeMap).find(
-                key => this.tabTypeMap[key] === data.type
-            );
-            if (!targetTab) return;
+        // 多设备命令：每个设备返回时推送一次，最后推送汇总
+        sio.on('S2B_CmdResult', (data) => {
+            if (data.done) {
+                const failed = data.failed.length ? `，失败: ${data.failed.join(', ')}` : '';
+                this.log(`命令 ${data.command} 完成: ${data.success}/${data.total} 成功，耗时 ${data.cost}s${failed}`,
+                    data.failed.length ? 'w' : 'i');
+                return;
+            }
+            this.showResult(data.result, `设备${data.target} ${data.cost}s`);
+        });
+        sio.on('S2B_sheetUpdate', (data, ack) => {
+            try {
+                // 统一使用映射表检查类型
+                if (!Array.isArray(data.data)) return;
+                if (data.dropped) {
+                    console.warn(`推送过快，丢弃了 ${data.dropped} 条日志`);
+                }
+                const targetTab = Object.keys(this.tabTypeMap).find(
+                    key => this.tabTypeMap[key] === data.type
+                );
+                if (!targetTab) return;
 
-            let targetData = null;
-            // 更新对应数据
-            switch (data.type) {
-                case this.DataType.TASKS:
-                    targetData = this.tasks;
-                    break;
-                case this.DataType.DEVICES:
-                    targetData = this.devices;
-                    break;
-                case this.DataType.LOGS:
-                    targetData = this.logs;
-                    break;
+                let targetData = null;
+                // 更新对应数据
+                switch (data.type) {
+                    case this.DataType.TASKS:
+                        targetData = this.tasks;
+                        break;
+                    case this.DataType.DEVICES:
+                        targetData = this.devices;
+                        break;
+                    case this.DataType.LOGS:
+                        targetData = this.logs;
+                        break;
+                }
+                this._updateTable(data.data, data.type, targetData);
+            } finally {
+                // 确认收到，服务端收到确认后才推送下一批日志
+                if (typeof ack === 'function') ack();
             }
-            this._updateTable(data.data, data.type, targetData);
         });
     }
 
@@ -1727,14 +1745,16 @@ class SheetPage {
     sendCmd(cmd, targets, params, callback=null) {
         const socket = this.socketer;
         try {
+            // 多设备命令的结果通过S2B_CmdResult逐个推送，应答只在全部完成后返回
+            const multi = targets && targets.length > 1;
             socket.emitRet('2S_Cmd', { 
                 command: cmd, 
                 targets: targets,
                 params: params
-            }).then(result => {
+            }, multi ? 120000 : 10000).then(result => {
                 if(callback) {
                     callback(result);
-                } else {
+                } else if (!multi) {
                     this.onCmdResult(cmd, result, targets);
                 }
             });
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""客户端指令表测试：文档中的指令示例能分派到对应指令，新增指令的名称和缩写不与其它指令重复
+
+用法：python server/test_ccmds.py 或 pytest server/test_ccmds.py
+"""
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'scripts'))
+
+import _G
+
+
+def _register():
+    g = _G._G_
+    g.load(False)
+    from _CmdMgr import _CmdMgr_
+    import CCmds
+    if not any(name == 'CCmds' for name, _ in _CmdMgr_.cmdModules):
+        CCmds.CCmds_.registerCommands()
+    _CmdMgr_.registerCommands()
+    return _CmdMgr_
+
+
+def _assertUnique(mgr, funcName):
+    """指令的所有名称（中文名、拼音、函数名、缩写）都不能被其它指令使用"""
+    cmds = [c for _, cmds in mgr.cmdModules for c in cmds.values()]
+    cmd = next(c for c in cmds if c.name == funcName)
+    for other in cmds:
+        if other is cmd or not other.prefixes:
+            continue
+        shared = set(cmd.prefixes) & set(other.prefixes)
+        assert not shared, f'{funcName} 与 {other.name} 重名: {shared}'
+
+
+def test_replayDispatch():
+    mgr = _register()
+    cmd, m = mgr._match('回放 首页签到 10')
+    assert cmd is not None and cmd.name == 'replaySession'
+    assert m.group('name') == '首页签到'
+    assert m.group('speed') == '10'
+    cmd, m = mgr._match('hf 首页签到')
+    assert cmd.name == 'replaySession'
+    assert m.group('speed') is None
+
+
+def test_recordNames():
+    mgr = _register()
+    for name in ('beginRec', 'endRec', 'replaySession'):
+        _assertUnique(mgr, name)
+    assert mgr._match('开始录制 首页签到')[0].name == 'beginRec'
+    assert mgr._match('tzlz')[0].name == 'endRec'
+
+
+def test_tickRateName():
+    mgr = _register()
+    _assertUnique(mgr, 'tickRate')
+    assert mgr._match('tr')[0].name == 'tickRate'
+    assert mgr._match('ts')[0].name == 'takeScreenshot'
+
+
+if __name__ == '__main__':
+    for name, func in list(globals().items()):
+        if name.startswith('test_'):
+            func()
+            print(f'{name} 通过')
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""客户端脚本更新测试：增量同步请求失败时改为逐个文件下载
+
+用法：python server/test_cfileserver.py 或 pytest server/test_cfileserver.py
+"""
+import json
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'scripts'))
+
+import _G
+import CClient
+import CFileServer
+from CFileServer import CFileServer_
+
+
+class Response:
+    def __init__(self, status, body=None, headers=None):
+        self.status_code = status
+        self.body = body
+        self.headers = headers or {}
+        self.text = body if isinstance(body, str) else json.dumps(body)
+
+    def json(self):
+        return self.body
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise CFileServer.requests.HTTPError(str(self.status_code))
+
+
+def _downAll(post, files):
+    """用post模拟/sync请求，files模拟/timestamps和/file，返回请求记录和根目录中的文件"""
+    g = _G._G_
+    g.load(True)
+    requests = CFileServer.requests
+    calls = []
+
+    def get(url, **kwargs):
+        calls.append(url)
+        if url.endswith('/timestamps'):
+            return Response(200, {name: '2' for name in files})
+        return Response(200, files[url.split('/file/', 1)[1]])
+
+    def postSync(url, **kwargs):
+        calls.append(url)
+        return post()
+    old = requests.get, requests.post, g._dir, CClient.CClient_.fromAndroid, CFileServer_._serverIP
+    with tempfile.TemporaryDirectory() as root:
+        requests.get, requests.post = get, postSync
+        g._dir = root
+        CClient.CClient_.fromAndroid = True
+        CFileServer_._serverIP = '127.0.0.1'
+        try:
+            CFileServer_.downAll().join(10)
+            saved = {}
+            for name in files:
+                path = os.path.join(root, name)
+                if os.path.exists(path):
+                    with open(path, encoding='utf-8') as f:
+                        saved[name] = f.read()
+            return calls, saved, CFileServer_.currentVersions()
+        finally:
+            requests.get, requests.post, g._dir, CClient.CClient_.fromAndroid, CFileServer_._serverIP = old
+
+
+def test_syncNetworkError():
+    files = {'scripts/a.py': 'a = 1\n', 'config/b.json': '{}'}
+
+    def post():
+        raise CFileServer.requests.ConnectionError('连接被重置')
+    calls, saved, versions = _downAll(post, files)
+    assert calls[0].endswith('/sync')
+    assert saved == files
+    assert versions == {name: '2' for name in files}
+
+
+def test_syncServerError():
+    files = {'scripts/a.py': 'a = 2\n'}
+    calls, saved, _ = _downAll(lambda: Response(502), files)
+    assert saved == files
+
+
+def test_syncUnsupported():
+    files = {'scripts/a.py': 'a = 3\n'}
+    calls, saved, _ = _downAll(lambda: Response(404), files)
+    assert saved == files
+
+
+if __name__ == '__main__':
+    for name, func in list(globals().items()):
+        if name.startswith('test_'):
+            func()
+            print(f'{name} 通过')
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""虚拟时钟测试：单线程推进、多个登记线程协同推进、未登记线程不推进时间
+
+用法：python server/test_clock.py 或 pytest server/test_clock.py
+"""
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'scripts'))
+
+import _G
+
+
+def test_singleThread():
+    clock = _G.VirtualClock(0)
+    for _ in range(3600):
+        clock.sleep(1)
+    assert clock.time() == 3600
+
+
+def test_attachedThreads():
+    clock = _G.VirtualClock(0)
+    ends = {}
+
+    def loop(name, interval):
+        try:
+            for _ in range(int(3600 / interval)):
+                clock.sleep(interval)
+        finally:
+            clock.detach()
+        ends[name] = clock.time()
+
+    threads = [threading.Thread(target=loop, args=(i, interval))
+               for i, interval in enumerate((1, 5, 30))]
+    for t in threads:
+        clock.attach(t)
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(10)
+    assert ends == {0: 3600, 1: 3600, 2: 3600}
+
+
+def test_unattachedDoesNotAdvance():
+    clock = _G.VirtualClock(0)
+    clock.attach()
+    woke = []
+
+    def background():
+        clock.sleep(5)
+        woke.append(clock.time())
+
+    try:
+        t = threading.Thread(target=background)
+        t.start()
+        # 登记的主线程还在执行，未登记线程的sleep不能推进时间
+        time.sleep(0.3)
+        assert clock.time() == 0
+        assert not woke
+        # 主线程sleep后时间推进，未登记线程在自己的唤醒时刻之后醒来
+        clock.sleep(10)
+        t.join(5)
+        assert clock.time() == 10
+        assert woke and woke[0] >= 5
+    finally:
+        clock.detach()
+
+
+if __name__ == '__main__':
+    for name, func in list(globals().items()):
+        if name.startswith('test_'):
+            func()
+            print(f'{name} 通过')
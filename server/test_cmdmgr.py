@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""指令分派测试：按命令名前缀索引查找的结果与逐个尝试所有指令一致
+
+用法：python server/test_cmdmgr.py 或 pytest server/test_cmdmgr.py
+"""
+import os
+import random
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'scripts'))
+
+import _G
+
+
+def _register():
+    g = _G._G_
+    g.load(False)
+    from _CmdMgr import _CmdMgr_
+    import CCmds
+    if not any(name == 'CCmds' for name, _ in _CmdMgr_.cmdModules):
+        CCmds.CCmds_.registerCommands()
+    _CmdMgr_.registerCommands()
+    return _CmdMgr_
+
+
+def _scan(mgr, cmdStr):
+    """原分派方式：按顺序尝试所有指令，取命令名最长的完全匹配"""
+    best, bestMatch, bestLength = None, None, -1
+    for _, cmds in mgr.cmdModules:
+        for cmdObj in cmds.values():
+            match = cmdObj.matchRegex.fullmatch(cmdStr)
+            if match:
+                name = match.groupdict().get(mgr.CmdKey)
+                length = len(name) if name else 0
+                if length > bestLength:
+                    best, bestMatch, bestLength = cmdObj, match, length
+    return best, bestMatch
+
+
+def _cmdStrs(mgr):
+    rand = random.Random(3)
+    args = ['', ' 1', ' abc', ' 首页 10', ' a b c', '1', 'x', ' -1.5']
+    strs = ['', ' ', '不存在的指令', 'zzz 1']
+    for _, cmds in mgr.cmdModules:
+        for cmdObj in cmds.values():
+            for name in cmdObj.prefixes or ():
+                for arg in args:
+                    strs.append(name + arg)
+                    strs.append(name.upper() + arg)
+    chars = 'abcdefghijklmnopqrstuvwxyz 0123456789#'
+    strs += [''.join(rand.choice(chars) for _ in range(rand.randint(1, 6))) for _ in range(2000)]
+    return strs
+
+
+def test_indexMatchesScan():
+    mgr = _register()
+    strs = _cmdStrs(mgr)
+    hits = 0
+    for cmdStr in strs:
+        cmd, m = mgr._match(cmdStr)
+        want, wantMatch = _scan(mgr, cmdStr)
+        assert cmd is want, (cmdStr, cmd and cmd.name, want and want.name)
+        if want:
+            hits += 1
+            assert m.groupdict() == wantMatch.groupdict(), cmdStr
+    assert hits > len(strs) / 4
+
+
+def test_indexRebuild():
+    mgr = _register()
+    mgr._match('help')
+    assert mgr._index is not None
+    # 注册、排序后索引失效，下次分派时重建
+    mgr._sort()
+    assert mgr._index is None
+    cmd, _ = mgr._match('tr')
+    assert cmd is _scan(mgr, 'tr')[0]
+    assert mgr._index is not None
+
+
+if __name__ == '__main__':
+    for name, func in list(globals().items()):
+        if name.startswith('test_'):
+            func()
+            print(f'{name} 通过')
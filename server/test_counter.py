@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""设备计数器测试：重启后回放日志、忽略写了一半的日志行、压缩为快照，以及读取旧版本计数文件
+
+用法：python server/test_counter.py 或 pytest server/test_counter.py
+"""
+import json
+import os
+import sys
+import tempfile
+from datetime import date, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'scripts'))
+
+import _G
+from CCounter import CCounter_
+
+
+class Root:
+    """临时根目录，计数器状态在进入和退出时重置"""
+
+    def __enter__(self):
+        g = _G._G_
+        g.load(True)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.old = g._dir, CCounter_.CompactBytes
+        g._dir = self.tmp.name
+        _restart()
+        # 只在测试中手动写日志
+        CCounter_._running = True
+        return self
+
+    def path(self, name):
+        return CCounter_._path(name)
+
+    def __exit__(self, *args):
+        CCounter_._running = False
+        _G._G_._dir, CCounter_.CompactBytes = self.old
+        _restart()
+        self.tmp.cleanup()
+
+
+def _restart():
+    """模拟重启：丢弃内存中的数据，下次访问时重新加载"""
+    CCounter_._values = None
+    CCounter_._dirty = {}
+    CCounter_._journalSize = 0
+
+
+def test_journalReplay():
+    with Root() as root:
+        CCounter_.set('a', 1)
+        CCounter_.add('b', 2)
+        assert CCounter_.flush()
+        CCounter_.add('a', 4)
+        CCounter_.set('c', 7, day='2000-01-01')
+        assert CCounter_.flush()
+        with open(root.path(CCounter_.JournalName), encoding='utf-8') as f:
+            assert len(f.readlines()) == 2
+        # 没有写入日志的修改重启后丢失
+        CCounter_.set('d', 1)
+        _restart()
+        assert CCounter_.get('a') == 5
+        assert CCounter_.get('b') == 2
+        assert CCounter_.get('c', day='2000-01-01') == 7
+        assert CCounter_.get('d', None) is None
+        # 日志记录的是当前值，重复回放结果相同
+        journal = root.path(CCounter_.JournalName)
+        with open(journal, encoding='utf-8') as f:
+            lines = f.read()
+        with open(journal, 'a', encoding='utf-8') as f:
+            f.write(lines)
+        _restart()
+        assert CCounter_.get('a') == 5
+
+
+def test_tornTail():
+    with Root() as root:
+        CCounter_.set('a', 1)
+        CCounter_.flush()
+        CCounter_.set('a', 2)
+        CCounter_.flush()
+        journal = root.path(CCounter_.JournalName)
+        with open(journal, 'rb') as f:
+            data = f.read()
+        # 最后一行只写了一半
+        with open(journal, 'wb') as f:
+            f.write(data[:-5])
+        _restart()
+        assert CCounter_.get('a') == 1
+        # 加载时压缩，写了一半的行被丢弃，之后追加的行可以正常回放
+        assert os.path.getsize(journal) == 0
+        CCounter_.set('b', 3)
+        CCounter_.flush()
+        _restart()
+        assert CCounter_.get('a') == 1 and CCounter_.get('b') == 3
+
+
+def test_compaction():
+    with Root() as root:
+        CCounter_.CompactBytes = 200
+        old = (date.today() - timedelta(days=CCounter_.KeepDays + 1)).isoformat()
+        CCounter_.set('old', 1, day=old)
+        for i in range(20):
+            CCounter_.set(f'key{i}', i)
+            CCounter_.flush()
+        assert CCounter_.compacts >= 1
+        assert CCounter_._journalSize <= CCounter_.CompactBytes
+        with open(root.path(CCounter_.SnapshotName), encoding='utf-8') as f:
+            snapshot = json.load(f)
+        # 只保留最近KeepDays天
+        assert old not in snapshot
+        _restart()
+        assert all(CCounter_.get(f'key{i}') == i for i in range(20))
+        assert CCounter_.get('old', None, day=old) is None
+
+
+def test_legacyFiles():
+    with Root() as root:
+        os.makedirs(root.path(None), exist_ok=True)
+        with open(root.path('抖音_2024-05-01.json'), 'w', encoding='utf-8') as f:
+            json.dump({'签到': '3'}, f)
+        assert CCounter_.get('抖音.签到', day='2024-05-01') == 3
+
+
+if __name__ == '__main__':
+    for name, func in list(globals().items()):
+        if name.startswith('test_'):
+            func()
+            print(f'{name} 通过')
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""等待应答测试：应答回调完成等待、取消等待、热更新后保留等待中的请求
+
+用法：python server/test_emitret.py 或 pytest server/test_emitret.py
+"""
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'scripts'))
+
+import _G
+
+
+def _patchEmit(g, sent):
+    """替换emit，只记录应答回调，返回恢复函数"""
+    emit = g.emit
+    g.emit = lambda event, data, sid, timeout, callback: sent.append(callback) or True
+
+    def restore():
+        g.emit = emit
+    return restore
+
+
+def _waitSent(sent, count):
+    for _ in range(200):
+        if len(sent) >= count:
+            return
+        time.sleep(0.01)
+    raise AssertionError('请求未发出')
+
+
+def test_resolve():
+    g = _G._G_
+    g.load(True)
+    sent = []
+    restore = _patchEmit(g, sent)
+    try:
+        threading.Timer(0.05, lambda: sent[0]({'ok': 1})).start()
+        start = time.perf_counter()
+        assert g.emitRet('E', {}, 's1', timeout=5) == {'ok': 1}
+        assert time.perf_counter() - start < 1
+        assert not g._pending_requests
+    finally:
+        restore()
+
+
+def test_reloadKeepsPending():
+    g = _G._G_
+    g.load(True)
+    sent = []
+    restore = _patchEmit(g, sent)
+    old = {k: getattr(g, k) for k in ('_pending_requests', '_rpc_lock', '_requestId')}
+    ret = []
+    try:
+        t = threading.Thread(target=lambda: ret.append(g.emitRet('E', {}, 's1', timeout=5)))
+        t.start()
+        _waitSent(sent, 1)
+        requestId = g._requestId
+        # 模拟热更新：新类的状态是模块初始值，onLoad从旧类取回
+        oldCls = type('Old', (), {k: getattr(g, k) for k in
+                                   ('_isServer', '_dir', '_store', 'android', 'clock',
+                                    '_pending_requests', '_rpc_lock', '_requestId')})
+        g._pending_requests = {}
+        g._rpc_lock = threading.Lock()
+        g._requestId = 0
+        g.onLoad(oldCls)
+        assert g._requestId == requestId
+        assert g.cancelPending('s1') == 1
+        t.join(2)
+        assert ret == [None]
+        assert not g._pending_requests
+    finally:
+        restore()
+        for k, v in old.items():
+            setattr(g, k, v)
+
+
+if __name__ == '__main__':
+    for name, func in list(globals().items()):
+        if name.startswith('test_'):
+            func()
+            print(f'{name} 通过')
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""服务端日志推送测试：按控制台分别缓冲，未确认的控制台不再推送，慢控制台只丢弃自己的日志
+
+用法：python server/test_logbroadcast.py 或 pytest server/test_logbroadcast.py
+"""
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'scripts'))
+
+import _G
+from _Log import LogBroadcaster
+
+
+def _setup(sids):
+    """替换控制台列表和emit，返回推送器、推送记录和恢复函数"""
+    g = _G._G_
+    sent = []
+    old = g._consoles, g.emit
+    g._consoles = set(sids)
+    g.emit = lambda event, data, sid=None, callback=None: sent.append((sid, data, callback)) or True
+    broadcaster = LogBroadcaster()
+    broadcaster.MaxPending = 10
+    broadcaster._running = True  # 只在测试中手动推送
+
+    def restore():
+        g._consoles, g.emit = old
+    return broadcaster, sent, restore
+
+
+def test_perConsole():
+    broadcaster, sent, restore = _setup(['fast', 'slow'])
+    try:
+        for i in range(5):
+            broadcaster.push({'id': i})
+        broadcaster.flush()
+        assert sorted(sid for sid, _, _ in sent) == ['fast', 'slow']
+        acks = {sid: callback for sid, _, callback in sent}
+        sent.clear()
+        # fast确认后继续推送，slow未确认不再推送
+        acks['fast']()
+        for i in range(5, 25):
+            broadcaster.push({'id': i})
+            broadcaster.flush()
+            for sid, data, callback in sent:
+                assert sid == 'fast' and 'dropped' not in data
+                callback()
+            sent.clear()
+        # slow确认后推送缓冲中最新的MaxPending条，并上报丢弃条数
+        acks['slow']()
+        broadcaster.flush()
+        (sid, data, _), = sent
+        assert sid == 'slow'
+        assert [d['id'] for d in data['data']] == list(range(15, 25))
+        assert data['dropped'] == 10
+        assert broadcaster.totalDropped == 10
+    finally:
+        restore()
+
+
+def test_ackTimeout():
+    broadcaster, sent, restore = _setup(['a'])
+    try:
+        broadcaster.push({'id': 1})
+        broadcaster.flush()
+        broadcaster.push({'id': 2})
+        broadcaster.flush()
+        assert len(sent) == 1
+        # 不确认的控制台超时后继续推送
+        broadcaster._inflight['a'] -= LogBroadcaster.AckTimeout
+        broadcaster.flush()
+        assert len(sent) == 2 and sent[1][1]['data'] == [{'id': 2}]
+    finally:
+        restore()
+
+
+def test_disconnect():
+    broadcaster, sent, restore = _setup(['a', 'b'])
+    try:
+        broadcaster.push({'id': 1})
+        _G._G_._consoles.discard('b')
+        broadcaster.flush()
+        assert [sid for sid, _, _ in sent] == ['a']
+        assert 'b' not in broadcaster._buffers
+    finally:
+        restore()
+
+
+if __name__ == '__main__':
+    for name, func in list(globals().items()):
+        if name.startswith('test_'):
+            func()
+            print(f'{name} 通过')
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""日志索引测试：跨多个写入块和重建后的分页查询结果与全文扫描一致，索引失效后追加不反复删除索引
+
+用法：python server/test_logindex.py 或 pytest server/test_logindex.py
+"""
+import json
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'scripts'))
+
+import _G
+from _Log import LogIndex
+
+
+def _append(logFile, datas, index=True):
+    """同_Log_._save：追加日志并更新索引"""
+    with LogIndex._lock:
+        with open(logFile, 'ab') as f:
+            start = f.tell()
+            for data in datas:
+                f.write((json.dumps(data, ensure_ascii=False) + '\n').encode('utf-8'))
+            end = f.tell()
+        if index:
+            LogIndex.append(logFile, start, end, datas)
+
+
+def _datas(begin, count):
+    return [{'id': i, 'time': f'10:{i // 60:02d}:{i % 60:02d}',
+             'level': 'ie'[i % 3 == 0], 'tag': ('', 'A', 'B')[i % 5 % 3], 'message': str(i)}
+            for i in range(begin, begin + count)]
+
+
+def _expect(datas, start=None, end=None, level=None, tag=None, offset=0, limit=None):
+    """全文扫描的查询结果"""
+    hits = [d for d in datas
+            if (not start or d['time'] >= start) and (not end or d['time'] < end)
+            and (level is None or d['level'] == level) and (tag is None or d['tag'] == tag)]
+    hits = hits[:max(0, len(hits) - offset)]
+    return hits[-limit:] if limit is not None else hits
+
+
+def _check(logFile, datas):
+    filters = [{}, {'level': 'e'}, {'tag': 'A'}, {'level': 'i', 'tag': 'B'},
+               {'start': '10:01:00', 'end': '10:03:30'}, {'start': '10:02:00', 'level': 'e'}]
+    for f in filters:
+        for offset, limit in ((0, None), (0, 7), (5, 10), (33, 20), (100, 50), (1000, 10)):
+            got = LogIndex.query(logFile, offset=offset, limit=limit, **f)
+            want = _expect(datas, offset=offset, limit=limit, **f)
+            assert [d['id'] for d in got] == [d['id'] for d in want], (f, offset, limit)
+
+
+def test_pagingAcrossBlocks():
+    with tempfile.TemporaryDirectory() as root:
+        logFile = os.path.join(root, 'day.log')
+        LogIndex._blocks.pop(logFile, None)
+        datas = []
+        for count in (3, 40, 1, 17, 90, 8):
+            batch = _datas(len(datas), count)
+            _append(logFile, batch)
+            datas += batch
+        assert len(LogIndex._read(logFile)) == 6
+        _check(logFile, datas)
+        # 索引重建后按BlockSize分块，结果不变
+        LogIndex.forget(logFile)
+        old = LogIndex.BlockSize
+        LogIndex.BlockSize = 16
+        try:
+            _check(logFile, datas)
+        finally:
+            LogIndex.BlockSize = old
+        assert len(LogIndex._read(logFile)) == 10
+
+
+def test_staleIndex():
+    with tempfile.TemporaryDirectory() as root:
+        logFile = os.path.join(root, 'day.log')
+        LogIndex._blocks.pop(logFile, None)
+        # 没有索引的日志文件：第一次追加删除索引，之后不再反复删除
+        _append(logFile, _datas(0, 10), index=False)
+        forget = LogIndex.forget
+        calls = []
+        LogIndex.forget = lambda f: calls.append(f) or forget(f)
+        try:
+            datas = _datas(0, 10)
+            for i in range(5):
+                batch = _datas(len(datas), 4)
+                _append(logFile, batch)
+                datas += batch
+        finally:
+            del LogIndex.forget
+        assert len(calls) == 1
+        assert not os.path.exists(LogIndex.idxPath(logFile))
+        # 查询时重建索引，之后追加恢复更新索引
+        _check(logFile, datas)
+        batch = _datas(len(datas), 4)
+        _append(logFile, batch)
+        datas += batch
+        assert LogIndex._read(logFile)[-1]['c'] == 4
+        _check(logFile, datas)
+
+
+if __name__ == '__main__':
+    for name, func in list(globals().items()):
+        if name.startswith('test_'):
+            func()
+            print(f'{name} 通过')
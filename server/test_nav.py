@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""页面导航测试：导航表查找的路径与原深度优先查找的可达性一致，且是最短路径
+
+用法：python server/test_nav.py 或 pytest server/test_nav.py
+"""
+import os
+import random
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'scripts'))
+
+import _G
+from CApp import CApp_
+
+
+class Page:
+    """模拟页面，只提供导航用到的属性"""
+
+    def __init__(self, name):
+        self.name = name
+        self.exit = {}
+
+
+def _app(pages):
+    app = object.__new__(CApp_)
+    app._pages = {p.name: p for p in pages}
+    app._nav = None
+    return app
+
+
+def _dfsPath(pages, fromPage, toPage, visited=None, path=None):
+    """原findPath：深度优先查找，按exit顺序返回第一条路径"""
+    if visited is None:
+        visited = set()
+    if path is None:
+        path = [fromPage]
+    if fromPage in visited:
+        return []
+    visited.add(fromPage)
+    if fromPage.name == toPage.name:
+        return path
+    for pageName in fromPage.exit.keys():
+        page = pages.get(pageName)
+        if page and page not in visited:
+            result = _dfsPath(pages, page, toPage, visited, path + [page])
+            if result:
+                return result
+    return []
+
+
+def _distances(pages, start):
+    dist = {start.name: 0}
+    queue = [start.name]
+    for name in queue:
+        for nextName in pages[name].exit:
+            if nextName in pages and nextName not in dist:
+                dist[nextName] = dist[name] + 1
+                queue.append(nextName)
+    return dist
+
+
+def test_exitOrder():
+    a, b, c, d = pages = [Page(n) for n in 'abcd']
+    a.exit = {'b': '', 'c': ''}
+    b.exit = {'d': ''}
+    c.exit = {'d': ''}
+    d.exit = {'a': '', '不存在': ''}
+    app = _app(pages)
+    # 同样跳数时走exit中靠前的页面
+    assert app.findPath(a, d) == [a, b, d]
+    assert app.findPath(d, c) == [d, a, c]
+    assert app.findPath(a, a) == [a]
+    # 页面变化后清空导航表重建
+    a.exit = {'c': '', 'b': ''}
+    app.clearNav()
+    assert app.findPath(a, d) == [a, c, d]
+
+
+def test_matchesDfs():
+    rand = random.Random(11)
+    for _ in range(300):
+        pages = [Page(f'p{i}') for i in range(rand.randint(1, 12))]
+        names = [p.name for p in pages] + ['missing']
+        for page in pages:
+            page.exit = {n: '' for n in rand.sample(names, rand.randint(0, min(3, len(names))))}
+        app = _app(pages)
+        byName = app._pages
+        for start in pages:
+            dist = _distances(byName, start)
+            for target in pages:
+                path = app.findPath(start, target)
+                old = _dfsPath(byName, start, target)
+                # 可达性与原实现一致
+                assert bool(path) == bool(old)
+                if not path:
+                    continue
+                # 路径合法且最短
+                assert path[0] is start and path[-1] is target
+                for p, q in zip(path, path[1:]):
+                    assert q.name in p.exit
+                assert len(path) - 1 == dist[target.name] <= len(old) - 1
+
+
+if __name__ == '__main__':
+    for name, func in list(globals().items()):
+        if name.startswith('test_'):
+            func()
+            print(f'{name} 通过')
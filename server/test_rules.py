@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""编译规则缓存测试：按原始表达式缓存、命中时不做宏替换、依赖上下文的宏按替换结果区分，帧结果缓存按版本号替换
+
+用法：python server/test_rules.py 或 pytest server/test_rules.py
+"""
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'scripts'))
+
+import _G
+from _Tools import _Tools_
+
+
+class App:
+    def __init__(self, data):
+        self.data = data
+
+
+def _countMacro():
+    """统计宏替换次数，返回计数列表和恢复函数"""
+    calls = []
+    replace = _Tools_._replaceMacro
+
+    def counting(this, text):
+        calls.append(text)
+        return replace.__func__(_Tools_, this, text)
+    _Tools_._replaceMacro = counting
+
+    def restore():
+        del _Tools_._replaceMacro
+        _Tools_._replaceMacro = replace
+    return calls, restore
+
+
+def test_plainExpr():
+    _G._G_.load(True)
+    _Tools_.clearRules()
+    calls, restore = _countMacro()
+    try:
+        this = App({})
+        rule = _Tools_.toRule(' 首页&签到 ', this)
+        assert _Tools_.toRule('首页&签到', this) is rule
+        assert _Tools_.toRule('首页&签到') is rule
+        # 不含宏的表达式不做宏替换
+        assert not calls
+    finally:
+        restore()
+
+
+def test_staticMacro():
+    _G._G_.load(True)
+    _Tools_.clearRules()
+    calls, restore = _countMacro()
+    try:
+        rule = _Tools_.toRule('#<<', App({}))
+        assert rule.expr == 'app.home()'
+        assert len(calls) == 1
+        # 宏命令的替换结果与上下文无关，之后按原始表达式命中
+        assert _Tools_.toRule('#<<', App({'x': 1})) is rule
+        assert len(calls) == 1
+        # 没有上下文时不做宏替换，不能命中替换后的规则
+        assert _Tools_.toRule('#<<').expr == '#<<'
+    finally:
+        restore()
+
+
+def test_contextMacro():
+    _G._G_.load(True)
+    _Tools_.clearRules()
+    a = _Tools_.toRule('#name', App({'name': '首页'}))
+    b = _Tools_.toRule('#name', App({'name': '我的'}))
+    assert a.expr == '首页' and b.expr == '我的'
+    assert _Tools_.toRule('#name', App({'name': '首页'})) is a
+    assert ('#name', '首页') in _Tools_._rules
+    assert '#name' not in _Tools_._rules
+
+
+def test_frameMemo():
+    _Tools_.frameVersion += 1
+    memo = _Tools_._frameMemo()
+    memo['k'] = 1
+    assert _Tools_._frameMemo() is memo
+    _Tools_.frameVersion += 1
+    assert 'k' not in _Tools_._frameMemo()
+    # 读取了旧版本号的线程不能替换新一帧的缓存
+    current = _Tools_._memo
+    _Tools_.frameVersion -= 1
+    try:
+        old = _Tools_._frameMemo()
+        old['k'] = 2
+        assert _Tools_._memo is current
+    finally:
+        _Tools_.frameVersion += 1
+    assert 'k' not in _Tools_._frameMemo()
+
+
+if __name__ == '__main__':
+    for name, func in list(globals().items()):
+        if name.startswith('test_'):
+            func()
+            print(f'{name} 通过')
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""屏幕文字索引测试：正则字面量提取，以及用索引过滤候选文字块后与逐个匹配的结果一致
+
+用法：python server/test_screenindex.py 或 pytest server/test_screenindex.py
+"""
+import os
+import random
+import re
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'scripts'))
+
+from _Tools import ScreenIndex
+
+
+def test_literals():
+    cases = {
+        '首页': ['首页'],
+        r'签到\d+': ['签到'],
+        r'\d+元': ['元'],
+        r'\.txt': ['.txt'],
+        'AbC': ['abc'],
+        '(abc)def': ['def'],
+        'abc?d': ['ab', 'd'],
+        'ab*c': ['a', 'c'],
+        'x{2}yz': ['yz'],
+        '[abc]def': ['def'],
+        # 存在分支、十六进制转义时不提取
+        'a|b': [],
+        r'\x41b': [],
+        '': [],
+    }
+    for pattern, want in cases.items():
+        assert ScreenIndex.literals(pattern) == want, pattern
+
+
+def _scan(pattern, items):
+    regex = re.compile(pattern, re.IGNORECASE)
+    return [item for item in items if regex.search(str(item.get('t') or ''))]
+
+
+def test_candidates():
+    items = [{'t': t} for t in ('首页', '每日签到 12', '签到成功', 'OK', 'ok按钮', '', None, '确定\n取消')]
+    index = ScreenIndex(items)
+    assert index.candidates('签到') == [items[1], items[2]]
+    assert index.candidates('Ok') == [items[3], items[4]]
+    assert index.candidates('取消') == [items[7]]
+    assert index.candidates('不存在') == []
+    # 无法提取字面量时返回全部文字块
+    assert index.candidates('首页|签到') is items
+
+
+def test_candidatesMatchScan():
+    rand = random.Random(7)
+    chars = 'abAB签到首页12.元 '
+    pieces = ['a', 'b', 'ab', '签到', '首页', '元', r'\d+', r'\.', '.', 'a?', 'b*', '[ab]',
+              '(签到)', 'x{0,2}', r'\s', '1', 'B']
+    for _ in range(200):
+        items = [{'t': ''.join(rand.choice(chars) for _ in range(rand.randint(0, 8)))}
+                 for _ in range(rand.randint(0, 30))]
+        index = ScreenIndex(items)
+        for _ in range(20):
+            pattern = ''.join(rand.choice(pieces) for _ in range(rand.randint(1, 4)))
+            want = _scan(pattern, items)
+            got = _scan(pattern, index.candidates(pattern))
+            assert got == want, pattern
+
+
+if __name__ == '__main__':
+    for name, func in list(globals().items()):
+        if name.startswith('test_'):
+            func()
+            print(f'{name} 通过')
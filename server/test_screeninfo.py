@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""屏幕信息缓存测试：节拍外每次重新读取，节拍内复用本节拍的帧，操作后重新读取
+
+用法：python server/test_screeninfo.py 或 pytest server/test_screeninfo.py
+"""
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'scripts'))
+
+import _G
+
+
+class FakeInfo:
+    def __init__(self, items):
+        self.items = items
+
+    def size(self):
+        return len(self.items)
+
+    def get(self, i):
+        return self.items[i]
+
+
+class FakeAndroid:
+    """模拟android对象，记录读取屏幕的次数，openApp后屏幕内容变化"""
+
+    def __init__(self):
+        self.reads = 0
+        self.screen = [{'t': '桌面', 'b': '0,0,100,100'}]
+
+    def getScreenInfo(self):
+        self.reads += 1
+        return FakeInfo(list(self.screen))
+
+    def openApp(self, appName):
+        self.screen = [{'t': appName, 'b': '0,0,100,100'}]
+        return True
+
+
+def _setup():
+    g = _G._G_
+    android = FakeAndroid()
+    g.android = android
+    tools = g.Tools()
+    tools._setScreenInfos(None)
+    return g, tools, android
+
+
+def test_rereadOutsideTick():
+    g, tools, android = _setup()
+    try:
+        tools.getScreenInfo()
+        tools.getScreenInfo()
+        assert android.reads == 2
+    finally:
+        g.android = None
+
+
+def test_reuseInsideTick():
+    g, tools, android = _setup()
+    try:
+        tools.beginTick()
+        tools.getScreenInfo()
+        tools.getScreenInfo()
+        assert android.reads == 1
+    finally:
+        tools.endTick()
+        g.android = None
+
+
+def test_freshReadAfterAction():
+    g, tools, android = _setup()
+    try:
+        tools.beginTick()
+        assert tools.matchText('桌面', None)
+        # 直接调用android的操作（如CDevice_._open中的openApp）也要标记帧过期
+        tools._onAction()
+        android.openApp('微信')
+        assert not tools.matchText('桌面', None)
+        assert tools.matchText('微信', None)
+        assert android.reads == 2
+    finally:
+        tools.endTick()
+        g.android = None
+
+
+if __name__ == '__main__':
+    for name, func in list(globals().items()):
+        if name.startswith('test_'):
+            func()
+            print(f'{name} 通过')
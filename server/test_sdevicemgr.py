@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""设备索引测试：弱引用索引自动失效、过期sid不返回旧设备、按id查找不退回按名称查找
+
+用法：python server/test_sdevicemgr.py 或 pytest server/test_sdevicemgr.py
+"""
+import gc
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'scripts'))
+
+import _G
+import RPC
+import SDeviceMgr
+from SDeviceMgr import Registry, SDeviceMgr_
+
+
+class Device:
+    """模拟设备，只提供索引用到的属性"""
+
+    def __init__(self, id, name, sid, console=False):
+        self.id = id
+        self.name = name
+        self.sid = sid
+        self.isConsole = console
+
+    def isConnected(self):
+        return bool(self.sid)
+
+
+def _mgr(devices):
+    _G._G_.load(True)
+    mgr = object.__new__(SDeviceMgr_)
+    mgr.__init__()
+    mgr._SDeviceMgr___devices = devices
+    for device in devices:
+        mgr._index(device)
+    return mgr
+
+
+def test_registryEviction():
+    registry = Registry()
+    a = Device(1, 'a', 's1')
+    registry.set('id', 1, a)
+    assert registry.get('id', 1) is a
+    del a
+    gc.collect()
+    # 只保存弱引用，实体不再使用后索引自动失效
+    assert registry.get('id', 1) is None
+
+
+def test_registryRemoveOnlyOwner():
+    registry = Registry()
+    a, b = Device(1, 'a', 's1'), Device(2, 'b', 's1')
+    registry.set('sid', 's1', b)
+    registry.remove('sid', 's1', a)
+    assert registry.get('sid', 's1') is b
+    registry.remove('sid', 's1', b)
+    assert registry.get('sid', 's1') is None
+
+
+def test_staleSid():
+    a = Device(1, 'a', 'old')
+    mgr = _mgr([a, Device(2, 'b', 's2')])
+    # sid变化但没有重新建立索引
+    a.sid = 'new'
+    assert mgr.getBySID('old') is None
+    assert mgr.getBySID('new') is a
+    assert mgr.registry.get('sid', 'new') is a
+    assert mgr.getBySID('s2').id == 2
+
+
+def test_addDeviceById():
+    a = Device(1, 'a', 's1')
+    mgr = _mgr([a])
+    mgr.addDevice(Device(1, 'a', 's3'))
+    assert len(mgr._devices) == 1
+    mgr.addDevice(Device(3, 'c', 's4'))
+    assert mgr.getById(3).name == 'c'
+
+
+def test_rpcOnlyById():
+    named = Device(5, '123', 's5')
+    mgr = _mgr([named, Device(7, 'console', 's7', console=True)])
+    old = SDeviceMgr.deviceMgr
+    SDeviceMgr.deviceMgr = mgr
+    try:
+        # get按名称退回查找，getById只按id
+        assert mgr.get(123) is named
+        assert mgr.getById(123) is None
+        sent = []
+        emitRet = _G._G_.emitRet
+        _G._G_.emitRet = lambda *args: sent.append(args) or {'result': 'ok'}
+        try:
+            ret = RPC._callRpcToClient('123', {}, 1)
+            assert ret['success'] is False and not sent
+            assert RPC._callRpcToClient('7', {}, 1)['success'] is False
+            assert RPC._callRpcToClient('5', {}, 1) == {'result': 'ok'}
+            assert sent[0][2] == 's5'
+        finally:
+            _G._G_.emitRet = emitRet
+    finally:
+        SDeviceMgr.deviceMgr = old
+
+
+if __name__ == '__main__':
+    for name, func in list(globals().items()):
+        if name.startswith('test_'):
+            func()
+            print(f'{name} 通过')
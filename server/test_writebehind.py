@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""延迟写入测试：合并同一行的修改、批量写入、写不进去的行不影响其它行、数据库不可用时不丢数据
+
+用法：python server/test_writebehind.py 或 pytest server/test_writebehind.py
+数据库使用内存sqlite，表上的CHECK约束模拟数据库拒绝的值。
+"""
+import os
+import sqlite3
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'scripts'))
+
+import _G
+from SModels import SModel_, WriteBehind
+
+
+class Dialect:
+    name = 'sqlite'
+
+
+class Engine:
+    dialect = Dialect()
+
+
+class Session:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, params):
+        if isinstance(params, list):
+            return self.conn.executemany(sql, params)
+        return self.conn.execute(sql, params)
+
+    def commit(self):
+        self.conn.commit()
+
+    def rollback(self):
+        self.conn.rollback()
+
+
+class DB:
+    """sqlite实现的db对象，只提供WriteBehind用到的接口"""
+
+    def __init__(self):
+        self.conn = sqlite3.connect(':memory:', check_same_thread=False)
+        self.conn.execute('CREATE TABLE wb_test (id INTEGER PRIMARY KEY, '
+                          'score INTEGER CHECK(score >= 0), name VARCHAR(255))')
+        self.engine = Engine()
+        self.session = Session(self.conn)
+        self.down = False
+        self.calls = 0
+
+    def sql(self, dbFun):
+        self.calls += 1
+        if self.down:
+            return None
+        return dbFun(self)
+
+    def rows(self) -> dict:
+        return {id: (score, name) for id, score, name in
+                self.conn.execute('SELECT id, score, name FROM wb_test')}
+
+
+def _setup():
+    _G._G_.load(True)
+    db = DB()
+    model = SModel_('wb_test', {'id': ('int', None), 'score': ('int', 0), 'name': ('str', '')})
+    SModel_._models.remove(model)
+    model.SQL = db.sql
+    writer = WriteBehind()
+    writer.FlushInterval = 3600  # 只在测试中手动写入
+    writer._running = True
+    return db, model, writer
+
+
+def test_batching():
+    db, model, writer = _setup()
+    a = {'id': 1, 'score': 1, 'name': 'a'}
+    writer.add(model, a)
+    writer.add(model, {'id': 2, 'score': 2, 'name': 'b'})
+    a['score'] = 5
+    writer.add(model, a)
+    assert writer.pendingCount == 2
+    assert writer.get('wb_test', 1)['score'] == 5
+    assert writer.flush()
+    assert db.rows() == {1: (5, 'a'), 2: (2, 'b')}
+    assert db.calls == 1
+    assert writer.stats()['rows'] == 2
+    assert writer.pendingCount == 0
+
+
+def test_failingRow():
+    db, model, writer = _setup()
+    writer.add(model, {'id': 1, 'score': 1, 'name': 'a'})
+    writer.add(model, {'id': 2, 'score': -1, 'name': 'bad'})
+    assert not writer.flush()
+    # 正常的行已写入，写不进去的行放回待写入列表
+    assert db.rows() == {1: (1, 'a')}
+    assert writer.pendingCount == 1
+    for i in range(WriteBehind.MaxAttempts - 1):
+        writer.add(model, {'id': 10 + i, 'score': i, 'name': 'ok'})
+        writer.flush()
+    # 连续失败MaxAttempts次后丢弃，不再阻塞其它行
+    assert writer.pendingCount == 0
+    assert writer.stats()['dropped'] == 1
+    assert 2 not in db.rows()
+    writer.add(model, {'id': 20, 'score': 3, 'name': 'c'})
+    assert writer.flush()
+    assert db.rows()[20] == (3, 'c')
+
+
+def test_databaseDown():
+    db, model, writer = _setup()
+    db.down = True
+    writer.add(model, {'id': 1, 'score': 1, 'name': 'a'})
+    writer.add(model, {'id': 2, 'score': 2, 'name': 'b'})
+    for _ in range(WriteBehind.MaxAttempts * 2):
+        assert not writer.flush()
+    # 数据库不可用时不丢弃数据，恢复后全部写入
+    assert writer.pendingCount == 2
+    assert writer.stats()['dropped'] == 0
+    db.down = False
+    assert writer.flush()
+    assert db.rows() == {1: (1, 'a'), 2: (2, 'b')}
+
+
+if __name__ == '__main__':
+    for name, func in list(globals().items()):
+        if name.startswith('test_'):
+            func()
+            print(f'{name} 通过')